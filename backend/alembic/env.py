@@ -19,6 +19,14 @@ fileConfig(config.config_file_name)
 target_metadata = Base.metadata
 
 
+def include_name(name, type_, parent_names):
+    # The messages_fts FTS5 index and its shadow tables are not models;
+    # keep autogenerate from proposing to drop them.
+    if type_ == "table":
+        return not (name or "").startswith("messages_fts")
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -36,6 +44,7 @@ def run_migrations_offline() -> None:
         url=url,
         target_metadata=target_metadata,
         literal_binds=True,
+        include_name=include_name,
         dialect_opts={"paramstyle": "named"},
     )
 
@@ -55,6 +64,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,36 @@
+"""add indexes for conversation listing and message history
+
+Revision ID: c5d6e7f8a9b0
+Revises: b4e2c3d5f6a7
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "c5d6e7f8a9b0"
+down_revision: Union[str, Sequence[str], None] = "b4e2c3d5f6a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # History loads: WHERE conversation_id = ? ORDER BY timestamp
+    op.create_index(
+        "ix_messages_conversation_id_timestamp",
+        "messages",
+        ["conversation_id", "timestamp"],
+    )
+    # Sidebar listing: WHERE user_id = ? ORDER BY updated_at DESC
+    op.create_index(
+        "ix_conversations_user_id_updated_at",
+        "conversations",
+        ["user_id", sa.text("updated_at DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_user_id_updated_at", table_name="conversations")
+    op.drop_index("ix_messages_conversation_id_timestamp", table_name="messages")
@@ -0,0 +1,72 @@
+"""add FTS5 full-text index over messages
+
+Revision ID: d6e7f8a9b0c1
+Revises: c5d6e7f8a9b0
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "d6e7f8a9b0c1"
+down_revision: Union[str, Sequence[str], None] = "c5d6e7f8a9b0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Messages indexed per backfill statement (each commits on its own).
+BATCH_ROWS = 10_000
+
+# Same statements as app.models.message.MESSAGES_FTS_DDL.
+FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, user_id, conversation_id UNINDEXED, message_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '3')",
+    "INSERT INTO messages_fts (messages_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0, 0.0, 0.0)')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts (rowid, content, user_id, conversation_id, message_id) "
+    "SELECT new.rowid, new.content, replace(c.user_id, '-', ''), new.conversation_id, new.id "
+    "FROM conversations AS c WHERE c.id = new.conversation_id; END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+    "DELETE FROM messages_fts WHERE rowid = old.rowid; END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN "
+    "UPDATE messages_fts SET content = new.content WHERE rowid = old.rowid; END",
+)
+
+BACKFILL = sa.text(
+    "INSERT INTO messages_fts (rowid, content, user_id, conversation_id, message_id) "
+    "SELECT m.rowid, m.content, replace(c.user_id, '-', ''), m.conversation_id, m.id "
+    "FROM messages AS m JOIN conversations AS c ON c.id = m.conversation_id "
+    "WHERE m.rowid > :low AND m.rowid <= :high "
+    # Rows written since the triggers went live are already indexed.
+    "AND NOT EXISTS (SELECT 1 FROM messages_fts AS f WHERE f.rowid = m.rowid)"
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    # Triggers first, so nothing written during the backfill is missed.
+    for statement in FTS_DDL:
+        op.execute(statement)
+
+    # Backfill existing history in rowid ranges, committing each batch so
+    # the app can keep writing while a large table is indexed.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        high = bind.execute(sa.text("SELECT coalesce(max(rowid), 0) FROM messages")).scalar()
+        low = 0
+        while low < high:
+            bind.execute(BACKFILL, {"low": low, "high": low + BATCH_ROWS})
+            low += BATCH_ROWS
+        # Merge the per-batch index segments for faster queries.
+        bind.execute(sa.text("INSERT INTO messages_fts (messages_fts) VALUES ('optimize')"))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in ("messages_fts_au", "messages_fts_ad", "messages_fts_ai"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS messages_fts")
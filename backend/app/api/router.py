@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import auth, chat, conversations, health, scalar
+from app.api.routes import auth, chat, conversations, health, ingest, scalar
 
 api_router = APIRouter(prefix="/api")
 
@@ -8,6 +8,7 @@ api_router.include_router(auth.router, prefix="/auth")
 api_router.include_router(chat.router)
 api_router.include_router(conversations.router)
 api_router.include_router(health.router, prefix="/health")
+api_router.include_router(ingest.router)
 # Scalar docs are already on /scalar; don't double-prefix with /api
 api_router.include_router(scalar.router)
 
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.deps import get_db
+from app.core.deps import get_async_db, get_db
 from app.core.security import (
+    ahash_password,
+    averify_password,
     create_access_token,
     decode_jwt,
-    hash_password,
-    verify_password,
+    needs_rehash,
 )
 from app.models.user import User
 from app.schemas.auth import LoginResponse, OAuthExchangeRequest, SignupRequest, UserProfile
@@ -22,17 +25,27 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
     response_model=LoginResponse,
     summary="Login",
 )
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not user.password_hash or not verify_password(form_data.password, user.password_hash):
+    # Async route: the KDF runs on its own pool, never on the request threadpool.
+    user = await db.scalar(select(User).where(User.email == form_data.username))
+    if (
+        not user
+        or not user.password_hash
+        or not await averify_password(form_data.password, user.password_hash)
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid email or password",
         )
 
+    # Upgrade hashes made under an older KDF policy while we have the password.
+    if needs_rehash(user.password_hash):
+        user.password_hash = await ahash_password(form_data.password)
+        await db.commit()
+
     token = create_access_token(user.id, user.email)
 
     return {
@@ -52,11 +65,11 @@ def login(
     status_code=status.HTTP_201_CREATED,
     summary="Signup",
 )
-def signup(
+async def signup(
     payload: SignupRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    existing = db.query(User).filter(User.email == payload.email).first()
+    existing = await db.scalar(select(User.id).where(User.email == payload.email))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -66,11 +79,10 @@ def signup(
     user = User(
         email=payload.email,
         full_name=payload.full_name,
-        password_hash=hash_password(payload.password),
+        password_hash=await ahash_password(payload.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
 
     return {
         "id": user.id,
@@ -1,29 +1,49 @@
 """Chat endpoints: REST, SSE streaming, and WebSocket."""
 
+import asyncio
 from datetime import datetime
 import json
-from typing import Generator
+import logging
+import uuid
+from typing import AsyncGenerator
 
+import anyio
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Request,
     WebSocket,
     WebSocketDisconnect,
     status,
 )
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-
-from app.core.database import SessionLocal
-from app.core.deps import get_db, get_current_user
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.streaming import coalesce
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.deps import get_async_db, get_current_user, rate_limit
+from app.core.history_cache import history_cache
+from app.core.metrics import WEBSOCKETS_OPEN, observe_stream
+from app.core.ratelimit import budget, get_rate_limiter
 from app.core.security import decode_jwt
-from app.engine import get_engine, ChatContext, HistoryMessage
+from app.engine import (
+    AsyncChatStream,
+    ChatContext,
+    HistoryMessage,
+    UpstreamError,
+    fit_history,
+    get_engine,
+)
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.schemas.query import QueryRequest, QueryResponse
 
 router = APIRouter(tags=["chat"])
+logger = logging.getLogger("app.chat")
 
 
 # ---------------------------------------------------------------------------
@@ -61,11 +81,11 @@ def _authenticate_ws_user(websocket: WebSocket) -> str | None:
     return str(user_id) if user_id else None
 
 
-def _get_or_create_conversation(
-    db: Session, user_id: str, conversation_id: str | None, title: str | None = None
+async def _get_or_create_conversation(
+    db: AsyncSession, user_id: str, conversation_id: str | None, title: str | None = None
 ) -> Conversation:
     if conversation_id:
-        conv = db.get(Conversation, conversation_id)
+        conv = await db.get(Conversation, conversation_id)
         if not conv or conv.user_id != user_id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -74,26 +94,39 @@ def _get_or_create_conversation(
         return conv
 
     # Reuse existing empty conversation (same idempotent rule as POST /conversations)
-    existing = (
-        db.query(Conversation)
-        .filter(Conversation.user_id == user_id, Conversation.status == "empty")
-        .first()
+    existing = await db.scalar(
+        select(Conversation)
+        .where(Conversation.user_id == user_id, Conversation.status == "empty")
+        .limit(1)
     )
     if existing:
         return existing
 
     conv = Conversation(user_id=user_id, title=title or "New conversation", status="empty")
     db.add(conv)
-    db.commit()
-    db.refresh(conv)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent turn (e.g. another request on the same socket) created
+        # the user's empty conversation first; the unique index kept one.
+        await db.rollback()
+        existing = await db.scalar(
+            select(Conversation)
+            .where(Conversation.user_id == user_id, Conversation.status == "empty")
+            .limit(1)
+        )
+        if existing:
+            return existing
+        raise
+    await db.refresh(conv)
     return conv
 
 
-def _activate_conversation(conv: Conversation, db: Session) -> None:
+async def _activate_conversation(conv: Conversation, db: AsyncSession) -> None:
     """Promote from 'empty' → 'active' on first user message."""
     if conv.status == "empty":
         conv.status = "active"
-        db.flush()
+        await db.flush()
 
 
 def _maybe_set_title_from_first_prompt(conv: Conversation, prompt: str) -> None:
@@ -117,17 +150,73 @@ def _maybe_set_title_from_first_prompt(conv: Conversation, prompt: str) -> None:
     conv.title = text[:40] + ("..." if len(text) > 40 else "")
 
 
-def _build_context(
-    user_id: str, conv: Conversation, limit: int = 20
-) -> ChatContext:
-    """Build a ChatContext from the persisted conversation history."""
-    recent = conv.messages[-limit:] if conv.messages else []
-    history = [HistoryMessage(role=m.role, content=m.content) for m in recent]
+async def _build_context(db: AsyncSession, user_id: str, conv: Conversation) -> ChatContext:
+    """Build a ChatContext from the tail of the persisted conversation history."""
+    recent = history_cache.get(conv.id)
+    if recent is None:
+        # Fetch only the newest rows (index-ordered, LIMIT n), never the whole thread.
+        rows = await db.execute(
+            select(Message.role, Message.content)
+            .where(Message.conversation_id == conv.id)
+            .order_by(Message.timestamp.desc(), Message.id.desc())
+            .limit(settings.history_max_messages)
+        )
+        recent = [HistoryMessage(role=role, content=content) for role, content in rows]
+        recent.reverse()
+        history_cache.put(conv.id, recent)
     return ChatContext(
         user_id=user_id,
         conversation_id=conv.id,
-        history=history,
+        history=fit_history(recent, settings.history_token_budget),
+    )
+
+
+async def _start_turn(
+    db: AsyncSession, user_id: str, conversation_id: str | None, question: str
+) -> tuple[Conversation, ChatContext]:
+    """Resolve the conversation, persist the user prompt and build the context."""
+    conv = await _get_or_create_conversation(db, user_id, conversation_id)
+    if conv.status == "empty":
+        # No messages yet: seed the cache so the first turn needs no history query.
+        history_cache.put(conv.id, [])
+
+    # Persist title from first prompt on backend
+    _maybe_set_title_from_first_prompt(conv, question)
+
+    # Promote empty → active on first user message
+    await _activate_conversation(conv, db)
+
+    # Persist user prompt
+    db.add(Message(conversation_id=conv.id, role="user", content=question))
+    await db.commit()
+    history_cache.append(conv.id, HistoryMessage(role="user", content=question))
+
+    ctx = await _build_context(db, user_id, conv)
+    return conv, ctx
+
+
+async def _save_answer(db: AsyncSession, conversation_id: str, content: str) -> None:
+    """Persist the assistant message and bump the conversation's updated_at."""
+    db.add(Message(conversation_id=conversation_id, role="assistant", content=content))
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(updated_at=datetime.utcnow())
     )
+    await db.commit()
+    history_cache.append(
+        conversation_id, HistoryMessage(role="assistant", content=content)
+    )
+
+
+async def _save_streamed_answer(
+    db: AsyncSession, conversation_id: str, stream: AsyncChatStream
+) -> None:
+    """Persist a streamed answer, including a partial one if it was stopped or failed."""
+    content = stream.text.strip()
+    if not content:
+        return  # stopped or failed before the first token: nothing worth keeping
+    await _save_answer(db, conversation_id, content)
 
 
 # ---------------------------------------------------------------------------
@@ -135,35 +224,28 @@ def _build_context(
 # ---------------------------------------------------------------------------
 
 
-@router.post("/query", response_model=QueryResponse, summary="Chat via REST")
-def query_chat(
+@router.post(
+    "/query",
+    response_model=QueryResponse,
+    summary="Chat via REST",
+    dependencies=[Depends(rate_limit("chat"))],
+)
+async def query_chat(
     payload: QueryRequest,
     user_id: str = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    conv = _get_or_create_conversation(db, user_id, payload.conversation_id)
-
-    # Persist title from first prompt on backend
-    _maybe_set_title_from_first_prompt(conv, payload.question)
-
-    # Promote empty → active on first user message
-    _activate_conversation(conv, db)
-
-    # Persist user message
-    db.add(Message(conversation_id=conv.id, role="user", content=payload.question))
-    db.flush()
+    conv, ctx = await _start_turn(db, user_id, payload.conversation_id, payload.question)
 
-    # Build context and call engine
-    ctx = _build_context(user_id, conv)
+    # Call engine
     engine = get_engine()
-    response = engine.answer(payload.question, ctx)
+    try:
+        response = await engine.aanswer(payload.question, ctx)
+    except UpstreamError as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
 
     # Persist assistant message
-    db.add(
-        Message(conversation_id=conv.id, role="assistant", content=response.content)
-    )
-    conv.updated_at = datetime.utcnow()
-    db.commit()
+    await _save_answer(db, conv.id, response.content)
 
     return QueryResponse(
         answer=response.content,
@@ -178,46 +260,53 @@ def query_chat(
 # ---------------------------------------------------------------------------
 
 
-@router.post("/stream", summary="Chat stream (SSE)")
-def stream_chat(
+@router.post("/stream", summary="Chat stream (SSE)", dependencies=[Depends(rate_limit("chat"))])
+async def stream_chat(
     payload: QueryRequest,
+    request: Request,
     user_id: str = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    conv = _get_or_create_conversation(db, user_id, payload.conversation_id)
-
-    # Persist title from first prompt on backend
-    _maybe_set_title_from_first_prompt(conv, payload.question)
-
-    # Promote empty → active on first user message
-    _activate_conversation(conv, db)
-
-    # Persist user prompt
-    db.add(Message(conversation_id=conv.id, role="user", content=payload.question))
-    db.commit()
-
-    ctx = _build_context(user_id, conv)
+    conv, ctx = await _start_turn(db, user_id, payload.conversation_id, payload.question)
     engine = get_engine()
 
-    def event_stream() -> Generator[str, None, None]:
-        full = ""
-        for chunk in engine.stream(payload.question, ctx):
-            full += chunk
-            yield f"data: {chunk}\n\n"
-
-        # Persist assistant message after streaming completes
-        db.add(
-            Message(
-                conversation_id=conv.id,
-                role="assistant",
-                content=full.strip(),
-            )
+    async def event_stream() -> AsyncGenerator[str, None]:
+        stream = engine.astream(payload.question, ctx)
+        frames = coalesce(
+            stream,
+            interval_ms=settings.sse_coalesce_ms,
+            max_bytes=settings.sse_coalesce_bytes,
         )
-        conv.updated_at = datetime.utcnow()
-        db.commit()
-
-        # Emit metadata from the engine response
-        resp = engine.last_response()
+        try:
+            async for chunk in frames:
+                yield f"data: {chunk}\n\n"
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client disconnected: stop generation and keep the partial answer.
+            # Starlette's cancellation is level-triggered, so shield the cleanup.
+            stream.cancel()
+            with anyio.CancelScope(shield=True):
+                await frames.aclose()
+                observe_stream("sse", stream)
+                async with AsyncSessionLocal() as session:
+                    await _save_streamed_answer(session, conv.id, stream)
+            raise
+        except UpstreamError as exc:
+            # The backend failed mid-answer: keep what arrived and say so.
+            observe_stream("sse", stream)
+            async with AsyncSessionLocal() as session:
+                await _save_streamed_answer(session, conv.id, stream)
+            yield "event: error\n"
+            yield f"data: {json.dumps({'error': str(exc), 'conversation_id': conv.id})}\n\n"
+            return
+        observe_stream("sse", stream)
+
+        # Persist assistant message after streaming completes.  The request's
+        # session may already be closed by now, so use a short-lived one.
+        async with AsyncSessionLocal() as session:
+            await _save_streamed_answer(session, conv.id, stream)
+
+        # Emit metadata from this call's engine response
+        resp = stream.response
         done_payload = {
             "conversation_id": conv.id,
             "mode": resp.mode,
@@ -226,7 +315,12 @@ def stream_chat(
         yield "event: done\n"
         yield f"data: {json.dumps(done_payload)}\n\n"
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    decision = getattr(request.state, "rate_limit", None)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=decision.headers() if decision else None,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -234,11 +328,150 @@ def stream_chat(
 # ---------------------------------------------------------------------------
 
 
+async def _send_ws(websocket: WebSocket, lock: asyncio.Lock, payload: dict) -> bool:
+    """
+    Send a frame, returning False instead of raising if the client is gone.
+
+    Every turn on a socket sends through the same lock.  ``asyncio.Lock``
+    wakes waiters in FIFO order, so concurrent streams take turns frame by
+    frame and one fast answer cannot starve the others.
+    """
+    try:
+        async with lock:
+            await websocket.send_json(payload)
+        return True
+    except (WebSocketDisconnect, RuntimeError, OSError):
+        return False
+
+
+async def _ws_turn(
+    websocket: WebSocket,
+    lock: asyncio.Lock,
+    engine,
+    user_id: str,
+    request_id: str,
+    question: str,
+    conversation_id: str | None,
+) -> None:
+    """
+    Run one question/answer turn over the socket.
+
+    Runs as its own task so the connection can keep reading (new questions,
+    ``stop``) while tokens stream.  Every frame carries ``request_id``.
+    Cancelling the task stops the engine stream, persists the partial
+    answer and sends ``done`` with ``"stopped": true``.  If the engine
+    fails mid-answer, the partial answer is persisted too and an
+    ``error`` frame ends the turn.
+
+    Database sessions are opened per step and closed while tokens stream,
+    so an open socket holds no pooled connection.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            conv, ctx = await _start_turn(db, user_id, conversation_id, question)
+    except HTTPException as exc:
+        detail = exc.detail if isinstance(exc.detail, str) else "Request failed"
+        await _send_ws(
+            websocket, lock, {"type": "error", "request_id": request_id, "content": detail}
+        )
+        return
+    except asyncio.CancelledError:
+        # Stopped before generation began.
+        await _send_ws(
+            websocket,
+            lock,
+            {
+                "type": "done",
+                "request_id": request_id,
+                "conversation_id": conversation_id,
+                "sources": [],
+                "mode": "stream",
+                "stopped": True,
+            },
+        )
+        return
+    except Exception:
+        # E.g. the database is locked: fail this turn, keep the socket.
+        logger.exception("chat turn failed to start")
+        await _send_ws(
+            websocket,
+            lock,
+            {"type": "error", "request_id": request_id, "content": "Request failed"},
+        )
+        return
+
+    stream = engine.astream(question, ctx)
+    frames = coalesce(
+        stream,
+        interval_ms=settings.ws_coalesce_ms,
+        max_bytes=settings.ws_coalesce_bytes,
+    )
+    failure: str | None = None
+    try:
+        async for chunk in frames:
+            token = {
+                "type": "token",
+                "request_id": request_id,
+                "content": chunk,
+                "mode": "stream",
+            }
+            if not await _send_ws(websocket, lock, token):
+                break  # client gone: stop generating
+    except asyncio.CancelledError:
+        pass
+    except UpstreamError as exc:
+        failure = str(exc)
+    except Exception:
+        logger.exception("chat engine failed mid-answer")
+        failure = "Answer generation failed"
+    finally:
+        await frames.aclose()
+
+    if failure is None and not stream.finished:
+        stream.cancel()
+    observe_stream("ws", stream)
+    async with AsyncSessionLocal() as db:
+        await _save_streamed_answer(db, conv.id, stream)
+
+    if failure is not None:
+        await _send_ws(
+            websocket,
+            lock,
+            {
+                "type": "error",
+                "request_id": request_id,
+                "conversation_id": conv.id,
+                "content": failure,
+            },
+        )
+        return
+
+    done = {
+        "type": "done",
+        "request_id": request_id,
+        "conversation_id": conv.id,
+        "sources": [],
+        "mode": "stream",
+    }
+    if stream.finished:
+        done.update(sources=stream.response.sources, mode=stream.response.mode)
+    if stream.cancelled:
+        done["stopped"] = True
+    await _send_ws(websocket, lock, done)
+
+
 @router.websocket("/ws/chat")
 async def chat_ws(websocket: WebSocket):
     """
     WebSocket chat that streams tokens from the active ChatEngine.
     Authentication is required via Bearer token or auth-token cookie.
+
+    One socket can run up to ``WS_MAX_CONCURRENT_GENERATIONS`` answers at
+    once.  Questions may carry a client ``request_id`` (one is assigned
+    otherwise) and every frame for that answer echoes it.  Send
+    ``{"type": "stop", "request_id": ...}`` to abort one answer, or omit
+    ``request_id`` to abort all of them; partial answers are kept and their
+    ``done`` frame carries ``"stopped": true``.
     """
     user_id = _authenticate_ws_user(websocket)
     if not user_id:
@@ -246,79 +479,78 @@ async def chat_ws(websocket: WebSocket):
         return
 
     await websocket.accept()
+    WEBSOCKETS_OPEN.inc()
     engine = get_engine()
-    db = SessionLocal()
+    lock = asyncio.Lock()
+    turns: dict[str, asyncio.Task] = {}
 
     try:
         while True:
             message = await websocket.receive_text()
             conversation_id: str | None = None
+            request_id: str | None = None
 
             try:
                 data = json.loads(message)
                 if isinstance(data, dict) and data.get("type") == "stop":
+                    target = data.get("request_id")
+                    for rid, task in list(turns.items()):
+                        if target is None or rid == str(target):
+                            task.cancel()
                     continue
                 if isinstance(data, dict):
                     question = str(data.get("question", ""))
                     conversation_id = data.get("conversation_id")
+                    if data.get("request_id") is not None:
+                        request_id = str(data["request_id"])
                 else:
                     question = str(data)
             except json.JSONDecodeError:
                 question = message
 
+            request_id = request_id or str(uuid.uuid4())
+            error: str | None = None
             if not question.strip():
-                await websocket.send_json(
-                    {"type": "error", "content": "Question is required"}
+                error = "Question is required"
+            elif request_id in turns:
+                error = "Duplicate request_id"
+            elif len(turns) >= settings.ws_max_concurrent_generations:
+                error = "Too many concurrent answers on this connection"
+            if error:
+                await _send_ws(
+                    websocket,
+                    lock,
+                    {"type": "error", "request_id": request_id, "content": error},
                 )
                 continue
-
-            try:
-                conv = _get_or_create_conversation(db, user_id, conversation_id)
-                _maybe_set_title_from_first_prompt(conv, question)
-                _activate_conversation(conv, db)
-
-                db.add(Message(conversation_id=conv.id, role="user", content=question))
-                db.commit()
-
-                ctx = _build_context(user_id, conv)
-                full = ""
-                for chunk in engine.stream(question, ctx):
-                    full += chunk
-                    await websocket.send_json(
+            if settings.rate_limit_enabled:
+                decision = await get_rate_limiter().acheck(budget("chat"), user_id)
+                if not decision.allowed:
+                    await _send_ws(
+                        websocket,
+                        lock,
                         {
-                            "type": "token",
-                            "content": chunk,
-                            "mode": "stream",
-                        }
+                            "type": "error",
+                            "request_id": request_id,
+                            "content": "Too many requests",
+                            "retry_after": round(decision.retry_after, 3),
+                        },
                     )
+                    continue
 
-                resp = engine.last_response()
-                db.add(
-                    Message(
-                        conversation_id=conv.id,
-                        role="assistant",
-                        content=full.strip(),
-                    )
+            task = asyncio.create_task(
+                _ws_turn(
+                    websocket, lock, engine, user_id, request_id, question, conversation_id
                 )
-                conv.updated_at = datetime.utcnow()
-                db.commit()
-
-                await websocket.send_json(
-                    {
-                        "type": "done",
-                        "conversation_id": conv.id,
-                        "sources": resp.sources,
-                        "mode": resp.mode,
-                    }
-                )
-            except HTTPException as exc:
-                db.rollback()
-                detail = exc.detail if isinstance(exc.detail, str) else "Request failed"
-                await websocket.send_json({"type": "error", "content": detail})
-            except Exception as exc:  # pragma: no cover
-                db.rollback()
-                await websocket.send_json({"type": "error", "content": str(exc)})
+            )
+            turns[request_id] = task
+            task.add_done_callback(lambda _, rid=request_id: turns.pop(rid, None))
     except WebSocketDisconnect:
         pass
     finally:
-        db.close()
+        # Client went away mid-answer: stop generating, keep partial answers.
+        WEBSOCKETS_OPEN.dec()
+        pending = list(turns.values())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -1,41 +1,50 @@
 """Conversation CRUD endpoints."""
 
-import time
-from collections import defaultdict
-from typing import List
+import html
+import re
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 
-from app.core.deps import get_db, get_current_user
+from app.core.config import settings
+from app.core.deps import get_db, get_read_db, get_current_user, rate_limit
+from app.core.history_cache import history_cache
+from app.core.pagination import keyset_paginate
+from app.core.ratelimit import budget, get_rate_limiter, rate_limit_exceeded
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.schemas.conversation import (
     ConversationCreate,
     ConversationListItem,
     ConversationOut,
+    ConversationPage,
     ConversationUpdate,
     MessageOut,
+    MessagePage,
+    MessageSearchHit,
 )
 
-router = APIRouter(prefix="/conversations", tags=["conversations"])
+router = APIRouter(
+    prefix="/conversations",
+    tags=["conversations"],
+    dependencies=[Depends(rate_limit("conversations"))],
+)
 
 # ---------------------------------------------------------------------------
-# Layer 3 – Temporal rate limiting (in-memory, per user)
+# Layer 3 – Temporal rate limiting (per user, shared store; app.core.ratelimit)
 # ---------------------------------------------------------------------------
-_NEW_CHAT_COOLDOWN = 3  # seconds
-_last_create_ts: dict[str, float] = defaultdict(float)
 
 
 def _check_rate_limit(user_id: str) -> None:
-    """Raise 429 if the user created a conversation too recently."""
-    now = time.monotonic()
-    if now - _last_create_ts[user_id] < _NEW_CHAT_COOLDOWN:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Too many new chats. Please wait a few seconds.",
-        )
-    _last_create_ts[user_id] = now
+    """Raise 429 if the user is creating conversations faster than the new_chat budget."""
+    if not settings.rate_limit_enabled:
+        return
+    decision = get_rate_limiter().check(budget("new_chat"), user_id)
+    if not decision.allowed:
+        raise rate_limit_exceeded(decision)
 
 
 # ---------------------------------------------------------------------------
@@ -45,7 +54,7 @@ def _check_rate_limit(user_id: str) -> None:
 
 def _conversation_out(conv: Conversation) -> ConversationOut:
     messages = [
-        MessageOut(role=m.role, content=m.content, timestamp=m.timestamp)
+        MessageOut(id=m.id, role=m.role, content=m.content, timestamp=m.timestamp)
         for m in conv.messages
     ]
     return ConversationOut(
@@ -58,6 +67,97 @@ def _conversation_out(conv: Conversation) -> ConversationOut:
     )
 
 
+def _list_items_query(user_id: str) -> Select:
+    """Sidebar columns for a user's conversations, with message counts."""
+    # The count is a correlated COUNT(*) answered from the
+    # messages(conversation_id, timestamp) index, so no message rows are read.
+    message_count = (
+        select(func.count())
+        .where(Message.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    return select(
+        Conversation.id,
+        Conversation.title,
+        Conversation.created_at,
+        Conversation.updated_at,
+        message_count.label("message_count"),
+    ).where(Conversation.user_id == user_id)
+
+
+# Search terms: words as the FTS5 unicode61 tokenizer sees them.
+_SEARCH_TERM_RE = re.compile(r"\w+")
+_SEARCH_MAX_TERMS = 16
+# Shorter prefixes expand to too many index terms to stay fast.
+_SEARCH_MIN_PREFIX = 3
+# Snippet delimiters that cannot occur in chat text; swapped for <mark>
+# after the snippet is HTML-escaped.
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+# Rank the caller's matches and cut the requested page in one query that
+# already joins messages (rowid) and conversations (primary key), so rows
+# failing the ownership re-check never take a slot on the page.  Snippets
+# are built afterwards, for that page only (CROSS JOIN keeps the page as the
+# outer loop, so each snippet is a rowid lookup in the index).  bm25 costs a few microseconds
+# per matching row, so only the newest :candidates matches (highest rowids,
+# found from the index alone) are ranked; a very common word stays fast for
+# users with huge histories.
+_SEARCH_SQL = text(
+    """
+    SELECT hit.message_id, hit.conversation_id, hit.conversation_title,
+           hit.role, hit.timestamp, hit.rank,
+           snippet(messages_fts, 0, char(2), char(3), '…', 16) AS snippet
+    FROM (
+        SELECT messages_fts.rowid AS rowid, messages_fts.rank AS rank,
+               m.id AS message_id, m.conversation_id, c.title AS conversation_title,
+               m.role, m.timestamp
+        FROM messages_fts
+        JOIN messages AS m ON m.rowid = messages_fts.rowid
+        JOIN conversations AS c ON c.id = m.conversation_id
+        WHERE messages_fts MATCH :match
+          AND messages_fts.rowid >= coalesce((
+              SELECT rowid FROM messages_fts
+              WHERE messages_fts MATCH :match
+              ORDER BY rowid DESC
+              LIMIT 1 OFFSET :candidates - 1
+          ), 0)
+          AND c.user_id = :user_id
+        ORDER BY messages_fts.rank
+        LIMIT :limit OFFSET :offset
+    ) AS hit
+    CROSS JOIN messages_fts ON messages_fts.rowid = hit.rowid
+    WHERE messages_fts MATCH :match
+    ORDER BY hit.rank
+    """
+)
+
+
+def _match_expression(query: str, user_id: str) -> str | None:
+    """
+    FTS5 query for ``query`` within the user's messages, or ``None``.
+
+    User input is reduced to quoted words (all required), so FTS5 operators
+    and quotes in it are matched literally instead of raising syntax errors.
+    The last word (if long enough) also matches as a prefix, for
+    search-as-you-type.
+    """
+    terms = _SEARCH_TERM_RE.findall(query)[:_SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+    words = [f'"{term}"' for term in terms]
+    if not query[-1].isspace() and len(terms[-1]) >= _SEARCH_MIN_PREFIX:
+        words[-1] += "*"
+    # Indexed without hyphens (one token); the query re-checks the real id.
+    owner = user_id.replace("-", "").replace('"', '""')
+    return f'user_id : "{owner}" AND content : ({" ".join(words)})'
+
+
+def _highlight(snippet: str) -> str:
+    escaped = html.escape(snippet)
+    return escaped.replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
 def _own_conversation(
     conversation_id: str, user_id: str, db: Session
 ) -> Conversation:
@@ -123,23 +223,101 @@ def create_conversation(
 )
 def list_conversations(
     user_id: str = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    convs = (
-        db.query(Conversation)
-        .filter(Conversation.user_id == user_id)
-        .order_by(Conversation.updated_at.desc())
-        .all()
+    rows = db.execute(
+        _list_items_query(user_id).order_by(Conversation.updated_at.desc())
+    )
+    return [ConversationListItem(**row._mapping) for row in rows]
+
+
+@router.get(
+    "/page",
+    response_model=ConversationPage,
+    summary="List conversations (cursor pagination)",
+)
+def list_conversations_page(
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = Query(None, description="Cursor: older conversations"),
+    after: Optional[str] = Query(None, description="Cursor: newer conversations"),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Keyset page ordered by ``updated_at`` (newest first), then ``id``."""
+    page = keyset_paginate(
+        db,
+        _list_items_query(user_id),
+        Conversation.updated_at,
+        Conversation.id,
+        limit=limit,
+        before=before,
+        after=after,
+        newest_first=True,
+    )
+    return ConversationPage(
+        items=[ConversationListItem(**row._mapping) for row in page.rows],
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
     )
+
+
+@router.get(
+    "/search",
+    response_model=List[MessageSearchHit],
+    summary="Search message history",
+)
+def search_messages(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Full-text search over the user's messages, most relevant (bm25) first.
+
+    Every word must match; the last one may be a prefix.  Uses the
+    ``messages_fts`` FTS5 index, so latency depends on how many of the
+    user's messages match, not on the size of the table; past
+    ``SEARCH_MAX_CANDIDATES`` matches only the newest are ranked.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Search requires the SQLite FTS5 index",
+        )
+    match = _match_expression(q, user_id)
+    if match is None:
+        return []
+    try:
+        rows = db.execute(
+            _SEARCH_SQL,
+            {
+                "match": match,
+                "limit": limit,
+                "offset": offset,
+                "candidates": settings.search_max_candidates,
+                "user_id": user_id,
+            },
+        ).all()
+    except OperationalError as exc:
+        if "no such table: messages_fts" not in str(exc):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search index missing; run the database migrations",
+        ) from exc
     return [
-        ConversationListItem(
-            id=c.id,
-            title=c.title,
-            created_at=c.created_at,
-            updated_at=c.updated_at,
-            message_count=len(c.messages),
+        MessageSearchHit(
+            message_id=row.message_id,
+            conversation_id=row.conversation_id,
+            conversation_title=row.conversation_title,
+            role=row.role,
+            snippet=_highlight(row.snippet),
+            timestamp=row.timestamp,
+            score=round(-row.rank, 4),
         )
-        for c in convs
+        for row in rows
     ]
 
 
@@ -151,12 +329,52 @@ def list_conversations(
 def get_conversation(
     conversation_id: str,
     user_id: str = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     conv = _own_conversation(conversation_id, user_id, db)
     return _conversation_out(conv)
 
 
+@router.get(
+    "/{conversation_id}/messages",
+    response_model=MessagePage,
+    summary="List messages (cursor pagination)",
+)
+def list_messages(
+    conversation_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = Query(None, description="Cursor: older messages"),
+    after: Optional[str] = Query(None, description="Cursor: newer messages"),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Keyset page of a conversation's messages in chronological order.
+
+    Without a cursor this returns the latest ``limit`` messages; pass
+    ``next_cursor`` back as ``before`` to load older history.
+    """
+    _own_conversation(conversation_id, user_id, db)
+    stmt = select(
+        Message.id, Message.role, Message.content, Message.timestamp
+    ).where(Message.conversation_id == conversation_id)
+    page = keyset_paginate(
+        db,
+        stmt,
+        Message.timestamp,
+        Message.id,
+        limit=limit,
+        before=before,
+        after=after,
+        newest_first=False,
+    )
+    return MessagePage(
+        items=[MessageOut(**row._mapping) for row in page.rows],
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
+    )
+
+
 @router.patch(
     "/{conversation_id}",
     response_model=ConversationOut,
@@ -189,3 +407,4 @@ def delete_conversation(
     conv = _own_conversation(conversation_id, user_id, db)
     db.delete(conv)
     db.commit()
+    history_cache.evict(conversation_id)
@@ -4,6 +4,10 @@ import time
 from fastapi import APIRouter
 
 from app.core.config import settings
+from app.core.history_cache import history_cache
+from app.core.ratelimit import get_rate_limiter
+from app.core.security import token_cache_stats
+from app.engine import engine_stats, get_ingestor
 
 router = APIRouter(tags=["health"])
 
@@ -15,11 +19,25 @@ START_TIME = time.monotonic()
     "/",
     summary="Health check",
 )
-def health_check():
-    return {
+async def health_check():
+    # Async so it is served on the event loop and never waits behind a
+    # saturated threadpool (e.g. a burst of sync DB requests).
+    body = {
         "status": "ok",
         "version": "0.1.0",
         "env": settings.env,
         "uptime": round(time.monotonic() - START_TIME, 3),
         "timestamp": datetime.now(timezone.utc).isoformat(),
+        "caches": {
+            "history": history_cache.stats(),
+            "jwt": token_cache_stats(),
+        },
     }
+    stats = engine_stats()
+    if stats:
+        body["engine"] = stats
+    if settings.ingest_enabled and get_ingestor() is not None:
+        body["ingest"] = get_ingestor().stats()
+    if settings.rate_limit_enabled:
+        body["rate_limit"] = get_rate_limiter().stats()
+    return body
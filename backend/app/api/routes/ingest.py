@@ -0,0 +1,164 @@
+"""
+Document ingestion endpoints: streaming upload and job status.
+
+Uploads go into the retrieval corpus every user searches, so only roles in
+``INGEST_ROLES`` may add documents.  They need ``RAG_STORE=mmap``: the
+other stores live in one worker's memory (``memory``) or are rewritten
+whole by whichever worker saves last (``ivf``).  Job status stays in the
+worker that accepted the upload.
+"""
+
+import os
+from pathlib import Path
+import queue
+import tempfile
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.deps import get_current_user
+from app.engine import get_ingestor
+from app.engine.retrieval import CORPUS_SUFFIXES, Ingestor
+from app.models.user import User
+from app.schemas.ingest import IngestJobOut
+
+router = APIRouter(prefix="/ingest", tags=["ingest"])
+
+# Upload bytes buffered in memory before each write to the spool file.
+_SPOOL_FLUSH_BYTES = 1 << 20
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _ingestor() -> Ingestor:
+    if not settings.ingest_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Document ingestion is disabled"
+        )
+    if settings.rag_store != "mmap":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Document ingestion requires RAG_STORE=mmap",
+        )
+    ingestor = get_ingestor()
+    if ingestor is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Retrieval is disabled; documents cannot be ingested",
+        )
+    return ingestor
+
+
+async def _ingest_user(user_id: str = Depends(get_current_user)) -> str:
+    """Current user, if their role may add documents to the shared corpus."""
+    # A short-lived session: a request-scoped one would hold its pooled
+    # connection and read snapshot open for the whole (possibly long) upload.
+    async with AsyncSessionLocal() as db:
+        role = await db.scalar(select(User.role).where(User.id == user_id))
+    if role not in settings.ingest_roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to ingest documents",
+        )
+    return user_id
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many ingestion jobs queued. Please retry later.",
+        headers={"Retry-After": "30"},
+    )
+
+
+async def _spool(request: Request) -> Path:
+    """
+    Copy the request body to a temporary file as it arrives.
+
+    At most ``_SPOOL_FLUSH_BYTES`` of the upload are held in memory; disk
+    writes run on a worker thread so the event loop keeps serving chats.
+    """
+    limit = settings.ingest_max_upload_bytes
+    fd, name = tempfile.mkstemp(prefix="ingest-", suffix=".upload", dir=settings.ingest_spool_dir)
+    path = Path(name)
+    size = 0
+    buffer = bytearray()
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            async for piece in request.stream():
+                size += len(piece)
+                if size > limit:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Documents are limited to {limit} bytes",
+                    )
+                buffer += piece
+                if len(buffer) >= _SPOOL_FLUSH_BYTES:
+                    await anyio.to_thread.run_sync(handle.write, buffer)
+                    buffer.clear()
+            if buffer:
+                await anyio.to_thread.run_sync(handle.write, buffer)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+
+@router.post(
+    "/documents",
+    response_model=IngestJobOut,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Upload a document to the retrieval corpus",
+)
+async def upload_document(
+    request: Request,
+    filename: str = Query(..., min_length=1, max_length=255),
+    user_id: str = Depends(_ingest_user),
+):
+    """
+    Send the raw file as the request body (any content type).  The upload is
+    streamed to disk and indexed in the background; poll the returned job.
+    """
+    ingestor = _ingestor()
+    if Path(filename).suffix.lower() not in CORPUS_SUFFIXES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Supported formats: {', '.join(sorted(CORPUS_SUFFIXES))}",
+        )
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.ingest_max_upload_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Documents are limited to {settings.ingest_max_upload_bytes} bytes",
+        )
+    # Refuse before reading the body rather than after spooling gigabytes.
+    if not ingestor.has_capacity():
+        raise _busy()
+
+    path = await _spool(request)
+    try:
+        job = ingestor.submit(path, filename, user_id)
+    except queue.Full:
+        path.unlink(missing_ok=True)
+        raise _busy()
+    return job.snapshot()
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJobOut, summary="Ingestion job status")
+async def get_job(job_id: str, user_id: str = Depends(get_current_user)):
+    ingestor = _ingestor()
+    job = ingestor.get(job_id)
+    if job is None or job.owner != user_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job.snapshot()
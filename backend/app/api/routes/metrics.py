@@ -0,0 +1,14 @@
+"""Prometheus scrape endpoint."""
+
+from fastapi import APIRouter, Response
+
+from app.core.metrics import render
+
+router = APIRouter(tags=["system"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> Response:
+    # Sync, so rendering a large exposition runs in the threadpool.
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,147 @@
+"""
+Small in-process LRU cache with per-entry TTL and a size budget.
+
+Thread-safe, so it can be shared by async routes and threadpool workers.
+Everything is O(1) per operation: an ``OrderedDict`` keeps recency order,
+and expired entries are dropped lazily when they are read or reach the
+LRU end.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+import time
+from typing import Callable, Generic, Hashable, NamedTuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Entry(NamedTuple):
+    value: object
+    expires_at: float
+    weight: int
+
+
+class TTLCache(Generic[K, V]):
+    """
+    LRU cache bounded by entry count and, optionally, total weight.
+
+    ``weigh(value)`` estimates an entry's size (e.g. bytes of text); when the
+    total exceeds ``max_weight``, least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        *,
+        max_weight: int | None = None,
+        weigh: Callable[[V], int] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self._weigh = weigh or (lambda value: 1)
+        self._clock = clock
+        self._data: OrderedDict[K, _Entry] = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry.value  # type: ignore[return-value]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Store ``value``; ``ttl`` overrides the cache default for this entry."""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def update(self, key: K, fn: Callable[[V], V]) -> bool:
+        """
+        Atomically replace a live entry with ``fn(value)``.
+
+        Returns ``False`` (and does nothing) when the key is absent or
+        expired.  Used for write-through appends that must not race.
+        """
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return False
+            remaining = entry.expires_at - self._clock()
+            self._store(key, fn(entry.value), remaining)  # type: ignore[arg-type]
+            return True
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return None
+            self._weight -= entry.weight
+            return entry.value  # type: ignore[return-value]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def weight(self) -> int:
+        return self._weight
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "weight": self._weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    # -- internals (caller holds the lock) ---------------------------------
+
+    def _live_entry(self, key: K) -> _Entry | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._clock():
+            del self._data[key]
+            self._weight -= entry.weight
+            self.expirations += 1
+            return None
+        return entry
+
+    def _store(self, key: K, value: V, ttl: float | None) -> None:
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._weight -= old.weight
+        weight = self._weigh(value)
+        if self.max_weight is not None and weight > self.max_weight:
+            return  # would evict everything else and still not fit
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        self._data[key] = _Entry(value, expires_at, weight)
+        self._weight += weight
+        while len(self._data) > self.maxsize or (
+            self.max_weight is not None and self._weight > self.max_weight
+        ):
+            _, evicted = self._data.popitem(last=False)
+            self._weight -= evicted.weight
+            self.evictions += 1
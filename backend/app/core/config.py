@@ -1,4 +1,5 @@
 import json
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,6 +18,151 @@ class Settings(BaseSettings):
     # Optional regex for origin matching (e.g. https://.*\.vercel\.app)
     allowed_origin_regex: str | None = None
     database_url: str = "sqlite:///./privia.db"
+    # Async driver URL for the AsyncEngine; derived from database_url when unset
+    # (sqlite:// → sqlite+aiosqlite://, postgresql:// → postgresql+asyncpg://).
+    async_database_url: str | None = None
+    # Connection pool tuning, applied to both the sync and async engines.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # seconds; -1 disables
+    db_pool_pre_ping: bool = True
+    # Optional separate URL for read-only traffic (e.g. a replica). The read pool
+    # uses database_url when unset; on SQLite its connections are query_only.
+    database_read_url: str | None = None
+    db_read_pool_size: int = 10
+    # SQLite performance profile, applied to every new connection.
+    sqlite_journal_mode: Literal["wal", "delete", "truncate", "persist", "memory", "off"] = "wal"
+    sqlite_synchronous: Literal["off", "normal", "full", "extra"] = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 268_435_456  # bytes; 0 disables memory-mapped I/O
+    sqlite_cache_size: int = -65_536  # negative = KiB (64 MiB), positive = pages
+    sqlite_temp_store: Literal["default", "file", "memory"] = "memory"
+    # Chat engine backend: "stub" (canned answers) or "openai" (any
+    # OpenAI-compatible /chat/completions server: vLLM, Ollama, llama.cpp, ...).
+    engine_backend: Literal["stub", "openai"] = "stub"
+    inference_base_url: str = "http://localhost:8001/v1"
+    inference_api_key: str | None = None
+    inference_model: str = "default"
+    inference_max_tokens: int | None = None
+    # Shared HTTP client: timeouts, connection pool and keep-alive. HTTP/2 is
+    # only negotiated on https URLs and needs the h2 package.
+    inference_connect_timeout: float = 5.0
+    inference_read_timeout: float = 60.0  # max gap between streamed chunks
+    inference_max_connections: int = 100
+    inference_max_keepalive: int = 20
+    inference_keepalive_expiry: float = 30.0  # seconds
+    inference_http2: bool = True
+    # Retries before the first token (connect errors, timeouts, 429/5xx),
+    # with exponential backoff and full jitter; Retry-After is honoured.
+    inference_max_retries: int = 2
+    inference_retry_backoff: float = 0.25  # seconds, doubled per attempt
+    # Micro-batching: concurrent requests are grouped into one engine call of up
+    # to *_max_size prompts, waiting at most *_max_wait_ms (max_size 1 disables).
+    engine_batch_max_size: int = 1
+    engine_batch_max_wait_ms: float = 10.0
+    engine_batch_max_concurrency: int = 4  # batches in flight at once
+    # Retrieval-augmented generation over a local corpus of text files. The
+    # top ChatContext.top_k chunks scoring at least rag_min_score are added
+    # to the prompt and returned as sources.
+    rag_enabled: bool = False
+    rag_corpus_path: str | None = None  # directory of .txt/.md/.rst files
+    rag_embedding_dim: int = 384
+    rag_chunk_chars: int = 800
+    rag_chunk_overlap: int = 100
+    rag_min_score: float = 0.1  # cosine similarity
+    # "memory" re-embeds the corpus in every worker at startup; "mmap" keeps
+    # vectors in rag_store_path, built once and shared via the page cache;
+    # "ivf" is an approximate index saved to rag_store_path (large corpora).
+    rag_store: Literal["memory", "mmap", "ivf"] = "memory"
+    rag_store_path: str = "./vectors"
+    # float16 halves disk/page cache but makes search CPU several times higher.
+    rag_store_dtype: Literal["float16", "float32"] = "float32"
+    # Background merge of append-only segments once this many accumulate.
+    rag_compact_min_segments: int = 8
+    rag_compact_interval: float = 60.0  # seconds
+    # IVF index: clusters, clusters probed per query (recall vs latency) and
+    # product-quantization sub-spaces (0 stores full vectors).
+    rag_ivf_nlist: int = 1024
+    rag_ivf_nprobe: int = 16
+    rag_ivf_pq_m: int = 0
+    # Document uploads (POST /api/ingest/documents; needs rag_enabled). Files
+    # are spooled to ingest_spool_dir (default: system temp dir), then read,
+    # chunked and embedded in batches on a pool of ingest_workers processes
+    # (0 embeds on the ingest thread). Uploads beyond ingest_max_queued_jobs
+    # waiting jobs are refused with 503. The corpus is shared by every user,
+    # so only users whose role is in ingest_roles may upload, and uploads
+    # need rag_store="mmap", the one store all workers see and persist.
+    ingest_enabled: bool = False
+    ingest_roles: list[str] = ["admin"]
+    ingest_workers: int = 2
+    ingest_max_queued_jobs: int = 8
+    ingest_embed_batch_size: int = 256
+    ingest_max_upload_bytes: int = 8 * 1024**3
+    ingest_spool_dir: str | None = None
+    # Cache of complete answers keyed on normalized question, prior history,
+    # model and temperature. The key ignores the user, so only enable it when
+    # answers do not depend on per-user data. The optional SQLite file is
+    # shared by workers and survives restarts.
+    response_cache_enabled: bool = False
+    response_cache_size: int = 1024
+    response_cache_ttl: float = 3600.0  # seconds
+    response_cache_max_temperature: float = 0.3  # hotter requests bypass the cache
+    response_cache_path: str | None = None
+    response_cache_replay_delay_ms: float = 0.0  # pause between replayed chunks
+    # Upper bound on threads used to run blocking (sync-only) chat engines.
+    engine_max_threads: int = 32
+    # Streaming token coalescing: buffered tokens are flushed every *_ms or once
+    # *_bytes accumulate (0 ms disables). The first token is always sent at once.
+    sse_coalesce_ms: float = 50.0
+    sse_coalesce_bytes: int = 1024
+    ws_coalesce_ms: float = 50.0
+    ws_coalesce_bytes: int = 1024
+    # Concurrent answers one WebSocket connection may stream (multiplexed by request_id).
+    ws_max_concurrent_generations: int = 4
+    # History window handed to the engine: at most this many recent messages,
+    # further trimmed (oldest first) to fit the estimated token budget.
+    history_max_messages: int = 20
+    history_token_budget: int = 4000
+    # In-process cache of each conversation's history tail (write-through).
+    # The TTL bounds staleness when several workers serve the same user.
+    history_cache_max_conversations: int = 1024
+    history_cache_max_bytes: int = 32 * 1024 * 1024
+    history_cache_ttl: float = 300.0  # seconds
+    # Per-user rate limits (GCRA): each budget allows *_burst requests at once,
+    # refilled at *_per_minute. "chat" covers /query, /stream and WebSocket
+    # questions; "new_chat" creating conversations; "conversations" every
+    # conversation endpoint. The memory store is per worker; "sqlite" shares
+    # state between workers on one host, "redis" between hosts (needs the
+    # redis package).
+    rate_limit_enabled: bool = True
+    rate_limit_store: Literal["memory", "sqlite", "redis"] = "memory"
+    rate_limit_max_keys: int = 100_000  # memory store; least recently used evicted
+    rate_limit_sqlite_path: str = "./ratelimit.db"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_chat_per_minute: float = 30.0
+    rate_limit_chat_burst: int = 10
+    rate_limit_new_chat_per_minute: float = 20.0
+    rate_limit_new_chat_burst: int = 1
+    rate_limit_conversations_per_minute: float = 600.0
+    rate_limit_conversations_burst: int = 120
+    # Prometheus metrics on GET /metrics: per-route HTTP latency and status,
+    # database query timing and counts. Streaming metrics (time to first
+    # token, tokens/sec, open WebSockets) are always recorded.
+    metrics_enabled: bool = True
+    # Message search ranks (bm25) at most this many of the newest matches.
+    search_max_candidates: int = 5000
+    # Verified JWT cache; entries never outlive the token's own exp claim.
+    jwt_cache_size: int = 10_000
+    jwt_cache_ttl: float = 300.0  # seconds
+    # Password KDF policy for new hashes; older hashes are upgraded on login.
+    password_kdf: Literal["pbkdf2_sha256", "scrypt"] = "pbkdf2_sha256"
+    password_pbkdf2_iterations: int = 100_000
+    password_scrypt_n: int = 2**14
+    password_scrypt_r: int = 8
+    password_scrypt_p: int = 1
+    # Threads dedicated to password hashing (roughly one per core you can spare).
+    password_hash_workers: int = 4
 
     @property
     def allowed_origins_list(self) -> list[str]:
@@ -1,18 +1,124 @@
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from app.core.config import settings
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.config import Settings, settings
 
-engine = create_engine(settings.database_url, future=True)
+# Sync driver → async driver used when ASYNC_DATABASE_URL is not set.
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
 
-# Enable FK cascade behavior in SQLite (required for ondelete to work)
-if engine.url.drivername.startswith("sqlite"):
-    @event.listens_for(engine, "connect")
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _async_url(sync_url: str) -> URL:
+    if settings.async_database_url:
+        return make_url(settings.async_database_url)
+    url = make_url(sync_url)
+    driver = _ASYNC_DRIVERS.get(url.drivername)
+    return url.set(drivername=driver) if driver else url
+
+
+def _pool_options(url: URL, pool_size: int | None = None) -> dict:
+    """Pool tuning from Settings; in-memory SQLite keeps its single-connection pool."""
+    if _is_memory_sqlite(url):
+        return {}
+    options = {
+        "pool_size": pool_size or settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    # aiosqlite defaults to NullPool (a new connection per checkout); pool explicitly.
+    if url.get_backend_name() == "sqlite" and url.get_driver_name() == "aiosqlite":
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return options
+
+
+def sqlite_pragmas(
+    profile: Settings = settings, *, read_only: bool = False, in_memory: bool = False
+) -> list[str]:
+    """
+    PRAGMA statements for a new SQLite connection.
+
+    WAL lets readers proceed while a writer commits, and ``busy_timeout``
+    makes writers wait for the lock instead of failing with "database is
+    locked".  ``synchronous=NORMAL`` is durable under WAL except for the
+    last transactions before a power loss.
+    """
+    pragmas = [
+        # Enable FK cascade behavior in SQLite (required for ondelete to work)
+        "PRAGMA foreign_keys=ON",
+        f"PRAGMA busy_timeout={int(profile.sqlite_busy_timeout_ms)}",
+        f"PRAGMA synchronous={profile.sqlite_synchronous.upper()}",
+        f"PRAGMA cache_size={int(profile.sqlite_cache_size)}",
+        f"PRAGMA temp_store={profile.sqlite_temp_store.upper()}",
+    ]
+    if not in_memory:
+        # journal_mode is persisted in the file; mmap is meaningless in memory.
+        pragmas.append(f"PRAGMA journal_mode={profile.sqlite_journal_mode.upper()}")
+        pragmas.append(f"PRAGMA mmap_size={int(profile.sqlite_mmap_size)}")
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def install_sqlite_pragmas(
+    target: Engine, profile: Settings = settings, *, read_only: bool = False
+) -> None:
+    """Apply :func:`sqlite_pragmas` to every connection ``target`` opens."""
+    if target.url.get_backend_name() != "sqlite":
+        return
+    statements = sqlite_pragmas(
+        profile, read_only=read_only, in_memory=_is_memory_sqlite(target.url)
+    )
+
+    @event.listens_for(target, "connect")
     def _set_sqlite_pragma(dbapi_connection, connection_record):
         cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
+        for statement in statements:
+            cursor.execute(statement)
         cursor.close()
 
+
+_sync_url = make_url(settings.database_url)
+engine = create_engine(_sync_url, future=True, **_pool_options(_sync_url))
+
+_async_db_url = _async_url(settings.database_url)
+async_engine = create_async_engine(_async_db_url, **_pool_options(_async_db_url))
+
+install_sqlite_pragmas(engine)
+install_sqlite_pragmas(async_engine.sync_engine)
+
+# Separate pool for read-heavy endpoints (conversation list/get), so reads
+# never queue behind chat writes for a connection.
+_read_url = make_url(settings.database_read_url or settings.database_url)
+if _is_memory_sqlite(_read_url):
+    # A private in-memory database would be empty; share the write engine.
+    read_engine = engine
+else:
+    read_engine = create_engine(
+        _read_url, future=True, **_pool_options(_read_url, settings.db_read_pool_size)
+    )
+    install_sqlite_pragmas(read_engine, read_only=True)
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+
+# expire_on_commit=False: async code cannot lazy-load attributes after a commit.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 
 class Base(DeclarativeBase):
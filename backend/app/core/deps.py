@@ -1,7 +1,12 @@
-from fastapi import Depends, Request
+from typing import AsyncIterator, Awaitable, Callable
+
+from fastapi import Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import SessionLocal
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, ReadSessionLocal, SessionLocal
+from app.core.ratelimit import budget, get_rate_limiter, rate_limit_exceeded
 from app.core.security import get_current_user_id
 
 
@@ -13,6 +18,43 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Session on the read-only pool, for endpoints that never write."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def get_current_user(request: Request) -> str:
     """FastAPI dependency to return authenticated user's id from Bearer token."""
     return get_current_user_id(request)
+
+
+def rate_limit(name: str) -> Callable[..., Awaitable[None]]:
+    """
+    Dependency enforcing the per-user ``name`` budget (see app.core.ratelimit).
+
+    Sets ``RateLimit-*`` headers on the response, or raises 429 with
+    ``Retry-After``.  Routes that return their own ``Response`` object must
+    copy ``request.state.rate_limit.headers()`` onto it.
+    """
+
+    async def check(
+        request: Request, response: Response, user_id: str = Depends(get_current_user)
+    ) -> None:
+        if not settings.rate_limit_enabled:
+            return
+        decision = await get_rate_limiter().acheck(budget(name), user_id)
+        if not decision.allowed:
+            raise rate_limit_exceeded(decision)
+        request.state.rate_limit = decision
+        response.headers.update(decision.headers())
+
+    return check
@@ -0,0 +1,77 @@
+"""
+Hot cache of recent conversation history, keyed by conversation id.
+
+Users typically send several messages a minute to the same conversation,
+so the chat routes keep the history tail in memory and update it
+write-through as they persist messages.  A repeated turn then skips the
+history query entirely.
+
+The cache is per process.  Writes made by another worker are not seen
+until the entry expires, so the TTL bounds staleness in multi-worker
+deployments.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.engine.context import HistoryMessage
+
+History = Tuple[HistoryMessage, ...]
+
+# Per-message bookkeeping on top of the text itself (object + tuple slot).
+_MESSAGE_OVERHEAD_BYTES = 100
+
+
+def _weigh(history: History) -> int:
+    return sum(len(m.content) + _MESSAGE_OVERHEAD_BYTES for m in history)
+
+
+class HistoryCache:
+    """Write-through LRU/TTL cache of the last ``max_messages`` per conversation."""
+
+    def __init__(
+        self, max_messages: int, max_conversations: int, max_bytes: int, ttl: float
+    ) -> None:
+        self.max_messages = max_messages
+        self._cache: TTLCache[str, History] = TTLCache(
+            max_conversations, ttl, max_weight=max_bytes, weigh=_weigh
+        )
+
+    def get(self, conversation_id: str) -> History | None:
+        return self._cache.get(conversation_id)
+
+    def put(self, conversation_id: str, messages: Sequence[HistoryMessage]) -> None:
+        """Store the history tail loaded from the database."""
+        self._cache.set(conversation_id, tuple(messages[-self.max_messages :]))
+
+    def append(self, conversation_id: str, *messages: HistoryMessage) -> None:
+        """
+        Write-through for newly persisted messages.
+
+        Only updates conversations already cached; a miss is left for the
+        next read to load from the database.
+        """
+        self._cache.update(
+            conversation_id,
+            lambda history: (history + messages)[-self.max_messages :],
+        )
+
+    def evict(self, conversation_id: str) -> None:
+        self._cache.pop(conversation_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+history_cache = HistoryCache(
+    max_messages=settings.history_max_messages,
+    max_conversations=settings.history_cache_max_conversations,
+    max_bytes=settings.history_cache_max_bytes,
+    ttl=settings.history_cache_ttl,
+)
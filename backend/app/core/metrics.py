@@ -0,0 +1,187 @@
+"""
+Prometheus metrics: HTTP, database and streaming.
+
+- :class:`MetricsMiddleware` (pure ASGI, so it never buffers a streamed
+  body) times every HTTP request until its last byte is sent, labelled
+  by route template.  It also counts requests in flight and the database
+  queries each request ran.
+- :func:`instrument_engine` times every query on an SQLAlchemy engine
+  through cursor events.
+- :func:`observe_stream` records time-to-first-token, tokens/sec and
+  duration of a finished SSE or WebSocket answer from the timestamps
+  the stream handle keeps.
+
+Recording is a few dictionary lookups and a bisect per observation.
+With several worker processes, set ``PROMETHEUS_MULTIPROC_DIR`` to an
+empty directory shared by the workers and ``/metrics`` aggregates them.
+"""
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Requests that match no route share one label, so scanners probing random
+# paths cannot grow the series count.
+UNMATCHED_ROUTE = "<unmatched>"
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+HTTP_REQUESTS = Counter(
+    "privia_http_requests_total", "HTTP requests by route and status.", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "privia_http_request_duration_seconds",
+    "Time until the last response byte (whole stream for SSE).",
+    ["method", "route"],
+    buckets=_LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "privia_http_requests_in_flight", "HTTP requests being served.", multiprocess_mode="livesum"
+)
+HTTP_DB_QUERIES = Histogram(
+    "privia_http_db_queries_per_request",
+    "Database queries run while serving one request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_LATENCY = Histogram(
+    "privia_db_query_duration_seconds",
+    "Database query execution time (count = queries run).",
+    ["pool"],
+    buckets=_DB_BUCKETS,
+)
+STREAM_TTFT = Histogram(
+    "privia_stream_time_to_first_token_seconds",
+    "From starting generation to the first token.",
+    ["transport"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 30),
+)
+STREAM_TOKENS_PER_SECOND = Histogram(
+    "privia_stream_tokens_per_second",
+    "Generation rate after the first token.",
+    ["transport"],
+    buckets=(5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500, 1000),
+)
+STREAM_DURATION = Histogram(
+    "privia_stream_duration_seconds",
+    "From starting generation to the last token.",
+    ["transport", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+STREAM_TOKENS = Counter(
+    "privia_stream_tokens_total", "Tokens streamed to clients.", ["transport"]
+)
+WEBSOCKETS_OPEN = Gauge(
+    "privia_websocket_connections", "Open chat WebSocket connections.", multiprocess_mode="livesum"
+)
+
+# Query counter of the request being served; sync routes see it too, since
+# the threadpool copies the context.
+_request_queries: ContextVar[list[int] | None] = ContextVar("request_queries", default=None)
+_pool_observers: dict[Engine, object] = {}
+
+
+class MetricsMiddleware:
+    """Records latency, status, in-flight count and DB queries per HTTP request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        queries = [0]
+        reset = _request_queries.set(queries)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            _request_queries.reset(reset)
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method, path, str(status)).inc()
+            HTTP_LATENCY.labels(method, path).observe(elapsed)
+            HTTP_DB_QUERIES.labels(path).observe(queries[0])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    observer = _pool_observers.get(conn.engine)
+    if observer is not None:
+        observer.observe(time.perf_counter() - started)
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def instrument_engine(target: Engine, pool: str) -> None:
+    """Time every query ``target`` runs under ``pool``; safe to call twice."""
+    _pool_observers[target] = DB_LATENCY.labels(pool)
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+def observe_stream(transport: str, stream) -> None:
+    """Record a finished, stopped or failed :class:`~app.engine.AsyncChatStream`."""
+    end = stream.finished_at or time.perf_counter()
+    if stream.cancelled:
+        outcome = "stopped"
+    else:
+        outcome = "completed" if stream.finished else "failed"
+    STREAM_DURATION.labels(transport, outcome).observe(end - stream.started_at)
+    first = stream.first_token_at
+    if first is None:
+        return
+    tokens = stream.chunk_count
+    STREAM_TTFT.labels(transport).observe(first - stream.started_at)
+    STREAM_TOKENS.labels(transport).inc(tokens)
+    if tokens > 1 and end > first:
+        STREAM_TOKENS_PER_SECOND.labels(transport).observe((tokens - 1) / (end - first))
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition body and content type for every worker's metrics."""
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,98 @@
+"""
+Keyset (cursor) pagination over a ``(timestamp, id)`` sort key.
+
+Cursors are opaque to clients: URL-safe base64 of ``[iso_timestamp, id]``.
+Each page is a single indexed range query (``WHERE key < cursor ORDER BY key
+LIMIT n``), so latency and payload stay flat however deep the client pages,
+unlike ``OFFSET`` which re-reads every skipped row.
+"""
+
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+import json
+from typing import Any, NamedTuple, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.orm import Session
+
+
+class Page(NamedTuple):
+    rows: Sequence[Any]
+    next_cursor: str | None
+    prev_cursor: str | None
+
+
+def encode_cursor(ts: datetime, row_id: str) -> str:
+    raw = json.dumps([ts.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(ts), str(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+
+
+def keyset_paginate(
+    db: Session,
+    stmt: Select,
+    ts_col,
+    id_col,
+    *,
+    limit: int,
+    before: str | None = None,
+    after: str | None = None,
+    newest_first: bool = True,
+) -> Page:
+    """
+    Fetch one page of ``stmt`` ordered by ``(ts_col, id_col)``.
+
+    ``before`` pages towards older rows, ``after`` towards newer ones; with
+    neither, the page starts at the newest row.  Rows come back in display
+    order (newest first when ``newest_first``, chronological otherwise).
+    ``next_cursor`` continues in the same direction and is ``None`` once the
+    end is reached; ``prev_cursor`` points back the other way.
+    """
+    if before and after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either 'before' or 'after', not both",
+        )
+
+    ts_key, id_key = ts_col.key, id_col.key
+    towards_newer = after is not None
+    if towards_newer:
+        ts, row_id = decode_cursor(after)
+        # ts >= cursor narrows the index range; the OR breaks timestamp ties.
+        stmt = stmt.where(ts_col >= ts, or_(ts_col > ts, id_col > row_id))
+        stmt = stmt.order_by(ts_col.asc(), id_col.asc())
+    else:
+        if before is not None:
+            ts, row_id = decode_cursor(before)
+            stmt = stmt.where(and_(ts_col <= ts, or_(ts_col < ts, id_col < row_id)))
+        stmt = stmt.order_by(ts_col.desc(), id_col.desc())
+
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    def cursor(row) -> str:
+        mapping = row._mapping
+        return encode_cursor(mapping[ts_key], mapping[id_key])
+
+    next_cursor = cursor(rows[-1]) if has_more else None
+    prev_cursor = cursor(rows[0]) if rows else None
+
+    # Rows are in travel order; flip them when that differs from display order.
+    if towards_newer == newest_first:
+        rows = list(reversed(rows))
+    return Page(rows=rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
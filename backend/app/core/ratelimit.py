@@ -0,0 +1,315 @@
+"""
+Per-user rate limiting with GCRA (the generic cell rate algorithm).
+
+GCRA behaves like a token bucket holding ``burst`` tokens refilled at
+``per_minute``, but its whole state is one number per key: the
+theoretical arrival time (TAT) at which the bucket would be full again.
+A check is a read-compare-write of that number, so it is cheap in memory
+and a single atomic statement in SQLite or a short script in Redis::
+
+    tat      = max(stored_tat, now)
+    new_tat  = tat + interval                  # interval = 60 / per_minute
+    allowed  = new_tat - burst * interval <= now
+
+Budgets are named per route group (``chat``, ``new_chat``,
+``conversations``) and read from settings on every check, and keys are
+``<budget>:<user_id>``.  Three stores share the same interface:
+
+- ``memory``: per process, bounded LRU (fine for one worker).
+- ``sqlite``: one file shared by every worker on the host.
+- ``redis``: any Redis-protocol server with Lua scripting, shared by
+  every host (needs the ``redis`` package).
+
+A key whose TAT has passed is indistinguishable from a new one, so every
+store lets entries expire at their TAT.  When a shared store fails the
+request is allowed and the error counted: an outage of the limiter
+should not take the chat down with it.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+import logging
+import math
+import sqlite3
+import threading
+import time
+from typing import Callable, Protocol
+
+import anyio
+from fastapi import HTTPException, status
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger("app.ratelimit")
+
+# Prune passed SQLite rows once every this many writes.
+_PRUNE_EVERY = 1024
+_REDIS_PREFIX = "privia:ratelimit:"
+
+# KEYS[1] = bucket; ARGV = now, interval, capacity (seconds).  Floats go
+# back as strings: Lua numbers are truncated to integers in replies.
+_GCRA_LUA = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - capacity > now then
+  return {0, tostring(tat)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat)}
+"""
+
+
+@dataclass(frozen=True)
+class Budget:
+    """``burst`` requests at once, refilled at ``per_minute``."""
+
+    name: str
+    per_minute: float
+    burst: int
+
+    @property
+    def interval(self) -> float:
+        return 60.0 / self.per_minute
+
+    @property
+    def capacity(self) -> float:
+        return self.interval * self.burst
+
+
+def budget(name: str) -> Budget:
+    """The ``rate_limit_<name>_*`` budget from the current settings."""
+    return Budget(
+        name,
+        getattr(settings, f"rate_limit_{name}_per_minute"),
+        getattr(settings, f"rate_limit_{name}_burst"),
+    )
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until the next request is allowed (0 if allowed)
+    reset_after: float  # seconds until the full burst is available again
+
+    def headers(self) -> dict[str, str]:
+        """``RateLimit-*`` headers (IETF draft), plus ``Retry-After`` when denied."""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def rate_limit_exceeded(decision: RateLimitDecision) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Too many requests. Please retry in {max(1, math.ceil(decision.retry_after))} s.",
+        headers=decision.headers(),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Stores
+# ---------------------------------------------------------------------------
+
+
+class RateLimitStore(Protocol):
+    name: str
+    # Whether acquire() may block on I/O (then async callers use a thread).
+    blocking: bool
+
+    def acquire(
+        self, key: str, now: float, interval: float, capacity: float
+    ) -> tuple[bool, float]:
+        """Atomically apply one GCRA step; returns (allowed, resulting TAT)."""
+        ...
+
+    def close(self) -> None: ...
+
+
+class MemoryStore:
+    """Per-process TATs in an LRU; entries expire once their TAT passes."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self._tats: TTLCache[str, float] = TTLCache(max_keys, ttl=0.0)
+        self._lock = threading.Lock()
+
+    def acquire(
+        self, key: str, now: float, interval: float, capacity: float
+    ) -> tuple[bool, float]:
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + interval
+            if new_tat - capacity > now:
+                return False, tat
+            self._tats.set(key, new_tat, ttl=new_tat - now)
+            return True, new_tat
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def close(self) -> None:
+        self._tats.clear()
+
+
+class SQLiteStore:
+    """TATs in a SQLite file shared by every worker on the host."""
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def acquire(
+        self, key: str, now: float, interval: float, capacity: float
+    ) -> tuple[bool, float]:
+        with self._lock:
+            # One statement, so concurrent workers cannot interleave the
+            # read and the write.  A denied update returns no row.
+            row = self._conn.execute(
+                "INSERT INTO rate_limits (key, tat) VALUES (:key, :now + :interval)"
+                " ON CONFLICT (key) DO UPDATE SET tat = max(tat, :now) + :interval"
+                " WHERE max(tat, :now) + :interval - :capacity <= :now"
+                " RETURNING tat",
+                {"key": key, "now": now, "interval": interval, "capacity": capacity},
+            ).fetchone()
+            if row is None:
+                (tat,) = self._conn.execute(
+                    "SELECT tat FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                return False, max(tat, now)
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+            return True, row[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisStore:
+    """TATs in Redis (or any server speaking its protocol with EVAL)."""
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "RATE_LIMIT_STORE=redis needs the 'redis' package (pip install redis)"
+            ) from exc
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._script = self._client.register_script(_GCRA_LUA)
+
+    def acquire(
+        self, key: str, now: float, interval: float, capacity: float
+    ) -> tuple[bool, float]:
+        allowed, tat = self._script(keys=[_REDIS_PREFIX + key], args=[now, interval, capacity])
+        return bool(int(allowed)), float(tat)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+# ---------------------------------------------------------------------------
+# Limiter
+# ---------------------------------------------------------------------------
+
+
+class RateLimiter:
+    """Applies budgets to identities (user ids) against one store."""
+
+    stats_key = "rate_limit"
+
+    def __init__(self, store: RateLimitStore, clock: Callable[[], float] = time.time) -> None:
+        # Shared stores compare TATs across processes, so the default clock
+        # is wall time rather than a per-process monotonic one.
+        self.store = store
+        self._clock = clock
+        self._counts: Counter[tuple[str, str]] = Counter()
+        self._lock = threading.Lock()
+
+    def check(self, budget: Budget, identity: str) -> RateLimitDecision:
+        now = self._clock()
+        try:
+            allowed, tat = self.store.acquire(
+                f"{budget.name}:{identity}", now, budget.interval, budget.capacity
+            )
+        except Exception:
+            logger.warning("Rate limit store %s failed; allowing", self.store.name, exc_info=True)
+            self._count(budget.name, "errors")
+            return RateLimitDecision(True, budget.burst, budget.burst, 0.0, 0.0)
+
+        self._count(budget.name, "allowed" if allowed else "denied")
+        if allowed:
+            remaining = int((now + budget.capacity - tat) / budget.interval + 1e-9)
+            return RateLimitDecision(True, budget.burst, remaining, 0.0, tat - now)
+        retry_after = tat + budget.interval - budget.capacity - now
+        return RateLimitDecision(False, budget.burst, 0, retry_after, tat - now)
+
+    async def acheck(self, budget: Budget, identity: str) -> RateLimitDecision:
+        if self.store.blocking:
+            return await anyio.to_thread.run_sync(self.check, budget, identity)
+        return self.check(budget, identity)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        budgets: dict[str, dict[str, int]] = {}
+        for (name, outcome), count in sorted(counts.items()):
+            budgets.setdefault(name, {"allowed": 0, "denied": 0, "errors": 0})[outcome] = count
+        return {"store": self.store.name, "budgets": budgets}
+
+    def close(self) -> None:
+        self.store.close()
+
+    def _count(self, budget: str, outcome: str) -> None:
+        with self._lock:
+            self._counts[budget, outcome] += 1
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter for the configured store."""
+    if settings.rate_limit_store == "sqlite":
+        store: RateLimitStore = SQLiteStore(settings.rate_limit_sqlite_path)
+    elif settings.rate_limit_store == "redis":
+        store = RedisStore(settings.rate_limit_redis_url)
+    else:
+        store = MemoryStore(settings.rate_limit_max_keys)
+    return RateLimiter(store)
+
+
+def close_rate_limiter() -> None:
+    if get_rate_limiter.cache_info().currsize:
+        get_rate_limiter().close()
+        get_rate_limiter.cache_clear()
@@ -1,36 +1,145 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import hashlib
 import secrets
+import threading
+import time
 from typing import Optional
 
 from fastapi import HTTPException, status, Request
 from jose import JWTError, jwt
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 
 ALGORITHM = "HS256"
 DEFAULT_EXP_MINUTES = 60 * 24  # 24h
 
 
+# ---------------------------------------------------------------------------
+# Password hashing
+#
+# Hashes are self-describing, so the KDF policy can change without a
+# migration: ``pbkdf2_sha256$<iterations>$<salt>$<hex>`` or
+# ``scrypt$<n>$<r>$<p>$<salt>$<hex>``.  Legacy ``<salt>$<hex>`` values are
+# PBKDF2-SHA256 with 100k iterations.  Logins rehash anything that does not
+# match the current policy (see :func:`needs_rehash`).
+# ---------------------------------------------------------------------------
+
+_LEGACY_PBKDF2_ITERATIONS = 100_000
+
+_kdf_executor: ThreadPoolExecutor | None = None
+_kdf_executor_lock = threading.Lock()
+
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac(
+        "sha256", password.encode(), salt.encode(), iterations
+    ).hex()
+
+
+def _scrypt(password: str, salt: str, n: int, r: int, p: int) -> str:
+    # maxmem must cover 128 * n * r bytes plus headroom, or OpenSSL refuses.
+    return hashlib.scrypt(
+        password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+        maxmem=256 * n * r + 1024 * 1024,
+    ).hex()
+
+
+def _parse_hash(stored: str) -> tuple[str, tuple[int, ...], str, str] | None:
+    """Split a stored hash into (kdf, params, salt, digest)."""
+    parts = stored.split("$")
+    try:
+        if len(parts) == 2:
+            return "pbkdf2_sha256", (_LEGACY_PBKDF2_ITERATIONS,), parts[0], parts[1]
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            return parts[0], (int(parts[1]),), parts[2], parts[3]
+        if parts[0] == "scrypt" and len(parts) == 6:
+            return parts[0], tuple(int(x) for x in parts[1:4]), parts[4], parts[5]
+    except ValueError:
+        pass
+    return None
+
+
+def _policy() -> tuple[str, tuple[int, ...]]:
+    if settings.password_kdf == "scrypt":
+        return "scrypt", (
+            settings.password_scrypt_n,
+            settings.password_scrypt_r,
+            settings.password_scrypt_p,
+        )
+    return "pbkdf2_sha256", (settings.password_pbkdf2_iterations,)
+
+
 def hash_password(password: str) -> str:
-    """Return salted PBKDF2 hash for storage."""
+    """Return a salted hash for storage using the configured KDF policy."""
+    kdf, params = _policy()
     salt = secrets.token_hex(16)
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 100_000)
-    return f"{salt}${dk.hex()}"
+    if kdf == "scrypt":
+        digest = _scrypt(password, salt, *params)
+    else:
+        digest = _pbkdf2(password, salt, *params)
+    return "$".join([kdf, *map(str, params), salt, digest])
 
 
 def verify_password(password: str, stored: str) -> bool:
-    """Verify password against stored salted hash."""
-    try:
-        salt, stored_hash = stored.split("$", 1)
-    except ValueError:
+    """Verify password against stored salted hash (any supported format)."""
+    parsed = _parse_hash(stored)
+    if parsed is None:
         return False
-    candidate = hashlib.pbkdf2_hmac(
-        "sha256", password.encode(), salt.encode(), 100_000
-    ).hex()
+    kdf, params, salt, stored_hash = parsed
+    if kdf == "scrypt":
+        candidate = _scrypt(password, salt, *params)
+    else:
+        candidate = _pbkdf2(password, salt, *params)
     return secrets.compare_digest(candidate, stored_hash)
 
 
+def needs_rehash(stored: str) -> bool:
+    """True when ``stored`` was made with a KDF or cost other than the current policy."""
+    parsed = _parse_hash(stored)
+    if parsed is None:
+        return False
+    if stored.count("$") == 1:
+        return True  # legacy format: rewrite as a self-describing hash
+    kdf, params, _, _ = parsed
+    return (kdf, params) != _policy()
+
+
+def _get_kdf_executor() -> ThreadPoolExecutor:
+    """
+    Dedicated pool for password hashing.
+
+    hashlib releases the GIL, so hashes run in parallel up to the pool size.
+    Keeping them off Starlette's default threadpool means a login burst
+    queues here instead of starving every other sync endpoint.
+    """
+    global _kdf_executor
+    if _kdf_executor is None:
+        with _kdf_executor_lock:
+            if _kdf_executor is None:
+                _kdf_executor = ThreadPoolExecutor(
+                    max_workers=settings.password_hash_workers,
+                    thread_name_prefix="password-kdf",
+                )
+    return _kdf_executor
+
+
+async def ahash_password(password: str) -> str:
+    """:func:`hash_password` on the KDF pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_kdf_executor(), hash_password, password)
+
+
+async def averify_password(password: str, stored: str) -> bool:
+    """:func:`verify_password` on the KDF pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_kdf_executor(), verify_password, password, stored
+    )
+
+
 def create_access_token(
     user_id: str, email: str, expires_delta: Optional[timedelta] = None
 ) -> str:
@@ -41,20 +150,57 @@ def create_access_token(
     return jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
 
 
+# Verified payloads keyed by SHA-256 of the signing key and the token.
+# Clients resend the same token on every poll and WebSocket reconnect, so
+# after the first request auth is a dictionary lookup instead of an HMAC
+# check and claims parsing.
+_token_cache: TTLCache[bytes, dict] = TTLCache(
+    settings.jwt_cache_size, settings.jwt_cache_ttl
+)
+
+
+def _token_cache_key(token: str) -> bytes:
+    # Including the key means that after a secret_key rotation, tokens
+    # verified under the old key miss and are re-checked (and rejected)
+    # instead of being accepted until their entry expires.
+    return hashlib.sha256(settings.secret_key.encode() + b"\0" + token.encode()).digest()
+
+
 def decode_jwt(token: str) -> dict:
+    key = _token_cache_key(token)
+    cached = _token_cache.get(key)
+    if cached is not None:
+        # The entry TTL never outlives ``exp``; re-check in case of clock skew.
+        exp = cached.get("exp")
+        if exp is None or exp > time.time():
+            return dict(cached)
+        _token_cache.pop(key)
+
     try:
         payload = jwt.decode(
             token,
             settings.secret_key,
             algorithms=[ALGORITHM],
         )
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
 
+    ttl = settings.jwt_cache_ttl
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        _token_cache.set(key, dict(payload), ttl=ttl)
+    return payload
+
+
+def token_cache_stats() -> dict:
+    """Hit/miss counters of the verified-token cache."""
+    return _token_cache.stats()
+
 
 def extract_token(request: Request) -> Optional[str]:
     #  Authorization header
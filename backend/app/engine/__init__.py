@@ -2,18 +2,25 @@
 Chat engine package.
 
 Call ``get_engine()`` to obtain the active ``ChatEngine`` instance.
-The default is ``StubChatEngine``; swap it for a real implementation by
-changing the factory below.
+The backend is chosen by ``ENGINE_BACKEND``: ``stub`` (default) or
+``openai`` for any OpenAI-compatible inference server.
+``get_ingestor()`` feeds uploaded documents into the RAG retriever.
 """
 
 from __future__ import annotations
 
 from functools import lru_cache
 
+from app.core.config import settings
+from app.engine.adapter import run_sync
 from app.engine.base import ChatEngine
+from app.engine.batching import BatchChatEngine, BatchingChatEngine
+from app.engine.cache import CachingChatEngine, SQLiteResponseStore
 from app.engine.stub import StubChatEngine
-from app.engine.context import ChatContext, HistoryMessage
+from app.engine.context import ChatContext, HistoryMessage, estimate_tokens, fit_history
+from app.engine.errors import UpstreamError
 from app.engine.response import ChatResponse
+from app.engine.stream import AsyncChatStream, ChatStream
 
 
 @lru_cache(maxsize=1)
@@ -21,17 +28,193 @@ def get_engine() -> ChatEngine:
     """
     Factory that returns the singleton engine instance.
 
-    To plug in a real model, replace ``StubChatEngine()`` with your
-    implementation (e.g. ``OllamaEngine(model="gemma2:9b")``).
+    To plug in another model, add a backend here and to
+    ``Settings.engine_backend``.
     """
-    return StubChatEngine()
+    engine: ChatEngine
+    if settings.engine_backend == "openai":
+        from app.engine.openai_compat import OpenAICompatEngine
+
+        engine = OpenAICompatEngine.from_settings(settings)
+    else:
+        engine = StubChatEngine()
+    # Optional layers: batching wraps the backend, retrieval sits above it,
+    # and the response cache goes outermost so hits skip all of them.
+    if settings.engine_batch_max_size > 1:
+        engine = BatchingChatEngine(
+            engine,
+            max_batch_size=settings.engine_batch_max_size,
+            max_wait_ms=settings.engine_batch_max_wait_ms,
+            max_concurrent_batches=settings.engine_batch_max_concurrency,
+        )
+    if settings.rag_enabled:
+        from app.engine.rag import RagChatEngine
+
+        engine = RagChatEngine(engine, _build_retriever(), min_score=settings.rag_min_score)
+    if settings.response_cache_enabled:
+        engine = CachingChatEngine(
+            engine,
+            maxsize=settings.response_cache_size,
+            ttl=settings.response_cache_ttl,
+            max_temperature=settings.response_cache_max_temperature,
+            store=(
+                SQLiteResponseStore(settings.response_cache_path)
+                if settings.response_cache_path
+                else None
+            ),
+            replay_delay_ms=settings.response_cache_replay_delay_ms,
+        )
+    return engine
+
+
+def _build_retriever():
+    from app.engine.retrieval import HashingEmbedder, MmapVectorStore, Retriever
+
+    embedder = HashingEmbedder(settings.rag_embedding_dim)
+    retriever = Retriever(
+        embedder,
+        chunk_chars=settings.rag_chunk_chars,
+        chunk_overlap=settings.rag_chunk_overlap,
+    )
+    if settings.rag_store == "memory":
+        if settings.rag_corpus_path:
+            retriever.add_directory(settings.rag_corpus_path)
+        return retriever
+
+    if settings.rag_store == "ivf":
+        retriever.store = _load_ivf_index(retriever)
+        return retriever
+
+    store = MmapVectorStore(settings.rag_store_path, embedder.dim, settings.rag_store_dtype)
+    retriever.store = store
+    retriever.batch_size = 16_384
+    if settings.rag_corpus_path:
+        # Only the first worker to start on an empty store indexes the corpus;
+        # later starts just map the existing segments.
+        with store.exclusive():
+            if len(store) == 0:
+                retriever.add_directory(settings.rag_corpus_path)
+                store.compact()
+    store.start_compaction(settings.rag_compact_interval, settings.rag_compact_min_segments)
+    return retriever
+
+
+def _load_ivf_index(retriever):
+    from pathlib import Path
+
+    from app.engine.retrieval import IVFIndex
+    from app.engine.retrieval.ivf import exclusive
+
+    saved = Path(settings.rag_store_path) / "index.npz"
+    if not saved.exists():
+        # Workers starting together build the index once: the first one to
+        # take the lock builds and saves, the others then load its copy.
+        with exclusive(settings.rag_store_path):
+            if not saved.exists():
+                return _build_ivf_index(retriever)
+    index = IVFIndex.load(settings.rag_store_path)
+    index.nprobe = settings.rag_ivf_nprobe
+    return index
+
+
+def _build_ivf_index(retriever):
+    from pathlib import Path
+
+    from app.engine.retrieval import IVFIndex
+
+    index = IVFIndex(
+        retriever.embedder.dim,
+        nlist=settings.rag_ivf_nlist,
+        nprobe=settings.rag_ivf_nprobe,
+        pq_m=settings.rag_ivf_pq_m,
+    )
+    # Like a loaded index, a built one follows later saves to rag_store_path
+    # (e.g. a bulk load), so every worker serves the latest copy.
+    index.path = Path(settings.rag_store_path)
+    if settings.rag_corpus_path:
+        retriever.store = index
+        retriever.add_directory(settings.rag_corpus_path)
+        index.save(settings.rag_store_path)
+    return index
+
+
+@lru_cache(maxsize=1)
+def get_ingestor():
+    """Document ingestion into the engine's retriever; ``None`` without RAG."""
+    layer = get_engine()
+    while layer is not None and not hasattr(layer, "retriever"):
+        layer = getattr(layer, "engine", None)
+    if layer is None:
+        return None
+    from app.engine.retrieval import Ingestor
+
+    return Ingestor(
+        layer.retriever,
+        workers=settings.ingest_workers,
+        max_queued_jobs=settings.ingest_max_queued_jobs,
+        embed_batch_size=settings.ingest_embed_batch_size,
+    )
+
+
+def engine_stats(engine: ChatEngine | None = None) -> dict:
+    """Collect ``stats()`` from every wrapper layer (cache, batching, ...)."""
+    stats = {}
+    layer = engine if engine is not None else get_engine()
+    while layer is not None:
+        collect = getattr(layer, "stats", None)
+        if collect is not None:
+            stats[getattr(layer, "stats_key", type(layer).__name__)] = collect()
+        layer = getattr(layer, "engine", None)
+    return stats
+
+
+async def start_engine() -> None:
+    """
+    Build the engine (and ingestor) on the engine thread pool at startup.
+
+    With retrieval enabled the first ``get_engine()`` embeds the corpus or
+    loads the index; done lazily, that would block the event loop inside
+    the first request that touches the engine.
+    """
+    await run_sync(get_engine)
+    if settings.ingest_enabled:
+        await run_sync(get_ingestor)
+
+
+async def close_engine() -> None:
+    """Release the engine's resources (e.g. pooled HTTP connections) on shutdown."""
+    if get_ingestor.cache_info().currsize:
+        ingestor = get_ingestor()
+        if ingestor is not None:
+            # Waits for the running batch, which may still write to the store.
+            await run_sync(ingestor.close)
+        get_ingestor.cache_clear()
+    if get_engine.cache_info().currsize == 0:
+        return
+    aclose = getattr(get_engine(), "aclose", None)
+    if aclose is not None:
+        await aclose()
+    get_engine.cache_clear()
 
 
 __all__ = [
+    "AsyncChatStream",
+    "BatchChatEngine",
+    "BatchingChatEngine",
+    "CachingChatEngine",
     "ChatEngine",
+    "ChatStream",
     "StubChatEngine",
     "ChatContext",
     "ChatResponse",
     "HistoryMessage",
+    "SQLiteResponseStore",
+    "UpstreamError",
+    "close_engine",
+    "engine_stats",
+    "estimate_tokens",
+    "fit_history",
     "get_engine",
+    "get_ingestor",
+    "start_engine",
 ]
@@ -0,0 +1,80 @@
+"""
+Run synchronous engine code without blocking the event loop.
+
+Legacy engines only implement the blocking ``answer()`` / ``stream()`` pair.
+The helpers here execute those calls on a dedicated, bounded thread pool so
+that a slow generation occupies one worker thread instead of the whole
+event loop.  The pool is separate from Starlette's default threadpool, so
+engine work can never starve ordinary sync endpoints (and vice versa).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from typing import AsyncIterator, Callable, Iterable, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+# Sentinel returned by ``next()`` once the wrapped iterator is exhausted.
+# ``StopIteration`` cannot cross a Future boundary, so we use a default value.
+_DONE = object()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide engine thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.engine_max_threads,
+                    thread_name_prefix="chat-engine",
+                )
+    return _executor
+
+
+async def run_sync(fn: Callable[..., T], *args) -> T:
+    """Call ``fn(*args)`` on the engine thread pool and await the result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), fn, *args)
+
+
+async def iterate_sync(
+    factory: Callable[..., Iterable[T]], *args
+) -> AsyncIterator[T]:
+    """
+    Adapt a blocking iterator into an async iterator.
+
+    ``factory(*args)`` and every subsequent ``next()`` call run on the engine
+    thread pool, so the event loop stays free to serve other requests between
+    tokens.  If the consumer stops early (``aclose()`` or task cancellation),
+    the blocking iterator is closed on the pool as soon as any in-flight
+    ``next()`` returns, so sync engines see ``GeneratorExit`` and can clean up.
+    """
+    iterator = await run_sync(lambda: iter(factory(*args)))
+    in_flight: Future | None = None
+    exhausted = False
+    try:
+        while True:
+            in_flight = get_executor().submit(next, iterator, _DONE)
+            item = await asyncio.wrap_future(in_flight)
+            if item is _DONE:
+                exhausted = True
+                return
+            yield item  # type: ignore[misc]
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None and not exhausted:
+            if in_flight is None or in_flight.done():
+                get_executor().submit(close)
+            else:
+                # A generator cannot be closed while next() is running in
+                # another thread; close it once that call returns.
+                in_flight.add_done_callback(lambda _: get_executor().submit(close))
@@ -3,10 +3,11 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Iterator
 
+from app.engine.adapter import iterate_sync, run_sync
 from app.engine.context import ChatContext
 from app.engine.response import ChatResponse
+from app.engine.stream import AsyncChatStream, ChatStream
 
 
 class ChatEngine(ABC):
@@ -16,6 +17,15 @@ class ChatEngine(ABC):
     Subclass this to plug in Ollama, OpenAI, a local transformer, or any
     retrieval-augmented pipeline.  The API routes never import model-specific
     code — they only depend on this interface.
+
+    Engines implement the synchronous ``answer()`` / ``stream()`` pair.  The
+    async routes call ``aanswer()`` / ``astream()``, which by default run the
+    sync pair on a bounded thread pool.  Engines with a native async client
+    should override the async pair directly.
+
+    Engines must not keep per-request state on ``self``: one instance serves
+    every request in the process.  Streaming metadata travels on the
+    per-call handle returned by ``stream()`` / ``astream()``.
     """
 
     @abstractmethod
@@ -24,23 +34,26 @@ class ChatEngine(ABC):
         ...
 
     @abstractmethod
-    def stream(self, query: str, context: ChatContext) -> Iterator[str]:
+    def stream(self, query: str, context: ChatContext) -> ChatStream:
         """
-        Yield answer tokens one at a time for streaming endpoints.
+        Return a handle that yields answer tokens one at a time.
 
-        After the iterator is exhausted the caller may request the full
-        ``ChatResponse`` via :meth:`last_response`.
+        Once the handle is exhausted, ``handle.response`` holds the full
+        ``ChatResponse`` for this call.
         """
         ...
 
-    def last_response(self) -> ChatResponse:
+    async def aanswer(self, query: str, context: ChatContext) -> ChatResponse:
+        """Async counterpart of :meth:`answer`."""
+        return await run_sync(self.answer, query, context)
+
+    def astream(self, query: str, context: ChatContext) -> AsyncChatStream:
         """
-        Return metadata for the most recent ``stream()`` call.
+        Async counterpart of :meth:`stream`.
 
-        Implementations should build the ``ChatResponse`` as tokens are
-        yielded and cache it so this method can return it after the stream
-        completes.
+        The default adapter pulls tokens from :meth:`stream` on the engine
+        thread pool, so legacy sync engines never block the event loop.
         """
-        raise NotImplementedError(
-            f"{type(self).__name__} does not support last_response()"
+        return AsyncChatStream(
+            iterate_sync(lambda: self.stream(query, context).items())
         )
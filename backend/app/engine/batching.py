@@ -0,0 +1,318 @@
+"""
+Micro-batching in front of a chat engine.
+
+Backends that run several prompts per forward pass (a local transformer,
+a batch inference endpoint) get far more throughput from one call with N
+prompts than from N calls.  :class:`BatchingChatEngine` wraps an engine
+and groups concurrent ``astream()`` / ``aanswer()`` calls: the first
+request in an empty queue opens a window of ``max_wait_ms``, and the batch
+is dispatched when the window closes or ``max_batch_size`` requests are
+waiting, whichever comes first.  Streamed output is demultiplexed back to
+each caller's own :class:`AsyncChatStream`.
+
+Engines opt in by subclassing :class:`BatchChatEngine`.  Any other engine
+can still be wrapped; its batch members are then streamed concurrently,
+each in its own task, which adds admission control
+(``max_concurrent_batches``) and queue metrics but no backend-side
+batching.  A member that fails or stops only affects its own caller.
+
+The sync ``answer()`` / ``stream()`` pair bypasses the scheduler.
+"""
+
+from __future__ import annotations
+
+from abc import abstractmethod
+import asyncio
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass, field
+import threading
+from typing import AsyncIterator, Deque, Dict, List, Sequence, Tuple
+
+from app.engine.base import ChatEngine
+from app.engine.context import ChatContext
+from app.engine.response import ChatResponse
+from app.engine.stream import AsyncChatStream, ChatStream, StreamItem
+
+BatchRequest = Tuple[str, ChatContext]
+
+# Marks the end of one caller's output in its queue.
+_END = object()
+
+
+class BatchChatEngine(ChatEngine):
+    """An engine that can generate answers for several prompts in one call."""
+
+    @abstractmethod
+    def astream_batch(
+        self, requests: Sequence[BatchRequest]
+    ) -> AsyncIterator[Tuple[int, StreamItem]]:
+        """
+        Stream answers for ``requests`` as ``(index, item)`` pairs.
+
+        ``index`` points into ``requests``.  Items for different requests
+        may interleave freely; each request may end with its
+        ``ChatResponse``, exactly like a single ``astream()`` producer.
+        """
+        ...
+
+    async def aanswer(self, query: str, context: ChatContext) -> ChatResponse:
+        stream = self.astream(query, context)
+        async for _ in stream:
+            pass
+        return stream.response
+
+    def astream(self, query: str, context: ChatContext) -> AsyncChatStream:
+        return AsyncChatStream(self._single(query, context))
+
+    async def _single(self, query: str, context: ChatContext) -> AsyncIterator[StreamItem]:
+        async with aclosing(self.astream_batch([(query, context)])) as items:
+            async for _, item in items:
+                yield item
+
+
+@dataclass(slots=True, eq=False)
+class _Pending:
+    query: str
+    context: ChatContext
+    enqueued_at: float
+    out: asyncio.Queue = field(default_factory=asyncio.Queue)
+    cancelled: bool = False
+    batch: asyncio.Task | None = None
+    # Set when the member streams on its own (engines without batch support).
+    task: asyncio.Task | None = None
+    members: List["_Pending"] = field(default_factory=list)
+
+
+class _LoopState:
+    """Scheduler state bound to one event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_concurrent_batches: int) -> None:
+        self.loop = loop
+        self.queue: Deque[_Pending] = deque()
+        self.wakeup = asyncio.Event()
+        self.slots = asyncio.Semaphore(max_concurrent_batches)
+        self.collector: asyncio.Task | None = None
+
+
+class BatchingChatEngine(ChatEngine):
+    """Groups concurrent requests to ``engine`` into batches."""
+
+    stats_key = "batching"
+
+    def __init__(
+        self,
+        engine: ChatEngine,
+        *,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_concurrent_batches: int = 4,
+    ) -> None:
+        self.engine = engine
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._loop_state: _LoopState | None = None
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._batched = 0
+        self._in_flight = 0
+        self._max_queue_depth = 0
+        self._wait_total = 0.0
+        self._batch_sizes: Dict[int, int] = {}
+
+    # -- ChatEngine --------------------------------------------------------
+
+    def answer(self, query: str, context: ChatContext) -> ChatResponse:
+        return self.engine.answer(query, context)
+
+    def stream(self, query: str, context: ChatContext) -> ChatStream:
+        return self.engine.stream(query, context)
+
+    async def aanswer(self, query: str, context: ChatContext) -> ChatResponse:
+        stream = self.astream(query, context)
+        async for _ in stream:
+            pass
+        return stream.response
+
+    def astream(self, query: str, context: ChatContext) -> AsyncChatStream:
+        return AsyncChatStream(self._submit(query, context))
+
+    async def aclose(self) -> None:
+        """Stop the schedulers and close the wrapped engine."""
+        state, self._loop_state = self._loop_state, None
+        if state is not None and state.collector is not None:
+            if state.loop is asyncio.get_running_loop():
+                state.collector.cancel()
+                await asyncio.gather(state.collector, return_exceptions=True)
+        aclose = getattr(self.engine, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    # -- metrics -----------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "queue_depth": len(self._loop_state.queue) if self._loop_state else 0,
+                "max_queue_depth": self._max_queue_depth,
+                "in_flight_batches": self._in_flight,
+                "requests": self._requests,
+                "batches": self._batches,
+                "avg_batch_size": round(self._batched / self._batches, 2) if self._batches else 0.0,
+                "avg_queue_wait_ms": (
+                    round(self._wait_total * 1000 / self._batched, 2) if self._batched else 0.0
+                ),
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+            }
+
+    # -- scheduling --------------------------------------------------------
+
+    def _state(self) -> _LoopState:
+        # One serving loop per process; a new loop (e.g. a fresh test client)
+        # simply starts a fresh scheduler.
+        loop = asyncio.get_running_loop()
+        state = self._loop_state
+        if state is None or state.loop is not loop:
+            state = self._loop_state = _LoopState(loop, self.max_concurrent_batches)
+        if state.collector is None or state.collector.done():
+            state.collector = loop.create_task(self._collect(state))
+        return state
+
+    async def _submit(self, query: str, context: ChatContext) -> AsyncIterator[StreamItem]:
+        state = self._state()
+        request = _Pending(query, context, state.loop.time())
+        state.queue.append(request)
+        state.wakeup.set()
+        with self._lock:
+            self._requests += 1
+            self._max_queue_depth = max(self._max_queue_depth, len(state.queue))
+
+        finished = False
+        try:
+            while True:
+                item = await request.out.get()
+                if item is _END:
+                    finished = True
+                    return
+                if isinstance(item, BaseException):
+                    finished = True
+                    raise item
+                yield item
+        finally:
+            if not finished:
+                self._abandon(state, request)
+
+    def _abandon(self, state: _LoopState, request: _Pending) -> None:
+        """
+        Drop a caller that stopped early.
+
+        A member streaming on its own is cancelled right away; a shared
+        backend batch is cancelled once all of its members have stopped.
+        """
+        request.cancelled = True
+        if request.batch is None:
+            try:
+                state.queue.remove(request)
+            except ValueError:
+                pass
+        elif request.task is not None:
+            request.task.cancel()
+        elif all(member.cancelled for member in request.members):
+            request.batch.cancel()
+
+    async def _collect(self, state: _LoopState) -> None:
+        loop = state.loop
+        while True:
+            while not state.queue:
+                state.wakeup.clear()
+                await state.wakeup.wait()
+            await state.slots.acquire()
+
+            # Window opens when the oldest waiting request arrived, so time
+            # spent waiting for a free slot counts against max_wait.
+            while state.queue and len(state.queue) < self.max_batch_size:
+                remaining = state.queue[0].enqueued_at + self.max_wait - loop.time()
+                if remaining <= 0:
+                    break
+                state.wakeup.clear()
+                try:
+                    await asyncio.wait_for(state.wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [state.queue.popleft() for _ in range(min(self.max_batch_size, len(state.queue)))]
+            if not batch:
+                state.slots.release()
+                continue
+            task = loop.create_task(self._run(state, batch))
+            for request in batch:
+                request.batch = task
+                request.members = batch
+
+            now = loop.time()
+            with self._lock:
+                self._batches += 1
+                self._batched += len(batch)
+                self._in_flight += 1
+                self._wait_total += sum(now - r.enqueued_at for r in batch)
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+    async def _run(self, state: _LoopState, batch: List[_Pending]) -> None:
+        try:
+            if isinstance(self.engine, BatchChatEngine):
+                await self._run_batch(batch)
+            else:
+                await self._fan_out(batch)
+        finally:
+            state.slots.release()
+            with self._lock:
+                self._in_flight -= 1
+
+    async def _run_batch(self, batch: List[_Pending]) -> None:
+        try:
+            requests = [(r.query, r.context) for r in batch]
+            async with aclosing(self.engine.astream_batch(requests)) as items:
+                async for index, item in items:
+                    request = batch[index]
+                    if not request.cancelled:
+                        request.out.put_nowait(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # One backend call served the whole batch, so its failure is
+            # every member's failure.
+            for request in batch:
+                request.out.put_nowait(exc)
+        else:
+            for request in batch:
+                request.out.put_nowait(_END)
+
+    async def _fan_out(self, batch: List[_Pending]) -> None:
+        """Stream each member in its own task; the batch ends when all have."""
+        for request in batch:
+            if not request.cancelled:
+                request.task = asyncio.ensure_future(self._stream_one(request))
+        tasks = [request.task for request in batch if request.task is not None]
+        try:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _stream_one(self, request: _Pending) -> None:
+        stream = self.engine.astream(request.query, request.context)
+        try:
+            async with aclosing(stream.__aiter__()) as tokens:
+                async for token in tokens:
+                    request.out.put_nowait(token)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            request.out.put_nowait(exc)
+            return
+        request.out.put_nowait(stream.response)
+        request.out.put_nowait(_END)
@@ -0,0 +1,292 @@
+"""
+Response cache at the engine boundary.
+
+Many users open with the same questions, word for word.  :class:`CachingChatEngine`
+wraps another engine and answers repeats from a cache instead of running a
+full generation.  The key covers everything that shapes the answer: the
+normalized question, a hash of the earlier conversation, the model and the
+temperature.  Requests above ``max_temperature`` are never cached, because
+their answers are meant to vary.
+
+Entries live in an in-process LRU/TTL cache and, optionally, in a SQLite
+file shared by every worker on the host and surviving restarts.  Cached
+answers are streamed back word by word, so clients render them exactly
+like a live answer, and are tagged ``mode="cache"``.
+
+The key does not include the user: only enable the cache when answers do
+not depend on per-user data.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict, replace
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import AsyncIterator, Iterator
+
+from app.core.cache import TTLCache
+from app.engine.adapter import run_sync
+from app.engine.base import ChatEngine
+from app.engine.context import ChatContext
+from app.engine.response import ChatResponse
+from app.engine.stream import AsyncChatStream, ChatStream, StreamItem
+
+# Replay granularity: one word plus its trailing whitespace, like most
+# tokenizers emit for English text.
+_CHUNK_RE = re.compile(r"\s*\S+\s*|\s+")
+# Prune expired SQLite rows once every this many writes.
+_PRUNE_EVERY = 256
+
+
+def normalize_query(query: str) -> str:
+    """Fold case, Unicode forms, whitespace and trailing punctuation."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(text.split()).rstrip(" ?!.")
+
+
+def cache_key(query: str, context: ChatContext) -> str:
+    history = list(context.history)
+    # The routes persist the question before loading history, so the tail
+    # is normally the question itself; it is already covered by ``query``.
+    if history and history[-1].role == "user" and history[-1].content == query:
+        history.pop()
+    material = json.dumps(
+        [
+            normalize_query(query),
+            [[m.role, m.content] for m in history],
+            context.model,
+            round(context.temperature, 3),
+        ],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def replay_chunks(content: str) -> Iterator[str]:
+    """Split a cached answer into token-sized chunks for streaming."""
+    return (m.group() for m in _CHUNK_RE.finditer(content))
+
+
+class SQLiteResponseStore:
+    """Persistent second tier: one row per key, expired rows pruned lazily."""
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> ChatResponse | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return ChatResponse(**json.loads(row[0])) if row else None
+
+    def put(self, key: str, response: ChatResponse, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, response, expires_at)"
+                " VALUES (?, ?, ?)",
+                (key, json.dumps(asdict(response)), now + ttl),
+            )
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachingChatEngine(ChatEngine):
+    """Serves repeated prompts from a cache, delegating misses to ``engine``."""
+
+    stats_key = "response_cache"
+
+    def __init__(
+        self,
+        engine: ChatEngine,
+        *,
+        maxsize: int = 1024,
+        ttl: float = 3600.0,
+        max_temperature: float = 0.3,
+        store: SQLiteResponseStore | None = None,
+        replay_delay_ms: float = 0.0,
+    ) -> None:
+        self.engine = engine
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.store = store
+        self.replay_delay = replay_delay_ms / 1000
+        self._cache: TTLCache[str, ChatResponse] = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._store_hits = 0
+        self._skipped = 0
+        self._stored = 0
+
+    # -- ChatEngine --------------------------------------------------------
+
+    def answer(self, query: str, context: ChatContext) -> ChatResponse:
+        key = self._key(query, context)
+        if key is not None:
+            cached = self._lookup_memory(key)
+            if cached is None and self.store is not None:
+                cached = self._lookup_store(key)
+            if cached is not None:
+                return cached
+        response = self.engine.answer(query, context)
+        if key is not None:
+            self._remember(key, response)
+        return response
+
+    def stream(self, query: str, context: ChatContext) -> ChatStream:
+        key = self._key(query, context)
+        cached = None
+        if key is not None:
+            cached = self._lookup_memory(key)
+            if cached is None and self.store is not None:
+                cached = self._lookup_store(key)
+        if cached is not None:
+            return ChatStream(self._replay_sync(cached))
+        return ChatStream(self._record_sync(key, self.engine.stream(query, context)))
+
+    async def aanswer(self, query: str, context: ChatContext) -> ChatResponse:
+        key = self._key(query, context)
+        if key is not None:
+            cached = await self._alookup(key)
+            if cached is not None:
+                return cached
+        response = await self.engine.aanswer(query, context)
+        if key is not None:
+            await self._aremember(key, response)
+        return response
+
+    def astream(self, query: str, context: ChatContext) -> AsyncChatStream:
+        return AsyncChatStream(self._agenerate(query, context))
+
+    async def aclose(self) -> None:
+        if self.store is not None:
+            self.store.close()
+        aclose = getattr(self.engine, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    # -- metrics -----------------------------------------------------------
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        with self._lock:
+            stats.update(
+                persistent_hits=self._store_hits,
+                stored=self._stored,
+                skipped=self._skipped,
+            )
+        return stats
+
+    def clear(self) -> None:
+        self._cache.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    # -- internals ---------------------------------------------------------
+
+    def _key(self, query: str, context: ChatContext) -> str | None:
+        if context.temperature > self.max_temperature:
+            with self._lock:
+                self._skipped += 1
+            return None
+        return cache_key(query, context)
+
+    def _lookup_memory(self, key: str) -> ChatResponse | None:
+        cached = self._cache.get(key)
+        return _as_cached(cached) if cached is not None else None
+
+    def _lookup_store(self, key: str) -> ChatResponse | None:
+        """Second tier; promotes hits into memory."""
+        cached = self.store.get(key)
+        if cached is None:
+            return None
+        self._cache.set(key, cached)
+        with self._lock:
+            self._store_hits += 1
+        return _as_cached(cached)
+
+    async def _alookup(self, key: str) -> ChatResponse | None:
+        cached = self._lookup_memory(key)
+        if cached is None and self.store is not None:
+            cached = await run_sync(self._lookup_store, key)
+        return cached
+
+    def _remember(self, key: str, response: ChatResponse) -> None:
+        if not response.content:
+            return
+        self._cache.set(key, response)
+        if self.store is not None:
+            self.store.put(key, response, self.ttl)
+        with self._lock:
+            self._stored += 1
+
+    async def _aremember(self, key: str, response: ChatResponse) -> None:
+        if self.store is not None:
+            await run_sync(self._remember, key, response)
+        else:
+            self._remember(key, response)
+
+    def _replay_sync(self, response: ChatResponse) -> Iterator[StreamItem]:
+        for chunk in replay_chunks(response.content):
+            if self.replay_delay:
+                time.sleep(self.replay_delay)
+            yield chunk
+        yield response
+
+    def _record_sync(self, key: str | None, stream: ChatStream) -> Iterator[StreamItem]:
+        yield from stream
+        if key is not None and not stream.cancelled:
+            self._remember(key, stream.response)
+        yield stream.response
+
+    async def _agenerate(self, query: str, context: ChatContext) -> AsyncIterator[StreamItem]:
+        key = self._key(query, context)
+        cached = await self._alookup(key) if key is not None else None
+        if cached is not None:
+            for chunk in replay_chunks(cached.content):
+                if self.replay_delay:
+                    await asyncio.sleep(self.replay_delay)
+                yield chunk
+            yield cached
+            return
+
+        stream = self.engine.astream(query, context)
+        tokens = stream.__aiter__()
+        try:
+            async for token in tokens:
+                yield token
+        finally:
+            # Stop the inner generation if our consumer went away.
+            await tokens.aclose()
+        # Only complete answers are cached, never a stream stopped midway.
+        if key is not None and not stream.cancelled:
+            await self._aremember(key, stream.response)
+        yield stream.response
+
+
+def _as_cached(response: ChatResponse) -> ChatResponse:
+    return replace(response, sources=list(response.sources), mode="cache")
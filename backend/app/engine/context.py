@@ -3,7 +3,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import List, Optional, Sequence
+
+# Rough tokenizer-free estimate: ~4 characters per token for English text,
+# plus a few tokens of chat-template overhead per message.
+_CHARS_PER_TOKEN = 4
+_MESSAGE_OVERHEAD_TOKENS = 4
 
 
 @dataclass(frozen=True, slots=True)
@@ -29,3 +34,29 @@ class ChatContext:
     model: Optional[str] = None  # reserved for model selection
     temperature: float = 0.1
     top_k: int = 6
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used to budget history without a tokenizer."""
+    return -(-len(text) // _CHARS_PER_TOKEN) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def fit_history(
+    messages: Sequence[HistoryMessage], token_budget: int
+) -> List[HistoryMessage]:
+    """
+    Keep the most recent messages whose estimated tokens fit ``token_budget``.
+
+    ``messages`` is chronological.  The newest message (normally the current
+    question) is always kept, even when it alone exceeds the budget.
+    """
+    kept: List[HistoryMessage] = []
+    used = 0
+    for message in reversed(messages):
+        cost = estimate_tokens(message.content)
+        if kept and used + cost > token_budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    return kept
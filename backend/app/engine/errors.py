@@ -0,0 +1,16 @@
+"""Errors engines raise; the API routes map them onto responses and frames."""
+
+from __future__ import annotations
+
+
+class UpstreamError(Exception):
+    """
+    The inference backend failed or could not be reached.
+
+    ``status_code`` is the backend's HTTP status, or ``None`` when no
+    response arrived (connect error, timeout, dropped stream).
+    """
+
+    def __init__(self, message: str, status_code: int | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
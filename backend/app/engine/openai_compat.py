@@ -0,0 +1,324 @@
+"""
+Engine for any OpenAI-compatible ``/chat/completions`` endpoint.
+
+Works with vLLM, Ollama (``/v1``), llama.cpp server, TGI and OpenAI itself.
+Async calls share one ``httpx.AsyncClient`` and sync calls one
+``httpx.Client``, so connections are pooled and kept alive across chat
+turns (HTTP/2 is negotiated on ``https`` URLs when the ``h2`` package is
+installed).  Connection failures, timeouts and
+retryable statuses are retried with exponential backoff and full jitter,
+but only before the first token: a stream that has started is never
+replayed.  Backend failures, including malformed responses, surface as
+:class:`UpstreamError`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+import importlib.util
+import json
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Iterator
+
+import httpx
+
+from app.core.config import Settings
+from app.engine.base import ChatEngine
+from app.engine.context import ChatContext
+from app.engine.errors import UpstreamError
+from app.engine.response import ChatResponse
+from app.engine.stream import AsyncChatStream, ChatStream, StreamItem
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and transient upstream failures.
+_RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+_RETRY_ERRORS = (httpx.TransportError,)  # connect/read timeouts, resets, ...
+
+# Returned by _event() for the stream terminator.
+_DONE = object()
+_MALFORMED = "Inference backend sent a malformed response"
+
+
+class OpenAICompatEngine(ChatEngine):
+    """
+    Streams answers from an OpenAI-compatible chat completions API.
+
+    The routes use the native async pair; the sync ``answer()`` /
+    ``stream()`` pair serves scripts and worker threads with its own
+    pooled client.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        *,
+        api_key: str | None = None,
+        client: httpx.AsyncClient | None = None,
+        sync_client: httpx.Client | None = None,
+        max_tokens: int | None = None,
+        max_retries: int = 2,
+        retry_backoff: float = 0.25,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client = client or httpx.AsyncClient()
+        self._sync_client = sync_client or httpx.Client()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "OpenAICompatEngine":
+        http2 = settings.inference_http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("INFERENCE_HTTP2 is set but 'h2' is not installed; using HTTP/1.1")
+            http2 = False
+        options: dict[str, Any] = dict(
+            http2=http2,
+            timeout=httpx.Timeout(
+                settings.inference_read_timeout,
+                connect=settings.inference_connect_timeout,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.inference_max_connections,
+                max_keepalive_connections=settings.inference_max_keepalive,
+                keepalive_expiry=settings.inference_keepalive_expiry,
+            ),
+        )
+        return cls(
+            settings.inference_base_url,
+            settings.inference_model,
+            api_key=settings.inference_api_key,
+            client=httpx.AsyncClient(**options),
+            sync_client=httpx.Client(**options),
+            max_tokens=settings.inference_max_tokens,
+            max_retries=settings.inference_max_retries,
+            retry_backoff=settings.inference_retry_backoff,
+        )
+
+    async def aclose(self) -> None:
+        """Close pooled connections (called on application shutdown)."""
+        await self._client.aclose()
+        self._sync_client.close()
+
+    # -- ChatEngine --------------------------------------------------------
+
+    def answer(self, query: str, context: ChatContext) -> ChatResponse:
+        payload = self._payload(query, context, stream=False)
+        with self._sync_request(payload) as response:
+            try:
+                response.read()
+            except httpx.HTTPError as exc:
+                raise UpstreamError("Inference response interrupted") from exc
+        return _completion(response, payload)
+
+    def stream(self, query: str, context: ChatContext) -> ChatStream:
+        return ChatStream(self._sync_generate(query, context))
+
+    async def aanswer(self, query: str, context: ChatContext) -> ChatResponse:
+        payload = self._payload(query, context, stream=False)
+        async with self._request(payload) as response:
+            try:
+                await response.aread()
+            except httpx.HTTPError as exc:
+                raise UpstreamError("Inference response interrupted") from exc
+        return _completion(response, payload)
+
+    def astream(self, query: str, context: ChatContext) -> AsyncChatStream:
+        return AsyncChatStream(self._generate(query, context))
+
+    # -- internals ---------------------------------------------------------
+
+    def _payload(self, query: str, context: ChatContext, *, stream: bool) -> dict:
+        messages = [{"role": m.role, "content": m.content} for m in context.history]
+        # The routes persist the question before building history, so it is
+        # normally the last message already.
+        if not messages or messages[-1] != {"role": "user", "content": query}:
+            messages.append({"role": "user", "content": query})
+        payload: dict[str, Any] = {
+            "model": context.model or self.model,
+            "messages": messages,
+            "temperature": context.temperature,
+            "stream": stream,
+        }
+        if self.max_tokens:
+            payload["max_tokens"] = self.max_tokens
+        return payload
+
+    async def _generate(self, query: str, context: ChatContext) -> AsyncIterator[StreamItem]:
+        payload = self._payload(query, context, stream=True)
+        model = payload["model"]
+        parts: list[str] = []
+        async with self._request(payload) as response:
+            try:
+                async for line in response.aiter_lines():
+                    chunk = _event(line)
+                    if chunk is _DONE:
+                        break
+                    if chunk is None:
+                        continue
+                    model = chunk.get("model", model)
+                    delta = _delta(chunk)
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            except httpx.HTTPError as exc:
+                raise UpstreamError("Inference stream interrupted") from exc
+        yield ChatResponse(content="".join(parts), mode="chat", model=model)
+
+    def _sync_generate(self, query: str, context: ChatContext) -> Iterator[StreamItem]:
+        payload = self._payload(query, context, stream=True)
+        model = payload["model"]
+        parts: list[str] = []
+        with self._sync_request(payload) as response:
+            try:
+                for line in response.iter_lines():
+                    chunk = _event(line)
+                    if chunk is _DONE:
+                        break
+                    if chunk is None:
+                        continue
+                    model = chunk.get("model", model)
+                    delta = _delta(chunk)
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            except httpx.HTTPError as exc:
+                raise UpstreamError("Inference stream interrupted") from exc
+        yield ChatResponse(content="".join(parts), mode="chat", model=model)
+
+    def _build_request(self, client: httpx.AsyncClient | httpx.Client, payload: dict):
+        return client.build_request(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            headers=self._headers,
+        )
+
+    @asynccontextmanager
+    async def _request(self, payload: dict) -> AsyncIterator[httpx.Response]:
+        """
+        POST ``payload`` and yield the response once its headers arrive.
+
+        Retries happen only here, before any body is consumed.  Leaving the
+        context closes the response, which aborts an unfinished generation.
+        """
+        request = self._build_request(self._client, payload)
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.send(request, stream=True)
+            except _RETRY_ERRORS as exc:
+                delay = self._retry_delay(attempt, error=exc)
+            else:
+                if response.status_code < 400:
+                    try:
+                        yield response
+                    finally:
+                        await response.aclose()
+                    return
+                await response.aclose()
+                delay = self._retry_delay(attempt, response=response)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @contextmanager
+    def _sync_request(self, payload: dict) -> Iterator[httpx.Response]:
+        """Blocking counterpart of :meth:`_request`."""
+        request = self._build_request(self._sync_client, payload)
+        attempt = 0
+        while True:
+            try:
+                response = self._sync_client.send(request, stream=True)
+            except _RETRY_ERRORS as exc:
+                delay = self._retry_delay(attempt, error=exc)
+            else:
+                if response.status_code < 400:
+                    try:
+                        yield response
+                    finally:
+                        response.close()
+                    return
+                response.close()
+                delay = self._retry_delay(attempt, response=response)
+            time.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(
+        self,
+        attempt: int,
+        *,
+        error: Exception | None = None,
+        response: httpx.Response | None = None,
+    ) -> float:
+        """Seconds to wait before retrying a failed attempt, or raise if it is final."""
+        if error is not None:
+            if attempt >= self.max_retries:
+                raise UpstreamError("Inference backend unavailable") from error
+            logger.warning("inference request failed (%s), retrying", error)
+            retry_after = None
+        else:
+            if response.status_code not in _RETRY_STATUSES or attempt >= self.max_retries:
+                raise UpstreamError(
+                    f"Inference backend returned {response.status_code}",
+                    status_code=response.status_code,
+                )
+            retry_after = _retry_after(response)
+            logger.warning("inference backend returned %s, retrying", response.status_code)
+
+        # Full jitter: spreads retries from many clients after an outage.
+        delay = random.uniform(0, self.retry_backoff * 2**attempt)
+        return max(delay, retry_after or 0.0)
+
+
+def _completion(response: httpx.Response, payload: dict) -> ChatResponse:
+    try:
+        data = response.json()
+        content = data["choices"][0]["message"]["content"]
+        model = data.get("model", payload["model"])
+    except (ValueError, LookupError, TypeError, AttributeError) as exc:
+        raise UpstreamError(_MALFORMED) from exc
+    if content is not None and not isinstance(content, str):
+        raise UpstreamError(_MALFORMED)
+    return ChatResponse(content=content or "", mode="chat", model=model)
+
+
+def _event(line: str):
+    """Decode one SSE line: a chunk dict, ``_DONE``, or None for anything else."""
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return _DONE
+    try:
+        chunk = json.loads(data)
+    except ValueError as exc:
+        raise UpstreamError(_MALFORMED) from exc
+    if not isinstance(chunk, dict):
+        raise UpstreamError(_MALFORMED)
+    return chunk
+
+
+def _delta(chunk: dict) -> str | None:
+    try:
+        choices = chunk.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content")
+    except (LookupError, TypeError, AttributeError) as exc:
+        raise UpstreamError(_MALFORMED) from exc
+    if delta is not None and not isinstance(delta, str):
+        raise UpstreamError(_MALFORMED)
+    return delta
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    try:
+        return min(float(value), 30.0) if value else None
+    except ValueError:
+        return None
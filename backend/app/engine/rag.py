@@ -0,0 +1,113 @@
+"""
+Retrieval-augmented generation on top of any chat engine.
+
+:class:`RagChatEngine` retrieves the ``context.top_k`` chunks most similar
+to the question, puts them into the prompt and delegates generation to the
+wrapped engine.  The chunks' sources come back as ``ChatResponse.sources``
+with ``mode="rag"``.  When nothing in the corpus scores above
+``min_score`` the question goes to the wrapped engine unchanged.
+"""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import AsyncIterator, Iterator, List
+
+from app.engine.adapter import run_sync
+from app.engine.base import ChatEngine
+from app.engine.context import ChatContext
+from app.engine.response import ChatResponse
+from app.engine.retrieval import Hit, Retriever
+from app.engine.stream import AsyncChatStream, ChatStream, StreamItem
+
+_PROMPT = (
+    "Answer the question using the numbered context passages below. "
+    "If they do not contain the answer, say so.\n\n"
+    "{passages}\n\n"
+    "Question: {question}"
+)
+
+
+class RagChatEngine(ChatEngine):
+    """Grounds ``engine``'s answers in chunks retrieved from ``retriever``."""
+
+    def __init__(self, engine: ChatEngine, retriever: Retriever, *, min_score: float = 0.1) -> None:
+        self.engine = engine
+        self.retriever = retriever
+        self.min_score = min_score
+
+    # -- ChatEngine --------------------------------------------------------
+
+    def answer(self, query: str, context: ChatContext) -> ChatResponse:
+        hits = self._retrieve(query, context.top_k)
+        if not hits:
+            return self.engine.answer(query, context)
+        return _grounded(self.engine.answer(*self._augment(query, context, hits)), hits)
+
+    def stream(self, query: str, context: ChatContext) -> ChatStream:
+        hits = self._retrieve(query, context.top_k)
+        if not hits:
+            return self.engine.stream(query, context)
+        return ChatStream(self._ground_sync(self.engine.stream(*self._augment(query, context, hits)), hits))
+
+    async def aanswer(self, query: str, context: ChatContext) -> ChatResponse:
+        # Scoring a large corpus takes milliseconds of NumPy time (which
+        # releases the GIL), so it runs on the engine pool.
+        hits = await run_sync(self._retrieve, query, context.top_k)
+        if not hits:
+            return await self.engine.aanswer(query, context)
+        return _grounded(await self.engine.aanswer(*self._augment(query, context, hits)), hits)
+
+    def astream(self, query: str, context: ChatContext) -> AsyncChatStream:
+        return AsyncChatStream(self._agenerate(query, context))
+
+    async def aclose(self) -> None:
+        close = getattr(self.retriever.store, "close", None)
+        if close is not None:
+            close()
+        aclose = getattr(self.engine, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    # -- internals ---------------------------------------------------------
+
+    def _retrieve(self, query: str, k: int) -> List[Hit]:
+        if k <= 0 or len(self.retriever.store) == 0:
+            return []
+        (hits,) = self.retriever.search([query], k)
+        return [hit for hit in hits if hit[1] >= self.min_score]
+
+    def _augment(self, query: str, context: ChatContext, hits: List[Hit]) -> tuple[str, ChatContext]:
+        passages = "\n\n".join(
+            f"[{n}] ({chunk.source})\n{chunk.text}" for n, (chunk, _) in enumerate(hits, 1)
+        )
+        prompt = _PROMPT.format(passages=passages, question=query)
+        history = list(context.history)
+        # Swap the persisted question for the grounded prompt so it is not
+        # sent twice.
+        if history and history[-1].role == "user" and history[-1].content == query:
+            history[-1] = replace(history[-1], content=prompt)
+        return prompt, replace(context, history=history)
+
+    def _ground_sync(self, stream: ChatStream, hits: List[Hit]) -> Iterator[StreamItem]:
+        yield from stream
+        yield _grounded(stream.response, hits)
+
+    async def _agenerate(self, query: str, context: ChatContext) -> AsyncIterator[StreamItem]:
+        hits = await run_sync(self._retrieve, query, context.top_k)
+        if not hits:
+            stream = self.engine.astream(query, context)
+        else:
+            stream = self.engine.astream(*self._augment(query, context, hits))
+        tokens = stream.__aiter__()
+        try:
+            async for token in tokens:
+                yield token
+        finally:
+            await tokens.aclose()
+        yield _grounded(stream.response, hits) if hits else stream.response
+
+
+def _grounded(response: ChatResponse, hits: List[Hit]) -> ChatResponse:
+    sources = list(dict.fromkeys(chunk.source for chunk, _ in hits))
+    return replace(response, sources=sources, mode="rag", confidence=round(hits[0][1], 4))
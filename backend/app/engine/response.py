@@ -17,6 +17,6 @@ class ChatResponse:
 
     content: str
     sources: List[str] = field(default_factory=list)
-    mode: str = "chat"  # "chat" | "rag" | "echo"
+    mode: str = "chat"  # "chat" | "rag" | "echo" | "cache"
     confidence: float = 0.0
     model: Optional[str] = None
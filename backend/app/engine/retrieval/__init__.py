@@ -0,0 +1,95 @@
+"""
+Document retrieval for retrieval-augmented generation.
+
+``Retriever`` ties an :class:`Embedder` to a vector index (exact
+in-memory :class:`VectorStore`, on-disk :class:`MmapVectorStore`, or
+approximate :class:`IVFIndex`): it chunks and indexes documents, and
+returns the ``top_k`` most similar chunks for a batch of questions.
+:class:`Ingestor` streams large uploaded documents into a live retriever.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+
+from app.engine.retrieval.chunking import chunk_stream, chunk_text
+from app.engine.retrieval.embedder import Embedder, HashingEmbedder, normalize_rows
+from app.engine.retrieval.ingest import IngestJob, Ingestor
+from app.engine.retrieval.ivf import IVFIndex
+from app.engine.retrieval.mmap_store import MmapVectorStore
+from app.engine.retrieval.store import Chunk, Hit, VectorIndex, VectorStore, top_k
+
+# Text formats indexed from a corpus directory.
+CORPUS_SUFFIXES = {".txt", ".md", ".markdown", ".rst"}
+
+
+class Retriever:
+    """Embeds, indexes and searches document chunks."""
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        store: VectorIndex | None = None,
+        *,
+        chunk_chars: int = 800,
+        chunk_overlap: int = 100,
+        batch_size: int = 256,
+    ) -> None:
+        self.embedder = embedder
+        self.store = store if store is not None else VectorStore(embedder.dim)
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        # Chunks embedded and added per call; each add is one segment on disk.
+        self.batch_size = batch_size
+
+    def add_documents(self, documents: Iterable[Tuple[str, str]]) -> int:
+        """Index ``(source, text)`` pairs; returns the number of chunks added."""
+        added = 0
+        batch: List[Chunk] = []
+        for source, text in documents:
+            for piece in chunk_text(text, self.chunk_chars, self.chunk_overlap):
+                batch.append(Chunk(text=piece, source=source))
+                if len(batch) >= self.batch_size:
+                    added += self._flush(batch)
+        return added + self._flush(batch)
+
+    def add_directory(self, path: str) -> int:
+        """Index every text file under ``path``; sources are relative paths."""
+        root = Path(path)
+        files = sorted(p for p in root.rglob("*") if p.suffix.lower() in CORPUS_SUFFIXES)
+        return self.add_documents(
+            (str(p.relative_to(root)), p.read_text(encoding="utf-8", errors="replace"))
+            for p in files
+        )
+
+    def search(self, queries: Sequence[str], k: int) -> List[List[Hit]]:
+        """Top ``k`` chunks per query, best first, embedded as one batch."""
+        return self.store.search(self.embedder.embed(queries), k)
+
+    def _flush(self, batch: List[Chunk]) -> int:
+        if not batch:
+            return 0
+        self.store.add(batch, self.embedder.embed([c.text for c in batch]))
+        count = len(batch)
+        batch.clear()
+        return count
+
+
+__all__ = [
+    "Chunk",
+    "Embedder",
+    "HashingEmbedder",
+    "Hit",
+    "IVFIndex",
+    "IngestJob",
+    "Ingestor",
+    "MmapVectorStore",
+    "Retriever",
+    "VectorIndex",
+    "VectorStore",
+    "chunk_stream",
+    "chunk_text",
+    "normalize_rows",
+    "top_k",
+]
@@ -0,0 +1,59 @@
+"""Split documents into overlapping chunks sized for embedding and prompts."""
+
+from __future__ import annotations
+
+from typing import Generator, Iterable, Iterator
+
+
+def chunk_text(text: str, max_chars: int = 800, overlap: int = 100) -> Iterator[str]:
+    """
+    Yield chunks of at most ``max_chars`` characters.
+
+    Chunks end on a paragraph, sentence or word boundary where one exists
+    in the second half of the window, and consecutive chunks share up to
+    ``overlap`` characters so a fact split across a boundary is still
+    retrievable.
+    """
+    return chunk_stream((text,), max_chars, overlap)
+
+
+def chunk_stream(blocks: Iterable[str], max_chars: int = 800, overlap: int = 100) -> Iterator[str]:
+    """
+    Chunk text arriving in ``blocks`` (e.g. decoded reads of a large file).
+
+    Yields exactly what :func:`chunk_text` yields for the concatenated text,
+    while holding only the unchunked tail and the current block in memory.
+    """
+    text, start = "", 0
+    for block in blocks:
+        text = text[start:] + block if text else block.lstrip()
+        # Only cut windows that end before the (right-stripped) tail: the
+        # next block may continue it.
+        start = yield from _split(text, 0, len(text.rstrip()), max_chars, overlap, final=False)
+    yield from _split(text, start, len(text.rstrip()), max_chars, overlap, final=True)
+
+
+def _split(
+    text: str, start: int, stop: int, max_chars: int, overlap: int, final: bool
+) -> Generator[str, None, int]:
+    """Chunk ``text[start:stop]``; returns where the unchunked remainder begins."""
+    while start < stop:
+        end = start + max_chars
+        if end >= stop:
+            if not final:
+                return start
+            end = stop
+        else:
+            window = text[start:end]
+            for separator in ("\n\n", ". ", "\n", " "):
+                cut = window.rfind(separator, max_chars // 2)
+                if cut != -1:
+                    end = start + cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            yield chunk
+        if end >= stop:
+            return stop
+        start = max(end - overlap, start + 1)
+    return start
@@ -0,0 +1,64 @@
+"""
+Text embedders for retrieval.
+
+An :class:`Embedder` turns texts into L2-normalized ``float32`` rows, so the
+dot product of two rows is their cosine similarity.  Real deployments plug
+in a sentence-transformer or an embeddings API; :class:`HashingEmbedder` is
+a dependency-free, deterministic default for tests and small corpora.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import hashlib
+import re
+from typing import Sequence
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class Embedder(ABC):
+    """Maps texts to unit-length vectors of size :attr:`dim`."""
+
+    dim: int
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a ``(len(texts), dim)`` float32 array of unit rows."""
+        ...
+
+
+class HashingEmbedder(Embedder):
+    """
+    Feature-hashing bag of words and word bigrams.
+
+    Each feature is hashed (BLAKE2b, so results are identical across runs
+    and processes) into one of ``dim`` buckets with a random sign; counts
+    are log-scaled and rows normalized.  Similar wording gives similar
+    vectors, which is all lexical retrieval needs.
+    """
+
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD_RE.findall(text.casefold())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                digest = int.from_bytes(
+                    hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"
+                )
+                out[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        np.copysign(np.log1p(np.abs(out)), out, out=out)
+        return normalize_rows(out)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length in place (all-zero rows stay zero)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
@@ -0,0 +1,290 @@
+"""
+Streaming document ingestion into a live :class:`~app.engine.retrieval.Retriever`.
+
+Uploads are spooled to disk by the API and handed to :class:`Ingestor` as
+jobs.  A single background thread runs one job at a time as a generator
+pipeline::
+
+    read 1 MiB blocks -> incremental UTF-8 decode -> chunk_stream()
+        -> batches of embed_batch_size -> process pool (embed)
+        -> buffered bulk store.add() of retriever.batch_size rows
+
+Every stage pulls from the previous one, and at most ``max_in_flight``
+embedding batches are outstanding, so memory stays bounded by a few
+batches however large the document is.  Embedding runs in worker
+processes, keeping its CPU time off the GIL that the event loop and chat
+streams need.  The job queue is bounded too: :meth:`Ingestor.submit`
+raises ``queue.Full`` instead of letting uploads pile up on disk.
+
+Job state lives in the process that accepted the upload.
+"""
+
+from __future__ import annotations
+
+import codecs
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import islice
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import queue
+import threading
+import time
+import uuid
+from typing import BinaryIO, Iterator, List, Sequence
+
+import numpy as np
+
+from app.engine.retrieval.chunking import chunk_stream
+from app.engine.retrieval.embedder import Embedder
+from app.engine.retrieval.store import Chunk
+
+logger = logging.getLogger("app.ingest")
+
+# Bytes read from the spooled upload per step.
+_READ_BLOCK = 1 << 20
+# Finished jobs kept for status queries; the oldest are forgotten first.
+_MAX_FINISHED_JOBS = 256
+
+
+class _Cancelled(Exception):
+    """Raised inside a running job when the ingestor shuts down."""
+
+
+@dataclass
+class IngestJob:
+    """Progress of one document; fields are written by the ingest thread only."""
+
+    id: str
+    source: str
+    owner: str
+    path: Path
+    bytes_total: int
+    status: str = "queued"  # queued | running | done | failed
+    bytes_read: int = 0
+    chunks: int = 0  # chunks written to the store (searchable)
+    error: str | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def snapshot(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "id": self.id,
+            "source": self.source,
+            "status": self.status,
+            "bytes_total": self.bytes_total,
+            "bytes_read": self.bytes_read,
+            "progress": round(self.bytes_read / self.bytes_total, 4) if self.bytes_total else 1.0,
+            "chunks": self.chunks,
+            "chunks_per_sec": round(self.chunks / elapsed, 1) if elapsed > 0 else 0.0,
+            "elapsed": round(elapsed, 3),
+            "error": self.error,
+            "created_at": self.created_at,
+        }
+
+
+def read_blocks(
+    handle: BinaryIO, block_size: int = _READ_BLOCK, encoding: str = "utf-8"
+) -> Iterator[str]:
+    """Decode a binary file incrementally; multi-byte characters may span reads."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    while block := handle.read(block_size):
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+def embed_batch(embedder: Embedder, texts: Sequence[str]) -> np.ndarray:
+    """Worker-process entry point (module level so it pickles)."""
+    return embedder.embed(texts)
+
+
+class Ingestor:
+    """Runs ingestion jobs against ``retriever`` on a background thread."""
+
+    stats_key = "ingest"
+
+    def __init__(
+        self,
+        retriever,
+        *,
+        workers: int = 2,
+        max_queued_jobs: int = 8,
+        embed_batch_size: int = 256,
+        save_path: str | None = None,
+    ) -> None:
+        self.retriever = retriever
+        self.workers = workers
+        self.embed_batch_size = embed_batch_size
+        # Embedding batches outstanding at once: enough to keep every worker
+        # busy while the previous result is written.
+        self.max_in_flight = max(2, 2 * workers)
+        # Indexes that live in memory (IVF) are saved here after each job.
+        self.save_path = save_path
+        self._queue: queue.Queue[IngestJob] = queue.Queue(max_queued_jobs)
+        self._jobs: OrderedDict[str, IngestJob] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pool: ProcessPoolExecutor | None = None
+
+    # -- API ---------------------------------------------------------------
+
+    def has_capacity(self) -> bool:
+        return not self._queue.full()
+
+    def submit(self, path: Path, source: str, owner: str) -> IngestJob:
+        """
+        Queue the spooled file at ``path``; the job deletes it when done.
+
+        Raises ``queue.Full`` when ``max_queued_jobs`` are already waiting.
+        """
+        job = IngestJob(
+            id=uuid.uuid4().hex,
+            source=source,
+            owner=owner,
+            path=Path(path),
+            bytes_total=os.path.getsize(path),
+        )
+        with self._lock:
+            self._start()
+            self._queue.put_nowait(job)
+            self._jobs[job.id] = job
+            self._forget_finished()
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {status: 0 for status in ("queued", "running", "done", "failed")}
+        for job in jobs:
+            counts[job.status] += 1
+        running = [job for job in jobs if job.status == "running"]
+        return {
+            "jobs": counts,
+            "max_queued_jobs": self._queue.maxsize,
+            "workers": self.workers,
+            "chunks_per_sec": running[0].snapshot()["chunks_per_sec"] if running else 0.0,
+        }
+
+    def close(self) -> None:
+        """Stop after the current batch; queued jobs fail and their files are removed."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(job, "shut down before the job started")
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    # -- job thread --------------------------------------------------------
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="ingest", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            job.status = "running"
+            job.started_at = time.monotonic()
+            try:
+                self._ingest(job)
+            except _Cancelled:
+                self._finish(job, "shut down while running")
+            except Exception as exc:  # surfaced through the job status
+                logger.exception("Ingestion of %s failed", job.source)
+                self._finish(job, f"{type(exc).__name__}: {exc}")
+            else:
+                self._finish(job)
+
+    def _ingest(self, job: IngestJob) -> None:
+        embedder = self.retriever.embedder
+        in_flight: deque[tuple[List[str], Future]] = deque()
+        pending: List[Chunk] = []
+        vectors: List[np.ndarray] = []
+
+        def collect() -> None:
+            texts, future = in_flight.popleft()
+            pending.extend(Chunk(text=text, source=job.source) for text in texts)
+            vectors.append(future.result())
+            if len(pending) >= self.retriever.batch_size:
+                self._write(job, pending, vectors)
+
+        with open(job.path, "rb") as handle:
+            blocks = self._track(job, handle, read_blocks(handle))
+            chunks = chunk_stream(blocks, self.retriever.chunk_chars, self.retriever.chunk_overlap)
+            while texts := list(islice(chunks, self.embed_batch_size)):
+                if self._stop.is_set():
+                    raise _Cancelled
+                in_flight.append((texts, self._embed(embedder, texts)))
+                if len(in_flight) >= self.max_in_flight:
+                    collect()
+            while in_flight:
+                collect()
+        self._write(job, pending, vectors)
+        if self.save_path is not None and hasattr(self.retriever.store, "save"):
+            self.retriever.store.save(self.save_path)
+
+    def _track(self, job: IngestJob, handle: BinaryIO, blocks: Iterator[str]) -> Iterator[str]:
+        for block in blocks:
+            job.bytes_read = handle.tell()
+            yield block
+
+    def _embed(self, embedder: Embedder, texts: List[str]) -> Future:
+        if self.workers <= 0:
+            future: Future = Future()
+            future.set_result(embedder.embed(texts))
+            return future
+        if self._pool is None:
+            # Forking a process that runs threads (uvicorn, SQLite pools) is
+            # unsafe, so workers start fresh.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool.submit(embed_batch, embedder, texts)
+
+    def _write(self, job: IngestJob, pending: List[Chunk], vectors: List[np.ndarray]) -> None:
+        if not pending:
+            return
+        self.retriever.store.add(list(pending), np.concatenate(vectors))
+        job.chunks += len(pending)
+        pending.clear()
+        vectors.clear()
+
+    def _finish(self, job: IngestJob, error: str | None = None) -> None:
+        job.status = "failed" if error else "done"
+        job.error = error
+        if job.started_at is not None:
+            job.finished_at = time.monotonic()
+        job.path.unlink(missing_ok=True)
+
+    def _forget_finished(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job_id in finished[: max(0, len(finished) - _MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
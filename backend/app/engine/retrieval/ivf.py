@@ -0,0 +1,421 @@
+"""
+Approximate nearest-neighbour search: inverted file (IVF) with optional
+product quantization (PQ), in plain NumPy.
+
+Exact search scores every chunk, so its cost grows linearly with the
+corpus.  :class:`IVFIndex` clusters the vectors with spherical k-means
+into ``nlist`` inverted lists and, per query, scores only the ``nprobe``
+lists whose centroids are closest.  ``nprobe`` trades recall for latency
+and can be changed at any time.
+
+With ``pq_m > 0`` each vector's residual from its centroid is stored as
+``pq_m`` one-byte codes (one per sub-space of ``dim / pq_m`` dimensions)
+instead of ``dim`` floats, cutting memory by up to ``4 * dim / pq_m``.
+Scores are then computed from per-query lookup tables (asymmetric
+distance), so no vector is ever decompressed.
+
+The index trains itself once ``train_size`` vectors have been added;
+until then it answers exactly from a flat buffer.  Later insertions are
+assigned to the existing centroids.  :meth:`save` / :meth:`load`
+round-trip the whole index through a directory.  An index loaded from
+(or saved to) a directory reloads itself when another process saves
+there, so every worker serves the latest saved copy; the saved file wins
+over vectors added in memory and not saved.  Workers that may build the
+same directory serialize on :func:`exclusive` (an advisory file lock).
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+from typing import Iterator, List, Sequence
+
+import numpy as np
+
+from app.engine.retrieval.embedder import normalize_rows
+from app.engine.retrieval.store import Chunk, Hit, top_k
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+_LOCK = ".lock"
+
+_PQ_CENTROIDS = 256  # one byte per code
+_BLOCK_ROWS = 65_536
+# Replaced in place when another process saves a newer copy; ``nprobe``
+# stays a per-process setting.
+_SAVED_STATE = (
+    "dim",
+    "nlist",
+    "pq_m",
+    "train_size",
+    "seed",
+    "centroids",
+    "codebooks",
+    "_lists",
+    "_pending",
+    "_pending_ids",
+    "_chunks",
+)
+
+
+def kmeans(
+    x: np.ndarray,
+    k: int,
+    *,
+    iters: int = 20,
+    spherical: bool = False,
+    rng: np.random.Generator | None = None,
+) -> np.ndarray:
+    """
+    Lloyd's k-means; returns ``(k, dim)`` float32 centroids.
+
+    ``spherical`` clusters unit vectors by inner product and keeps the
+    centroids normalized (what the coarse quantizer needs); otherwise
+    clustering is Euclidean (what PQ codebooks need).  Empty clusters are
+    re-seeded from random points.
+    """
+    rng = rng or np.random.default_rng(0)
+    x = np.asarray(x, dtype=np.float32)
+    centroids = x[rng.choice(len(x), size=k, replace=len(x) < k)].copy()
+    for _ in range(iters):
+        assign = _nearest(x, centroids, spherical)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        # Per-cluster sums in one pass over the rows sorted by cluster.
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(x[np.argsort(assign, kind="stable")], starts[~empty])
+        sums[~empty] /= counts[~empty, None]
+        sums[empty] = x[rng.choice(len(x), size=int(empty.sum()))]
+        centroids = normalize_rows(sums) if spherical else sums
+    return centroids
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray, spherical: bool) -> np.ndarray:
+    """Index of the closest centroid for every row of ``x``, in blocks."""
+    # argmin |x - c|^2 == argmax (x.c - |c|^2 / 2); for unit centroids, x.c.
+    bias = 0.0 if spherical else 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), _BLOCK_ROWS):
+        block = x[start : start + _BLOCK_ROWS]
+        out[start : start + len(block)] = np.argmax(block @ centroids.T - bias, axis=1)
+    return out
+
+
+class _List:
+    """One inverted list: payload rows (floats or PQ codes) and chunk ids."""
+
+    def __init__(self, width: int, dtype) -> None:
+        self.rows = np.zeros((0, width), dtype=dtype)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.size = 0
+
+    def append(self, rows: np.ndarray, ids: np.ndarray) -> None:
+        needed = self.size + len(rows)
+        if needed > len(self.rows):
+            capacity = max(needed, 2 * len(self.rows), 16)
+            grown = np.zeros((capacity, self.rows.shape[1]), dtype=self.rows.dtype)
+            grown[: self.size] = self.rows[: self.size]
+            grown_ids = np.zeros(capacity, dtype=np.int64)
+            grown_ids[: self.size] = self.ids[: self.size]
+            self.rows, self.ids = grown, grown_ids
+        self.rows[self.size : needed] = rows
+        self.ids[self.size : needed] = ids
+        self.size = needed
+
+    def view(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.rows[: self.size], self.ids[: self.size]
+
+
+class IVFIndex:
+    """Inverted-file ANN index over unit vectors, optionally PQ-compressed."""
+
+    def __init__(
+        self,
+        dim: int,
+        *,
+        nlist: int = 1024,
+        nprobe: int = 16,
+        pq_m: int = 0,
+        train_size: int | None = None,
+        seed: int = 0,
+    ) -> None:
+        if pq_m and dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide dim={dim}")
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        # Enough points per centroid for stable clusters (and PQ codebooks).
+        self.train_size = train_size or max(nlist * 39, _PQ_CENTROIDS * 39 if pq_m else 0)
+        self.seed = seed
+        self.centroids: np.ndarray | None = None
+        self.codebooks: np.ndarray | None = None  # (pq_m, 256, dim / pq_m)
+        self._lists: List[_List] = []
+        self._pending: List[np.ndarray] = []  # vectors added before training
+        self._pending_ids: List[np.ndarray] = []
+        self._chunks: List[Chunk] = []
+        self._lock = threading.Lock()
+        # Directory this index was loaded from or saved to, and the stamp of
+        # its index.npz at that time.
+        self.path: Path | None = None
+        self._stamp: tuple | None = None
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._chunks)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    # -- building ----------------------------------------------------------
+
+    def add(self, chunks: Sequence[Chunk], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(chunks), self.dim):
+            raise ValueError(f"expected vectors of shape ({len(chunks)}, {self.dim})")
+        vectors = normalize_rows(vectors.copy())
+        with self._lock:
+            ids = np.arange(len(self._chunks), len(self._chunks) + len(chunks))
+            if self.trained:
+                self._assign(vectors, ids)
+            else:
+                self._pending.append(vectors)
+                self._pending_ids.append(ids)
+            self._chunks.extend(chunks)
+            if not self.trained and len(self._chunks) >= self.train_size:
+                self._train_pending()
+
+    def train(self) -> None:
+        """Train now on everything added so far (normally automatic)."""
+        with self._lock:
+            if not self.trained and self._pending:
+                self._train_pending()
+
+    def _train_pending(self) -> None:
+        vectors = np.concatenate(self._pending)
+        ids = np.concatenate(self._pending_ids)
+        rng = np.random.default_rng(self.seed)
+        sample = vectors
+        if len(vectors) > self.nlist * 256:
+            sample = vectors[rng.choice(len(vectors), self.nlist * 256, replace=False)]
+        nlist = min(self.nlist, len(sample))
+        self.centroids = kmeans(sample, nlist, spherical=True, rng=rng)
+        if self.pq_m:
+            # 256 codes per sub-space need far fewer points than the coarse
+            # quantizer; a smaller sample keeps training time reasonable.
+            pq_sample = sample[: _PQ_CENTROIDS * 100]
+            residuals = pq_sample - self.centroids[_nearest(pq_sample, self.centroids, True)]
+            sub = self.dim // self.pq_m
+            self.codebooks = np.stack(
+                [
+                    kmeans(residuals[:, m * sub : (m + 1) * sub], _PQ_CENTROIDS, iters=10, rng=rng)
+                    for m in range(self.pq_m)
+                ]
+            )
+        width, dtype = (self.pq_m, np.uint8) if self.pq_m else (self.dim, np.float32)
+        self._lists = [_List(width, dtype) for _ in range(nlist)]
+        self._pending, self._pending_ids = [], []
+        self._assign(vectors, ids)
+
+    def _assign(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        lists = _nearest(vectors, self.centroids, True)
+        payload = self._encode(vectors - self.centroids[lists]) if self.pq_m else vectors
+        order = np.argsort(lists, kind="stable")
+        bounds = np.searchsorted(lists[order], np.arange(len(self._lists) + 1))
+        for number in np.flatnonzero(np.diff(bounds)):
+            rows = order[bounds[number] : bounds[number + 1]]
+            self._lists[number].append(payload[rows], ids[rows])
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        sub = self.dim // self.pq_m
+        codes = np.empty((len(residuals), self.pq_m), dtype=np.uint8)
+        for m in range(self.pq_m):
+            codes[:, m] = _nearest(residuals[:, m * sub : (m + 1) * sub], self.codebooks[m], False)
+        return codes
+
+    # -- searching ---------------------------------------------------------
+
+    def search(self, queries: np.ndarray, k: int, nprobe: int | None = None) -> List[List[Hit]]:
+        """Approximate top ``k`` per query, best first, probing ``nprobe`` lists."""
+        self.refresh()
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            chunks = self._chunks
+            centroids, codebooks = self.centroids, self.codebooks
+            if not self.trained:
+                pending = np.concatenate(self._pending) if self._pending else None
+                lists = None
+            else:
+                lists = [lst.view() for lst in self._lists]
+        if lists is None:
+            if pending is None:
+                return [[] for _ in range(len(queries))]
+            indices, scores = top_k(queries @ pending.T, k)
+            return _hits(chunks, indices, scores)
+
+        nprobe = min(nprobe or self.nprobe, len(lists))
+        probes, _ = top_k(queries @ centroids.T, nprobe)
+        results = []
+        for query, probe in zip(queries, probes):
+            tables = _tables(codebooks, query) if codebooks is not None else None
+            ids, scores = [], []
+            for number in probe:
+                rows, row_ids = lists[number]
+                if not len(rows):
+                    continue
+                if tables is None:
+                    scores.append(rows @ query)
+                else:
+                    base = float(centroids[number] @ query)
+                    scores.append(base + tables[np.arange(len(codebooks)), rows].sum(axis=1))
+                ids.append(row_ids)
+            if not ids:
+                results.append([])
+                continue
+            best, best_scores = top_k(np.concatenate(scores)[None, :], k)
+            chosen = np.concatenate(ids)[best[0]]
+            results.append([(chunks[i], float(s)) for i, s in zip(chosen, best_scores[0])])
+        return results
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to directory ``path`` (``index.npz`` + ``chunks.jsonl``).
+
+        An index that has not reached ``train_size`` yet is trained first.
+        ``index.npz`` is replaced last: its rename publishes the new copy to
+        indexes in other processes watching ``path``.
+        """
+        root = Path(path)
+        root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if not self.trained and self._pending:
+                self._train_pending()
+            views = [lst.view() for lst in self._lists]
+            arrays = {
+                "config": np.array(
+                    [self.dim, self.nlist, self.nprobe, self.pq_m, self.train_size, self.seed]
+                ),
+                "sizes": np.array([len(ids) for _, ids in views], dtype=np.int64),
+            }
+            if self.trained:
+                arrays["centroids"] = self.centroids
+                arrays["rows"] = np.concatenate([rows for rows, _ in views])
+                arrays["ids"] = np.concatenate([ids for _, ids in views])
+            if self.codebooks is not None:
+                arrays["codebooks"] = self.codebooks
+            chunks = list(self._chunks)
+        # Unique temp names: concurrent saves to one directory never write
+        # into each other's files, and the last rename wins.
+        fd, tmp = tempfile.mkstemp(dir=root, prefix="chunks.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            for chunk in chunks:
+                handle.write(
+                    json.dumps(
+                        {"text": chunk.text, "source": chunk.source, "metadata": chunk.metadata},
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+        Path(tmp).replace(root / "chunks.jsonl")
+        fd, tmp = tempfile.mkstemp(dir=root, prefix="index.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as handle:
+            np.savez(handle, **arrays)
+        stat = os.stat(tmp)  # the rename keeps inode and mtime
+        Path(tmp).replace(root / "index.npz")
+        # Our own save is not a change to reload.
+        self.path, self._stamp = root, (stat.st_ino, stat.st_mtime_ns)
+
+    @classmethod
+    def _read(cls, root: Path) -> "IVFIndex":
+        with np.load(root / "index.npz") as data:
+            dim, nlist, nprobe, pq_m, train_size, seed = (int(v) for v in data["config"])
+            index = cls(dim, nlist=nlist, nprobe=nprobe, pq_m=pq_m, train_size=train_size, seed=seed)
+            with open(root / "chunks.jsonl", encoding="utf-8") as handle:
+                index._chunks = [Chunk(**json.loads(line)) for line in handle]
+            if "centroids" not in data:
+                return index
+            index.centroids = data["centroids"]
+            index.codebooks = data["codebooks"] if "codebooks" in data else None
+            rows, ids = data["rows"], data["ids"]
+            width, dtype = (pq_m, np.uint8) if pq_m else (dim, np.float32)
+            start = 0
+            for size in data["sizes"]:
+                lst = _List(width, dtype)
+                lst.rows, lst.ids = rows[start : start + size].copy(), ids[start : start + size].copy()
+                lst.size = int(size)
+                index._lists.append(lst)
+                start += size
+        return index
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Load the index saved in ``path`` and keep following later saves there."""
+        root = Path(path)
+        stamp = _stamp(root)
+        index = cls._read(root)
+        index.path, index._stamp = root, stamp
+        return index
+
+    def refresh(self) -> None:
+        """Reload if another process saved to :attr:`path` (a ``stat`` when unchanged)."""
+        if self.path is None:
+            return
+        stamp = _stamp(self.path)
+        if stamp is None or stamp == self._stamp:
+            return
+        try:
+            fresh = self._read(self.path)
+        except (FileNotFoundError, ValueError, EOFError):
+            return  # mid-save elsewhere; the next search tries again
+        with self._lock:
+            for name in _SAVED_STATE:
+                setattr(self, name, getattr(fresh, name))
+            self._stamp = stamp
+
+
+@contextmanager
+def exclusive(path: str) -> Iterator[None]:
+    """Hold the writer lock of index directory ``path`` (across processes)."""
+    root = Path(path)
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / _LOCK, "a+") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _stamp(root: Path) -> tuple | None:
+    # Every save is a rename, so the inode changes even within the
+    # filesystem's mtime granularity.
+    try:
+        stat = (root / "index.npz").stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def _tables(codebooks: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """``(pq_m, 256)`` inner products of each query sub-vector with each code."""
+    return np.einsum("mcd,md->mc", codebooks, query.reshape(len(codebooks), -1))
+
+
+def _hits(chunks: Sequence[Chunk], indices: np.ndarray, scores: np.ndarray) -> List[List[Hit]]:
+    return [
+        [(chunks[i], float(s)) for i, s in zip(row_idx, row_scores)]
+        for row_idx, row_scores in zip(indices, scores)
+    ]
@@ -0,0 +1,358 @@
+"""
+On-disk vector store opened with ``numpy.memmap``.
+
+A million 384-wide float32 embeddings take 1.5 GiB; loading them into every
+uvicorn worker multiplies that by the worker count.  :class:`MmapVectorStore`
+keeps them in files that each worker maps read-only, so the OS page cache
+holds a single copy shared by all processes, and opening the store is
+O(number of segments), not O(corpus).
+
+Layout of the store directory::
+
+    manifest.json        {"dim", "dtype", "segments": [{"name", "rows"}, ...]}
+    seg-000001.vec       rows x dim matrix, float16 or float32, C order
+    seg-000001.jsonl     one chunk per line: {"text", "source", "metadata"}
+    seg-000001.idx       uint64 byte offsets of each line (rows + 1 entries)
+
+Segments are immutable.  ``add()`` writes a new segment and then swaps in a
+new manifest with an atomic rename, so readers (including other processes,
+which re-read the manifest when it changes) never see a partial segment.
+``compact()`` merges the newest, small segments into one, either on demand
+or from a background thread started with :meth:`start_compaction`.  It is
+size-tiered: a segment much larger than everything after it (typically the
+base corpus) is left alone, so a compaction copies recent appends rather
+than the whole store.  Writers in
+different processes are serialized with a lock file.
+
+Chunk metadata is decoded only for search hits.
+
+``float16`` halves disk and page-cache use, but NumPy has no half-precision
+BLAS, so every scored block is converted to float32 first; searches cost
+several times more CPU than with ``float32``.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+import threading
+from typing import Iterator, List, Sequence
+
+import numpy as np
+
+from app.engine.retrieval.embedder import normalize_rows
+from app.engine.retrieval.store import Chunk, Hit, top_k
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger("app.retrieval")
+
+_MANIFEST = "manifest.json"
+_LOCK = ".lock"
+# Rows scored per step; bounds the float32 working set for float16 segments.
+_BLOCK_ROWS = 65_536
+# A segment more than this many times larger than all newer segments
+# combined ends the run that compaction merges.
+_TIER_RATIO = 4
+# Manifest re-reads when a compaction deletes the segments just listed.
+_REFRESH_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class _Segment:
+    name: str
+    vectors: np.ndarray  # read-only memmap, rows x dim
+    offsets: np.ndarray  # memmap, rows + 1
+    text: mmap.mmap | bytes
+
+    @property
+    def rows(self) -> int:
+        return len(self.vectors)
+
+    def chunk(self, row: int) -> Chunk:
+        line = self.text[int(self.offsets[row]) : int(self.offsets[row + 1])]
+        data = json.loads(line)
+        return Chunk(text=data["text"], source=data["source"], metadata=data.get("metadata", {}))
+
+
+class MmapVectorStore:
+    """Append-only, memory-mapped store of unit vectors with exact top-k search."""
+
+    def __init__(self, path: str, dim: int, dtype: str = "float32") -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+        self._manifest_stamp: tuple | None = None
+        self._segments: List[_Segment] = []
+        self._compactor: threading.Thread | None = None
+        self._stop = threading.Event()
+
+        manifest = self._read_manifest()
+        if manifest is None:
+            self.dim, self.dtype = dim, np.dtype(dtype)
+            with self.exclusive():
+                if self._read_manifest() is None:
+                    self._write_manifest([])
+        else:
+            self.dim, self.dtype = manifest["dim"], np.dtype(manifest["dtype"])
+            if self.dim != dim:
+                raise ValueError(f"store at {path} has dim {self.dim}, expected {dim}")
+        self.refresh()
+
+    # -- reading -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        self.refresh()
+        return sum(segment.rows for segment in self._segments)
+
+    @property
+    def segment_count(self) -> int:
+        self.refresh()
+        return len(self._segments)
+
+    def refresh(self) -> None:
+        """
+        Pick up segments written by other processes (a ``stat`` when unchanged).
+
+        A compaction elsewhere may delete the segments of a manifest between
+        our reading it and opening them; the manifest is then re-read, and
+        after ``_REFRESH_ATTEMPTS`` tries the segments already mapped (still
+        readable, even once unlinked) keep serving until the next search.
+        """
+        for _ in range(_REFRESH_ATTEMPTS):
+            try:
+                stat = (self.path / _MANIFEST).stat()
+            except FileNotFoundError:
+                return
+            # Every publish is a rename, so the inode changes even when two
+            # writes land within the filesystem's mtime granularity.
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+            if stamp == self._manifest_stamp:
+                return
+            with self._lock:
+                manifest = self._read_manifest()
+                if manifest is None:
+                    return
+                opened = {segment.name: segment for segment in self._segments}
+                try:
+                    segments = [
+                        opened.get(entry["name"])
+                        or self._open_segment(entry["name"], entry["rows"])
+                        for entry in manifest["segments"]
+                    ]
+                except FileNotFoundError:
+                    continue  # compacted away; the new manifest lists the merged segment
+                self._segments = segments
+                self._manifest_stamp = stamp
+                return
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Hit]]:
+        """Top ``k`` chunks for each row of ``queries``, best first."""
+        self.refresh()
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        segments = self._segments
+        ids: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        base = 0
+        for segment in segments:
+            for start in range(0, segment.rows, _BLOCK_ROWS):
+                block = segment.vectors[start : start + _BLOCK_ROWS]
+                if block.dtype != np.float32:
+                    block = block.astype(np.float32)
+                block_ids, block_scores = top_k(queries @ block.T, k)
+                ids.append(block_ids + base + start)
+                scores.append(block_scores)
+            base += segment.rows
+        if not ids:
+            return [[] for _ in range(len(queries))]
+
+        # Merge per-block winners into the global top k.
+        all_ids = np.concatenate(ids, axis=1)
+        best, best_scores = top_k(np.concatenate(scores, axis=1), k)
+        best_ids = np.take_along_axis(all_ids, best, axis=1)
+        starts = np.cumsum([0] + [segment.rows for segment in segments])
+        results = []
+        for row_ids, row_scores in zip(best_ids, best_scores):
+            hits = []
+            for row_id, score in zip(row_ids, row_scores):
+                index = int(np.searchsorted(starts, row_id, side="right")) - 1
+                hits.append((segments[index].chunk(int(row_id - starts[index])), float(score)))
+            results.append(hits)
+        return results
+
+    # -- writing -----------------------------------------------------------
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Hold the store's writer lock (across processes); re-entrant."""
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                self._lock_file = open(self.path / _LOCK, "a+")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def add(self, chunks: Sequence[Chunk], vectors: np.ndarray) -> None:
+        """Append ``chunks`` as a new segment."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(chunks), self.dim):
+            raise ValueError(f"expected vectors of shape ({len(chunks)}, {self.dim})")
+        if not chunks:
+            return
+        with self.exclusive():
+            self.refresh()
+            name = self._next_name()
+            self._write_segment(name, [(chunks, normalize_rows(vectors.copy()))])
+            self._write_manifest(self._entries() + [{"name": name, "rows": len(chunks)}])
+            self.refresh()
+
+    def compact(self, min_segments: int = 2) -> bool:
+        """
+        Merge the newest segments into one; returns whether anything was merged.
+
+        Does nothing while fewer than ``min_segments`` segments exist.  The
+        merged run grows backwards from the newest segment and stops at one
+        more than ``_TIER_RATIO`` times larger than the run so far, so large
+        segments are rewritten only once enough data has piled up after them.
+        Rows are copied block by block, so memory stays bounded.  Files of
+        the old segments are removed after the new manifest is published;
+        processes that still map them keep reading them until they refresh.
+        """
+        with self.exclusive():
+            self.refresh()
+            if len(self._segments) < min_segments:
+                return False
+            old = _tier(self._segments)
+            if len(old) < 2:
+                return False
+            kept = self._entries()[: len(self._segments) - len(old)]
+            name = self._next_name()
+            self._write_segment(name, self._iter_rows(old))
+            self._write_manifest(kept + [{"name": name, "rows": sum(s.rows for s in old)}])
+            self.refresh()
+            for segment in old:
+                for suffix in (".vec", ".jsonl", ".idx"):
+                    (self.path / f"{segment.name}{suffix}").unlink(missing_ok=True)
+        return True
+
+    def start_compaction(self, interval: float = 60.0, min_segments: int = 8) -> None:
+        """Compact in a daemon thread whenever ``min_segments`` segments pile up."""
+        if self._compactor is not None:
+            return
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    if self.segment_count >= min_segments:
+                        self.compact(min_segments)
+                except Exception:
+                    # E.g. a full disk: keep serving, try again next interval.
+                    logger.exception("vector store compaction failed")
+
+        self._compactor = threading.Thread(target=run, name="vector-compaction", daemon=True)
+        self._compactor.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    # -- internals ---------------------------------------------------------
+
+    def _read_manifest(self) -> dict | None:
+        try:
+            return json.loads((self.path / _MANIFEST).read_text())
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, segments: list) -> None:
+        manifest = {"dim": self.dim, "dtype": self.dtype.name, "segments": segments}
+        _atomic_write(self.path / _MANIFEST, json.dumps(manifest).encode())
+
+    def _entries(self) -> list:
+        return [{"name": s.name, "rows": s.rows} for s in self._segments]
+
+    def _next_name(self) -> str:
+        taken = [int(p.stem.split("-")[1]) for p in self.path.glob("seg-*.vec")]
+        return f"seg-{max(taken, default=0) + 1:06d}"
+
+    def _iter_rows(self, segments: Sequence[_Segment]):
+        for segment in segments:
+            for start in range(0, segment.rows, _BLOCK_ROWS):
+                stop = min(start + _BLOCK_ROWS, segment.rows)
+                yield (
+                    [segment.chunk(row) for row in range(start, stop)],
+                    np.asarray(segment.vectors[start:stop]),
+                )
+
+    def _write_segment(self, name: str, blocks) -> None:
+        """Write ``(chunks, vectors)`` blocks as segment ``name``, atomically."""
+        vec_tmp = self.path / f"{name}.vec.tmp"
+        text_tmp = self.path / f"{name}.jsonl.tmp"
+        offsets = [0]
+        with open(vec_tmp, "wb") as vec_file, open(text_tmp, "wb") as text_file:
+            for chunks, vectors in blocks:
+                vec_file.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+                for chunk in chunks:
+                    line = json.dumps(
+                        {"text": chunk.text, "source": chunk.source, "metadata": chunk.metadata},
+                        ensure_ascii=False,
+                    ).encode() + b"\n"
+                    text_file.write(line)
+                    offsets.append(offsets[-1] + len(line))
+            for handle in (vec_file, text_file):
+                handle.flush()
+                os.fsync(handle.fileno())
+        _atomic_write(self.path / f"{name}.idx", np.asarray(offsets, dtype=np.uint64).tobytes())
+        os.replace(text_tmp, self.path / f"{name}.jsonl")
+        os.replace(vec_tmp, self.path / f"{name}.vec")
+
+    def _open_segment(self, name: str, rows: int) -> _Segment:
+        vectors = (
+            np.memmap(self.path / f"{name}.vec", dtype=self.dtype, mode="r", shape=(rows, self.dim))
+            if rows
+            else np.empty((0, self.dim), dtype=self.dtype)
+        )
+        offsets = np.memmap(self.path / f"{name}.idx", dtype=np.uint64, mode="r")
+        with open(self.path / f"{name}.jsonl", "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            text = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        return _Segment(name, vectors, offsets, text)
+
+
+def _tier(segments: Sequence[_Segment]) -> List[_Segment]:
+    """The newest segments of similar size, which a compaction merges."""
+    count = rows = 0
+    for segment in reversed(segments):
+        if count and segment.rows > _TIER_RATIO * rows:
+            break
+        count += 1
+        rows += segment.rows
+    return list(segments[len(segments) - count :])
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as handle:
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp, path)
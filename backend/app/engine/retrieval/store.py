@@ -0,0 +1,114 @@
+"""
+In-memory vector store: one contiguous NumPy matrix plus chunk metadata.
+
+Search is exact (brute-force) cosine similarity: a single matrix product
+scores every chunk against a batch of queries, and ``argpartition`` picks
+the top ``k`` per query in O(n) before only those ``k`` are sorted.  This
+is memory-bandwidth bound and comfortably fast up to around a million
+chunks per process.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import threading
+from typing import Dict, List, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from app.engine.retrieval.embedder import normalize_rows
+
+
+@dataclass(frozen=True, slots=True)
+class Chunk:
+    """A retrievable piece of a document."""
+
+    text: str
+    source: str  # document name or URL, returned as ``ChatResponse.sources``
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
+Hit = Tuple[Chunk, float]
+
+
+class VectorIndex(Protocol):
+    """What ``Retriever`` needs from a store: append rows, search, count."""
+
+    dim: int
+
+    def __len__(self) -> int: ...
+
+    def add(self, chunks: Sequence[Chunk], vectors: np.ndarray) -> None: ...
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Hit]]: ...
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise top ``k`` of a ``(queries, n)`` score matrix, best first.
+
+    Returns ``(indices, scores)``, both ``(queries, min(k, n))``.
+    """
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+    if k < n:
+        part = np.argpartition(scores, n - k, axis=1)[:, n - k :]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+class VectorStore:
+    """Append-only store of unit vectors with exact top-k search."""
+
+    def __init__(self, dim: int, capacity: int = 1024) -> None:
+        self.dim = dim
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._chunks: List[Chunk] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Read-only view of the stored rows."""
+        view = self._vectors[: len(self._chunks)]
+        view.flags.writeable = False
+        return view
+
+    def add(self, chunks: Sequence[Chunk], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(chunks), self.dim):
+            raise ValueError(f"expected vectors of shape ({len(chunks)}, {self.dim})")
+        with self._lock:
+            size = len(self._chunks)
+            needed = size + len(chunks)
+            if needed > len(self._vectors):
+                # Grow geometrically so appends stay amortized O(1) per row.
+                grown = np.zeros((max(needed, 2 * len(self._vectors)), self.dim), np.float32)
+                grown[:size] = self._vectors[:size]
+                self._vectors = grown
+            self._vectors[size:needed] = normalize_rows(vectors.copy())
+            # Publish rows before metadata: readers only see complete entries.
+            self._chunks.extend(chunks)
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Hit]]:
+        """Top ``k`` chunks for each row of ``queries``, best first."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            size = len(self._chunks)
+            matrix = self._vectors[:size]
+            chunks = self._chunks[:size]
+        if size == 0:
+            return [[] for _ in range(len(queries))]
+        indices, scores = top_k(queries @ matrix.T, k)
+        return [
+            [(chunks[i], float(s)) for i, s in zip(row_idx, row_scores)]
+            for row_idx, row_scores in zip(indices, scores)
+        ]
@@ -0,0 +1,159 @@
+"""
+Per-call stream handles returned by ``ChatEngine.stream()`` / ``astream()``.
+
+A handle owns everything about one generation: the token iterator and the
+final ``ChatResponse``.  Because nothing is stored on the engine, a single
+engine instance can serve any number of parallel streams across threads
+and coroutines.
+
+Producers yield ``str`` chunks and may finish by yielding the final
+``ChatResponse``; the handle strips that item out of the token stream and
+exposes it as :attr:`response`.  If the producer never yields one, a
+default response is built from the streamed text.
+
+Handles can be stopped early: :meth:`cancel` (or cancelling the task that
+iterates an async handle) ends the stream at the next token and closes the
+producer, so engines can release inference resources in ``finally`` /
+``async with`` blocks.  A stopped handle keeps the partial :attr:`text` and
+reports :attr:`cancelled`.
+
+Handles also note when they were created, produced their first token and
+finished (``time.perf_counter()``), for streaming metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Union
+
+from app.engine.response import ChatResponse
+
+StreamItem = Union[str, ChatResponse]
+
+
+class _StreamState:
+    """Bookkeeping shared by the sync and async handles."""
+
+    def __init__(self) -> None:
+        self._parts: List[str] = []
+        self._response: ChatResponse | None = None
+        self._finished = False
+        self._cancelled = False
+        self.started_at = time.perf_counter()
+        self.first_token_at: float | None = None
+        self.finished_at: float | None = None
+
+    def _accept(self, item: StreamItem) -> str | None:
+        if isinstance(item, ChatResponse):
+            self._response = item
+            return None
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self._parts.append(item)
+        return item
+
+    def _finish(self) -> None:
+        if self._response is None:
+            self._response = ChatResponse(content=self.text.strip())
+        self._finished = True
+        self.finished_at = time.perf_counter()
+
+    @property
+    def text(self) -> str:
+        """Everything streamed so far."""
+        return "".join(self._parts)
+
+    @property
+    def chunk_count(self) -> int:
+        """Chunks streamed so far (one token each for most engines)."""
+        return len(self._parts)
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    @property
+    def cancelled(self) -> bool:
+        """True when the stream was stopped before the producer finished."""
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """
+        Stop the stream at the next token.
+
+        Safe to call from any thread or task.  To interrupt an async handle
+        that is blocked waiting for a token, also cancel the consuming task.
+        """
+        self._cancelled = True
+
+    @property
+    def response(self) -> ChatResponse:
+        """The final ``ChatResponse``; available once the stream is exhausted."""
+        if not self._finished or self._response is None:
+            raise RuntimeError("Stream has not finished yet")
+        return self._response
+
+
+class ChatStream(_StreamState):
+    """Synchronous stream handle: iterate for tokens, then read ``response``."""
+
+    def __init__(self, source: Iterable[StreamItem]) -> None:
+        super().__init__()
+        self._source = source
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            for item in self._source:
+                if self._cancelled:
+                    break
+                chunk = self._accept(item)
+                if chunk is not None:
+                    yield chunk
+        except GeneratorExit:
+            self._cancelled = True
+            raise
+        finally:
+            close = getattr(self._source, "close", None)
+            if close is not None:
+                close()
+            if self._cancelled:
+                self._finish()
+        if not self._cancelled:
+            self._finish()
+
+    def items(self) -> Iterator[StreamItem]:
+        """Yield tokens followed by the final response (used by adapters)."""
+        yield from self
+        yield self.response
+
+
+class AsyncChatStream(_StreamState):
+    """Async stream handle: ``async for`` tokens, then read ``response``."""
+
+    def __init__(self, source: AsyncIterable[StreamItem]) -> None:
+        super().__init__()
+        self._source = source
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[str]:
+        try:
+            async for item in self._source:
+                if self._cancelled:
+                    break
+                chunk = self._accept(item)
+                if chunk is not None:
+                    yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            self._cancelled = True
+            raise
+        finally:
+            aclose = getattr(self._source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            if self._cancelled:
+                self._finish()
+        if not self._cancelled:
+            self._finish()
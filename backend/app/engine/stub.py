@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
 from app.engine.base import ChatEngine
 from app.engine.context import ChatContext
 from app.engine.response import ChatResponse
+from app.engine.stream import AsyncChatStream, ChatStream, StreamItem
 
 _STUB_REPLY = (
     "The LLM pipeline is not enabled in this deployment.  "
@@ -24,21 +25,26 @@ class StubChatEngine(ChatEngine):
     contract is exercised end-to-end.
     """
 
-    def __init__(self) -> None:
-        self._last: ChatResponse | None = None
-
     def answer(self, query: str, context: ChatContext) -> ChatResponse:
-        resp = ChatResponse(
+        return ChatResponse(
             content=_STUB_REPLY,
             sources=[],
             mode="stub",
             confidence=0.0,
             model="stub",
         )
-        self._last = resp
-        return resp
 
-    def stream(self, query: str, context: ChatContext) -> Iterator[str]:
+    def stream(self, query: str, context: ChatContext) -> ChatStream:
+        return ChatStream(self._generate())
+
+    async def aanswer(self, query: str, context: ChatContext) -> ChatResponse:
+        # Nothing blocks here, so skip the thread-pool hop of the default.
+        return self.answer(query, context)
+
+    def astream(self, query: str, context: ChatContext) -> AsyncChatStream:
+        return AsyncChatStream(self._agenerate())
+
+    def _generate(self) -> Iterator[StreamItem]:
         tokens = _STUB_REPLY.split(" ")
         full = ""
         for token in tokens:
@@ -46,7 +52,7 @@ class StubChatEngine(ChatEngine):
             full += chunk
             yield chunk
 
-        self._last = ChatResponse(
+        yield ChatResponse(
             content=full.strip(),
             sources=[],
             mode="stub",
@@ -54,7 +60,6 @@ class StubChatEngine(ChatEngine):
             model="stub",
         )
 
-    def last_response(self) -> ChatResponse:
-        if self._last is None:
-            raise RuntimeError("No stream() or answer() call has been made yet")
-        return self._last
+    async def _agenerate(self) -> AsyncIterator[StreamItem]:
+        for item in self._generate():
+            yield item
@@ -4,8 +4,12 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.core.database import engine, Base
+from app.core.ratelimit import close_rate_limiter
+from app.core.database import async_engine, engine, read_engine, Base
+from app.core.metrics import MetricsMiddleware, instrument_engine
 from app.api.router import api_router
+from app.api.routes import metrics
+from app.engine import close_engine, start_engine
 
 
 def create_app() -> FastAPI:
@@ -27,6 +31,15 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    if settings.metrics_enabled:
+        # Outermost, so CORS preflights and error responses are counted too.
+        app.add_middleware(MetricsMiddleware)
+        instrument_engine(engine, "write")
+        instrument_engine(read_engine, "read")
+        instrument_engine(async_engine.sync_engine, "async")
+        # Served at the root, where Prometheus scrapes by default.
+        app.include_router(metrics.router)
+
     app.include_router(api_router)
 
     @app.on_event("startup")
@@ -34,6 +47,23 @@ def create_app() -> FastAPI:
         # Ensure tables exist for dev/test runs without requiring a manual migration step.
         Base.metadata.create_all(bind=engine)
 
+    @app.on_event("startup")
+    async def _start_chat_engine():
+        await start_engine()
+
+    @app.on_event("shutdown")
+    async def _dispose_async_engine():
+        # Pooled async connections are bound to the loop that opened them.
+        await async_engine.dispose()
+
+    @app.on_event("shutdown")
+    async def _close_chat_engine():
+        await close_engine()
+
+    @app.on_event("shutdown")
+    def _close_rate_limiter():
+        close_rate_limiter()
+
     logger.info("🚀 Privia API started")
     logger.info(
         "ENV=%s HOST=%s PORT=%s", settings.env, settings.api_host, settings.api_port
@@ -37,3 +37,11 @@ class Conversation(Base):
         cascade="all, delete-orphan",
         passive_deletes=True,
     )
+
+
+# Sidebar listing: WHERE user_id = ? ORDER BY updated_at DESC, without a sort step.
+Index(
+    "ix_conversations_user_id_updated_at",
+    Conversation.user_id,
+    Conversation.updated_at.desc(),
+)
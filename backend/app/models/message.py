@@ -1,4 +1,4 @@
-from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy import DDL, Index, String, DateTime, ForeignKey, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from app.core.database import Base
@@ -19,3 +19,41 @@ class Message(Base):
     timestamp: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
     conversation = relationship("Conversation", back_populates="messages")
+
+    __table_args__ = (
+        # History loads filter by conversation and read in timestamp order.
+        Index("ix_messages_conversation_id_timestamp", "conversation_id", "timestamp"),
+    )
+
+
+# Full-text search (SQLite FTS5). Each row copies a message's content and
+# its owner's user_id, so a search is a single index lookup already scoped
+# to the user; rows share the message's rowid. The id is stored without
+# hyphens so it is one token: matching a 5-token UUID phrase made every
+# search walk the owner's whole position list. Triggers keep the index in
+# step with every write path, including ON DELETE CASCADE. bm25 ranking
+# only weighs the content column; the 3-character prefix index keeps
+# search-as-you-type queries from expanding to hundreds of terms.
+# Mirrored by migration d6e7f8a9b0c1.
+MESSAGES_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, user_id, conversation_id UNINDEXED, message_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '3')",
+    "INSERT INTO messages_fts (messages_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0, 0.0, 0.0)')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts (rowid, content, user_id, conversation_id, message_id) "
+    "SELECT new.rowid, new.content, replace(c.user_id, '-', ''), new.conversation_id, new.id "
+    "FROM conversations AS c WHERE c.id = new.conversation_id; END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+    "DELETE FROM messages_fts WHERE rowid = old.rowid; END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN "
+    "UPDATE messages_fts SET content = new.content WHERE rowid = old.rowid; END",
+)
+
+for _statement in MESSAGES_FTS_DDL:
+    event.listen(Message.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Message.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS messages_fts").execute_if(dialect="sqlite"),
+)
@@ -4,9 +4,13 @@ from app.schemas.auth import LoginResponse, SignupRequest, UserProfile
 from app.schemas.conversation import (
     ConversationListItem,
     ConversationOut,
+    ConversationPage,
     ConversationUpdate,
     MessageOut,
+    MessagePage,
+    MessageSearchHit,
 )
+from app.schemas.ingest import IngestJobOut
 from app.schemas.query import QueryRequest, QueryResponse
 
 __all__ = [
@@ -15,8 +19,12 @@ __all__ = [
     "UserProfile",
     "ConversationListItem",
     "ConversationOut",
+    "ConversationPage",
     "ConversationUpdate",
     "MessageOut",
+    "MessagePage",
+    "MessageSearchHit",
+    "IngestJobOut",
     "QueryRequest",
     "QueryResponse",
 ]
@@ -4,6 +4,7 @@ from typing import List, Optional
 
 
 class MessageOut(BaseModel):
+    id: Optional[str] = None
     role: str
     content: str
     timestamp: datetime
@@ -28,6 +29,45 @@ class ConversationListItem(BaseModel):
     message_count: int = 0
 
 
+class ConversationPage(BaseModel):
+    """
+    One keyset page of conversations, newest first.
+
+    Pass ``next_cursor`` as ``before`` to continue to older conversations,
+    or ``prev_cursor`` as ``after`` to fetch newer ones.
+    """
+
+    items: List[ConversationListItem]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class MessagePage(BaseModel):
+    """
+    One keyset page of messages in chronological order.
+
+    Pass ``next_cursor`` back in the same direction (``before`` for older
+    history) to continue; ``prev_cursor`` pages the other way.
+    """
+
+    items: List[MessageOut]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class MessageSearchHit(BaseModel):
+    """A message matching a full-text search, best matches first."""
+
+    message_id: str
+    conversation_id: str
+    conversation_title: str
+    role: str
+    # HTML-escaped excerpt with matched terms wrapped in <mark>...</mark>
+    snippet: str
+    timestamp: datetime
+    score: float  # bm25 relevance, higher is better
+
+
 class ConversationCreate(BaseModel):
     """Optional body when creating a new conversation."""
 
@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class IngestJobOut(BaseModel):
+    """Progress of one document ingestion job."""
+
+    id: str
+    source: str
+    status: str  # queued | running | done | failed
+    bytes_total: int
+    bytes_read: int
+    progress: float  # fraction of the file read, 0..1
+    chunks: int  # chunks embedded and searchable so far
+    chunks_per_sec: float
+    elapsed: float  # seconds since the job started
+    error: Optional[str] = None
+    created_at: datetime
@@ -0,0 +1,80 @@
+"""
+Shared setup for benchmarks that drive the real app over sockets.
+
+Importing this module points ``DATABASE_URL`` at a throwaway SQLite file
+(unless one is already set), so it must be imported before anything from
+``app``.  :func:`serve` runs the app under uvicorn in a background thread
+with a chosen chat engine, and :func:`create_accounts` signs up the
+simulated users.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='privia-bench-'), 'bench.db')}",
+)
+
+from contextlib import contextmanager  # noqa: E402
+import socket  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+from typing import Iterator  # noqa: E402
+import uuid  # noqa: E402
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from app.api.routes import chat  # noqa: E402
+from app.core.database import Base, engine  # noqa: E402
+from app.engine import ChatEngine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@contextmanager
+def serve(chat_engine: ChatEngine) -> Iterator[tuple[str, threading.Thread]]:
+    """
+    Serve the app on a free local port, answering with ``chat_engine``.
+
+    Yields the base URL and the server thread (whose CPU clock isolates
+    server work from the client running in the same process).
+    """
+    Base.metadata.create_all(bind=engine)
+    chat.get_engine = lambda: chat_engine
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}", thread
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def create_accounts(base_url: str, count: int, prefix: str = "bench") -> list[str]:
+    """
+    Sign up ``count`` fresh users and return their access tokens.
+
+    Use one account per simulated client: each user may only have one
+    empty conversation.
+    """
+    tokens = []
+    with httpx.Client(base_url=base_url) as client:
+        for _ in range(count):
+            email = f"{prefix}-{uuid.uuid4()}@privia.app"
+            client.post("/api/auth/signup", json={"email": email, "password": "bench-password"})
+            res = client.post(
+                "/api/auth/login", data={"username": email, "password": "bench-password"}
+            )
+            tokens.append(res.json()["access_token"])
+    return tokens
@@ -0,0 +1,106 @@
+"""
+Recall@k and latency of the IVF / IVF-PQ index versus exact search.
+
+Generates a clustered synthetic corpus (``--clusters`` topics with
+``--spread`` noise around each, which is how real embeddings behave;
+uniform random vectors have no neighbourhood structure for any ANN index
+to exploit),
+builds an exact ``VectorStore`` and ``IVFIndex`` variants, and sweeps
+``nprobe``.  Recall@k is the fraction of the exact top-k that the index
+returns.
+
+    python -m benchmarks.ann_recall --chunks 200000 --dim 384 --nlist 1024 --pq-m 0 48
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from app.engine.retrieval import Chunk, IVFIndex, VectorStore, normalize_rows
+
+
+def _corpus(
+    rng: np.random.Generator, n: int, dim: int, clusters: int, spread: float
+) -> np.ndarray:
+    centers = normalize_rows(rng.standard_normal((clusters, dim), dtype=np.float32))
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        rows = min(100_000, n - start)
+        noise = rng.standard_normal((rows, dim), dtype=np.float32) / np.sqrt(dim)
+        out[start : start + rows] = centers[rng.integers(0, clusters, rows)] + spread * noise
+    return normalize_rows(out)
+
+
+def _latency_ms(search, queries: np.ndarray) -> tuple[list, float]:
+    results, samples = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.extend(search(query[None, :]))
+        samples.append((time.perf_counter() - started) * 1000)
+    return results, round(statistics.median(samples), 3)
+
+
+def _recall(got, expected) -> float:
+    overlaps = [
+        len({id(c) for c, _ in a} & {id(c) for c, _ in b}) / max(1, len(b))
+        for a, b in zip(got, expected)
+    ]
+    return round(float(np.mean(overlaps)), 4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=2_000)
+    parser.add_argument("--spread", type=float, default=1.5, help="noise norm per chunk")
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[0, 48])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = _corpus(rng, args.chunks, args.dim, args.clusters, args.spread)
+    chunks = [Chunk(text="", source=str(i)) for i in range(args.chunks)]
+    picks = rng.choice(args.chunks, args.queries, replace=False)
+    noise = 0.3 * rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    queries = normalize_rows(vectors[picks] + noise / np.sqrt(args.dim))
+
+    exact = VectorStore(args.dim, capacity=args.chunks)
+    exact.add(chunks, vectors)
+    expected, exact_ms = _latency_ms(lambda q: exact.search(q, args.k), queries)
+    results = [{"index": "exact", "p50_ms": exact_ms, "recall": 1.0}]
+
+    for pq_m in args.pq_m:
+        started = time.perf_counter()
+        index = IVFIndex(args.dim, nlist=args.nlist, pq_m=pq_m, train_size=args.chunks)
+        index.add(chunks, vectors)
+        build_s = round(time.perf_counter() - started, 1)
+        bytes_per_chunk = pq_m if pq_m else args.dim * 4
+        for nprobe in args.nprobe:
+            got, ms = _latency_ms(lambda q: index.search(q, args.k, nprobe=nprobe), queries)
+            results.append(
+                {
+                    "index": f"ivf{args.nlist}" + (f"-pq{pq_m}" if pq_m else ""),
+                    "nprobe": nprobe,
+                    "p50_ms": ms,
+                    "recall": _recall(got, expected),
+                    "speedup": round(exact_ms / ms, 1),
+                    "bytes_per_chunk": bytes_per_chunk,
+                    "build_s": build_s,
+                }
+            )
+
+    summary = {"chunks": args.chunks, "dim": args.dim, "k": args.k, "results": results}
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
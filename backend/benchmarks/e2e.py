@@ -0,0 +1,321 @@
+"""
+End-to-end load test: latency, time-to-first-token and throughput per transport.
+
+Starts the real app under uvicorn in a background thread and drives
+``/api/query`` (REST), ``/api/stream`` (SSE) and ``/api/ws/chat``
+(WebSocket) with ``--concurrency`` users, each asking ``--requests``
+questions in its own conversation.  The answering engine is either the
+stub or a fake model with ``--ttft-ms`` before the first token and
+``--tokens-per-sec`` after it, so the numbers measure the API stack
+rather than a model.  Rate limiting is turned off for the run.
+
+Per transport it reports p50/p95/p99 latency, TTFT (first token frame;
+the whole response for REST), per-request tokens/sec, requests/sec and
+errors as JSON.  ``--save`` writes the report; ``--baseline`` compares
+against a saved one, lists every metric that got worse by more than
+``--tolerance`` and exits with status 1 if any did.
+
+The client runs in the same process as the server, so absolute numbers
+include its CPU time; compare runs made on the same machine.
+
+    python -m benchmarks.e2e --engine fake --concurrency 50 --requests 20 --save base.json
+    python -m benchmarks.e2e --engine fake --concurrency 50 --requests 20 --baseline base.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+
+import httpx
+import websockets
+
+# First: points DATABASE_URL at a throwaway database before the app loads.
+from benchmarks._harness import create_accounts, serve
+
+from app.core.config import settings
+from app.engine import AsyncChatStream, ChatResponse, StubChatEngine
+
+TRANSPORTS = ("query", "sse", "ws")
+TOKEN = "word "
+
+# Metrics compared against a baseline: where they live in a transport's
+# report, and whether higher values are better.
+COMPARED = {
+    ("latency_ms", "p50"): False,
+    ("latency_ms", "p95"): False,
+    ("latency_ms", "p99"): False,
+    ("ttft_ms", "p50"): False,
+    ("ttft_ms", "p95"): False,
+    ("ttft_ms", "p99"): False,
+    ("tokens_per_sec", "p50"): True,
+    ("requests_per_sec",): True,
+}
+
+
+class FakeLatencyEngine(StubChatEngine):
+    """Answers after ``ttft_ms``, then streams ``tokens`` at ``tokens_per_sec``."""
+
+    def __init__(self, ttft_ms: float, tokens_per_sec: float, tokens: int) -> None:
+        self.ttft = ttft_ms / 1000
+        self.interval = 1 / tokens_per_sec if tokens_per_sec > 0 else 0.0
+        self.tokens = tokens
+
+    async def aanswer(self, query, context) -> ChatResponse:
+        await asyncio.sleep(self.ttft + self.interval * (self.tokens - 1))
+        return ChatResponse(content=TOKEN * self.tokens, mode="bench")
+
+    def astream(self, query, context) -> AsyncChatStream:
+        return AsyncChatStream(self._paced())
+
+    async def _paced(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time() + self.ttft
+        for _ in range(self.tokens):
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+            next_at += self.interval
+            yield TOKEN
+        yield ChatResponse(content=TOKEN * self.tokens, mode="bench")
+
+
+@dataclass
+class _Samples:
+    latency: list[float] = field(default_factory=list)
+    ttft: list[float] = field(default_factory=list)
+    tokens_per_sec: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def add(self, started: float, first: float | None, tokens: int) -> None:
+        end = time.perf_counter()
+        first = first or end
+        self.latency.append(end - started)
+        self.ttft.append(first - started)
+        if tokens > 1 and end > first:
+            self.tokens_per_sec.append((tokens - 1) / (end - first))
+
+
+def _percentiles(values: list[float], scale: float = 1.0) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * scale, 2)
+
+    return {"p50": rank(0.50), "p95": rank(0.95), "p99": rank(0.99), "max": rank(1.0)}
+
+
+async def _query_user(client: httpx.AsyncClient, token: str, requests: int, samples: _Samples):
+    headers = {"Authorization": f"Bearer {token}"}
+    conversation_id = None
+    for n in range(requests):
+        started = time.perf_counter()
+        try:
+            res = await client.post(
+                "/api/query",
+                json={"question": f"question {n}", "conversation_id": conversation_id},
+                headers=headers,
+            )
+        except httpx.HTTPError:
+            samples.errors += 1
+            continue
+        if res.status_code != 200:
+            samples.errors += 1
+            continue
+        body = res.json()
+        conversation_id = body["conversation_id"]
+        samples.add(started, None, len(body["answer"].split()))
+
+
+async def _sse_user(client: httpx.AsyncClient, token: str, requests: int, samples: _Samples):
+    headers = {"Authorization": f"Bearer {token}"}
+    conversation_id = None
+    for n in range(requests):
+        started = time.perf_counter()
+        first = None
+        tokens = 0
+        done = False
+        try:
+            async with client.stream(
+                "POST",
+                "/api/stream",
+                json={"question": f"question {n}", "conversation_id": conversation_id},
+                headers=headers,
+            ) as res:
+                if res.status_code != 200:
+                    samples.errors += 1
+                    continue
+                event = None
+                async for line in res.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[7:]
+                    elif line.startswith("data: "):
+                        if event == "done":
+                            conversation_id = json.loads(line[6:])["conversation_id"]
+                            done = True
+                        else:
+                            first = first or time.perf_counter()
+                            tokens += len(line[6:].split())
+        except httpx.HTTPError:
+            samples.errors += 1
+            continue
+        if not done:
+            samples.errors += 1
+            continue
+        samples.add(started, first, tokens)
+
+
+async def _ws_user(base_url: str, token: str, requests: int, samples: _Samples):
+    url = base_url.replace("http://", "ws://") + "/api/ws/chat"
+    headers = {"Authorization": f"Bearer {token}"}
+    conversation_id = None
+    try:
+        async with websockets.connect(url, additional_headers=headers) as ws:
+            for n in range(requests):
+                started = time.perf_counter()
+                first = None
+                tokens = 0
+                await ws.send(
+                    json.dumps({"question": f"question {n}", "conversation_id": conversation_id})
+                )
+                while True:
+                    frame = json.loads(await ws.recv())
+                    if frame["type"] == "token":
+                        first = first or time.perf_counter()
+                        tokens += len(frame["content"].split())
+                    elif frame["type"] == "done":
+                        conversation_id = frame["conversation_id"]
+                        samples.add(started, first, tokens)
+                        break
+                    else:
+                        samples.errors += 1
+                        break
+    except (OSError, websockets.WebSocketException):
+        samples.errors += 1
+
+
+async def run_transport(base_url: str, transport: str, tokens: list[str], requests: int) -> dict:
+    """Drive one transport with one user per token; returns its report."""
+    samples = _Samples()
+    limits = httpx.Limits(max_connections=len(tokens), max_keepalive_connections=len(tokens))
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        if transport == "query":
+            users = [_query_user(client, token, requests, samples) for token in tokens]
+        elif transport == "sse":
+            users = [_sse_user(client, token, requests, samples) for token in tokens]
+        else:
+            users = [_ws_user(base_url, token, requests, samples) for token in tokens]
+        await asyncio.gather(*users)
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(samples.latency),
+        "errors": samples.errors,
+        "requests_per_sec": round(len(samples.latency) / elapsed, 1),
+        "latency_ms": _percentiles(samples.latency, 1000),
+        "ttft_ms": _percentiles(samples.ttft, 1000),
+        "tokens_per_sec": _percentiles(samples.tokens_per_sec),
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[dict]:
+    """
+    Metrics in ``current`` worse than ``baseline`` by more than ``tolerance``.
+
+    Both are reports as printed by this script.  Latencies regress when they
+    grow, throughput when it shrinks; any new error is a regression.
+    """
+    regressions = []
+    for transport, report in current["results"].items():
+        base = baseline["results"].get(transport)
+        if base is None:
+            continue
+        if report["errors"] > base["errors"]:
+            regressions.append(
+                {
+                    "transport": transport,
+                    "metric": "errors",
+                    "baseline": base["errors"],
+                    "current": report["errors"],
+                }
+            )
+        for path, higher_is_better in COMPARED.items():
+            old, new = base, report
+            for key in path:
+                old, new = old.get(key), new.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    {
+                        "transport": transport,
+                        "metric": ".".join(path),
+                        "baseline": old,
+                        "current": new,
+                        "change_pct": round(100 * change, 1),
+                    }
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--engine", choices=["stub", "fake"], default="fake")
+    parser.add_argument("--ttft-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--tokens", type=int, default=100, help="tokens per answer")
+    parser.add_argument("--concurrency", type=int, default=20, help="simultaneous users")
+    parser.add_argument("--requests", type=int, default=10, help="questions per user")
+    parser.add_argument("--transport", choices=TRANSPORTS, action="append")
+    parser.add_argument("--save", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare against a saved report")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed change (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    settings.rate_limit_enabled = False
+    if args.engine == "fake":
+        chat_engine = FakeLatencyEngine(args.ttft_ms, args.tokens_per_sec, args.tokens)
+    else:
+        chat_engine = StubChatEngine()
+
+    report = {
+        "config": {
+            "engine": args.engine,
+            "ttft_ms": args.ttft_ms if args.engine == "fake" else None,
+            "tokens_per_sec": args.tokens_per_sec if args.engine == "fake" else None,
+            "tokens": args.tokens if args.engine == "fake" else None,
+            "concurrency": args.concurrency,
+            "requests_per_user": args.requests,
+        },
+        "results": {},
+    }
+    with serve(chat_engine) as (base_url, _):
+        tokens = create_accounts(base_url, args.concurrency, prefix="e2e")
+        for transport in args.transport or TRANSPORTS:
+            report["results"][transport] = asyncio.run(
+                run_transport(base_url, transport, tokens, args.requests)
+            )
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(report, handle, indent=2)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if baseline.get("config") != report["config"]:
+            print("warning: baseline was run with a different config", file=sys.stderr)
+        regressions = compare(baseline, report, args.tolerance)
+        report["regressions"] = regressions
+    print(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Full-text message search latency (FTS5 + bm25) versus a LIKE scan.
+
+Seeds a temporary SQLite database (schema, triggers and FTS index from the
+models) with ``--messages`` messages spread over ``--users`` users, drawn
+from a Zipf-distributed vocabulary so some words are rare and some are in
+most messages.  One "heavy" user owns ``--heavy-share`` of all messages.
+Times the ``/conversations/search`` query for the heavy and a typical
+user with a rare word, a common word, two words and a prefix, next to
+fetching every ``content LIKE '%word%'`` match, which is what filtering
+on the client amounts to.
+
+    python -m benchmarks.message_search --messages 1000000 --users 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from app.api.routes.conversations import _SEARCH_SQL, _match_expression
+from app.core.config import settings
+from app.core.database import Base, install_sqlite_pragmas
+from app.models import Conversation, Message, User  # noqa: F401  (register tables)
+
+_VOCABULARY = 20_000
+_WORDS_PER_MESSAGE = 24
+_MESSAGES_PER_CONVERSATION = 20
+
+_LIKE_SQL = text(
+    "SELECT m.id FROM messages AS m JOIN conversations AS c ON c.id = m.conversation_id "
+    "WHERE c.user_id = :user_id AND m.content LIKE :pattern"
+)
+
+
+def _word(rank: int) -> str:
+    return f"w{rank}x"
+
+
+def _seed(
+    engine, messages: int, users: int, heavy_share: float, rng: random.Random
+) -> list[str]:
+    weights = [1 / (rank + 1) for rank in range(_VOCABULARY)]
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    conversations = max(1, messages // _MESSAGES_PER_CONVERSATION)
+    conv_ids = [str(uuid.uuid4()) for _ in range(conversations)]
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO users (id, email, password_hash, role) VALUES (:id, :email, '', 'member')"),
+            [{"id": u, "email": f"{u}@bench"} for u in user_ids],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO conversations (id, user_id, title, status, created_at, updated_at) "
+                "VALUES (:id, :user_id, 'bench', 'active', '2026-01-01', '2026-01-01')"
+            ),
+            [
+                {"id": c, "user_id": user_ids[0 if rng.random() < heavy_share else i % users]}
+                for i, c in enumerate(conv_ids)
+            ],
+        )
+    batch = 50_000
+    for start in range(0, messages, batch):
+        rows = []
+        for n in range(start, min(start + batch, messages)):
+            words = rng.choices(range(_VOCABULARY), weights, k=_WORDS_PER_MESSAGE)
+            rows.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "conversation_id": conv_ids[n % conversations],
+                    "content": " ".join(_word(w) for w in words),
+                }
+            )
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO messages (id, conversation_id, role, content, timestamp) "
+                    "VALUES (:id, :conversation_id, 'user', :content, '2026-01-01')"
+                ),
+                rows,
+            )
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO messages_fts (messages_fts) VALUES ('optimize')"))
+    return user_ids
+
+
+def _time(conn, statement, params: dict, repeat: int) -> dict:
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(conn.execute(statement, params).all())
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "rows": rows,
+        "p50_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--heavy-share", type=float, default=0.05)
+    parser.add_argument("--candidates", type=int, default=settings.search_max_candidates)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    path = Path(tempfile.mkdtemp(prefix="privia-search-")) / "bench.db"
+    engine = create_engine(f"sqlite:///{path}")
+    install_sqlite_pragmas(engine)
+    Base.metadata.create_all(engine)
+
+    started = time.perf_counter()
+    user_ids = _seed(engine, args.messages, args.users, args.heavy_share, rng)
+    seed_s = time.perf_counter() - started
+
+    queries = {
+        "rare word": _word(_VOCABULARY // 2),
+        "common word": _word(0),
+        "two words": f"{_word(3)} {_word(40)}",
+        "prefix": _word(12)[:-1],
+    }
+    results = {
+        "messages": args.messages,
+        "users": args.users,
+        "seed_seconds": round(seed_s, 1),
+        "db_mb": round(path.stat().st_size / 2**20, 1),
+    }
+    with engine.connect() as conn:
+        for label, user_id in (("heavy_user", user_ids[0]), ("typical_user", user_ids[-1])):
+            owned = conn.execute(
+                text(
+                    "SELECT count(*) FROM messages AS m JOIN conversations AS c "
+                    "ON c.id = m.conversation_id WHERE c.user_id = :user_id"
+                ),
+                {"user_id": user_id},
+            ).scalar()
+            timings = results[label] = {"messages": owned}
+            for name, query in queries.items():
+                params = {
+                    "match": _match_expression(query, user_id),
+                    "limit": 20,
+                    "offset": 0,
+                    "candidates": args.candidates,
+                    "user_id": user_id,
+                }
+                like = {"user_id": user_id, "pattern": f"%{query.split()[0]}%"}
+                timings[name] = {
+                    "fts": _time(conn, _SEARCH_SQL, params, args.repeat),
+                    "like_all_matches": _time(conn, _LIKE_SQL, like, max(1, args.repeat // 5)),
+                }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
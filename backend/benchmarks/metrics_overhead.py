@@ -0,0 +1,130 @@
+"""
+Cost of recording metrics, per request, per query and per stream.
+
+Calls a one-route FastAPI app directly over ASGI (no sockets) with and
+without :class:`MetricsMiddleware`, runs ``SELECT 1`` on an in-memory
+SQLite engine with and without :func:`instrument_engine`, and times
+:func:`observe_stream` on a finished stream.  The differences are what
+leaving metrics on costs.
+
+    python -m benchmarks.metrics_overhead --requests 20000 --queries 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import MetricsMiddleware, instrument_engine, observe_stream
+from app.engine import AsyncChatStream, ChatResponse
+
+
+def _app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int) -> dict:
+        return {"id": item_id}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def _requests(app: FastAPI, count: int) -> float:
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        pass
+
+    def scope(n: int) -> dict:
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/items/{n}",
+            "raw_path": f"/items/{n}".encode(),
+            "query_string": b"",
+            "headers": [],
+            "client": ("127.0.0.1", 1),
+            "server": ("testserver", 80),
+        }
+
+    for n in range(200):  # warm up routing and label caches
+        await app(scope(n), receive, send)
+    started = time.perf_counter()
+    for n in range(count):
+        await app(scope(n), receive, send)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def _queries(count: int, instrumented: bool) -> float:
+    engine = create_engine("sqlite://")
+    if instrumented:
+        instrument_engine(engine, "bench")
+    with engine.connect() as conn:
+        statement = text("SELECT 1")
+        started = time.perf_counter()
+        for _ in range(count):
+            conn.execute(statement).scalar()
+        elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed / count * 1e6
+
+
+def _streams(count: int) -> float:
+    async def source():
+        for n in range(50):
+            yield f"t{n} "
+        yield ChatResponse(content="done")
+
+    async def finished() -> AsyncChatStream:
+        stream = AsyncChatStream(source())
+        async for _ in stream:
+            pass
+        return stream
+
+    stream = asyncio.run(finished())
+    started = time.perf_counter()
+    for _ in range(count):
+        observe_stream("bench", stream)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=50_000)
+    parser.add_argument("--streams", type=int, default=50_000)
+    args = parser.parse_args()
+
+    plain = asyncio.run(_requests(_app(False), args.requests))
+    measured = asyncio.run(_requests(_app(True), args.requests))
+    query_plain = _queries(args.queries, instrumented=False)
+    query_measured = _queries(args.queries, instrumented=True)
+    results = {
+        "http_request_us": {
+            "without_metrics": round(plain, 2),
+            "with_metrics": round(measured, 2),
+            "overhead": round(measured - plain, 2),
+        },
+        "db_query_us": {
+            "without_metrics": round(query_plain, 2),
+            "with_metrics": round(query_measured, 2),
+            "overhead": round(query_measured - query_plain, 2),
+        },
+        "observe_stream_us": round(_streams(args.streams), 2),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
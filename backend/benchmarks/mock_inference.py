@@ -0,0 +1,134 @@
+"""
+Minimal OpenAI-compatible inference server for local runs and benchmarks.
+
+Serves ``POST /v1/chat/completions`` (streaming and not) and
+``GET /v1/models`` with a configurable time-to-first-token and token rate,
+echoing the last user message word by word.  Point the API at it with
+``ENGINE_BACKEND=openai INFERENCE_BASE_URL=http://localhost:8001/v1``.
+
+    python -m benchmarks.mock_inference --port 8001 --latency-ms 200 --tokens-per-sec 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_mock_app(
+    *,
+    latency_ms: float = 0.0,
+    tokens_per_sec: float = 0.0,
+    tokens: int = 32,
+    fail_first: int = 0,
+    model: str = "mock",
+) -> FastAPI:
+    """
+    Build the mock server.
+
+    ``latency_ms`` is added before the first token, ``tokens_per_sec``
+    paces the rest (0 = as fast as possible).  The first ``fail_first``
+    completion requests get a 503, to exercise client retries.
+    """
+    app = FastAPI(title="Mock inference")
+    app.state.requests = 0
+    app.state.failures_left = fail_first
+
+    def _reply(body: dict) -> list[str]:
+        question = next(
+            (m["content"] for m in reversed(body.get("messages", [])) if m["role"] == "user"),
+            "",
+        )
+        words = question.split() or ["ok"]
+        limit = body.get("max_tokens") or tokens
+        return [f"{word} " for word in itertools.islice(itertools.cycle(words), limit)]
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": model, "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.requests += 1
+        if app.state.failures_left > 0:
+            app.state.failures_left -= 1
+            return JSONResponse(
+                {"error": {"message": "overloaded"}},
+                status_code=503,
+                headers={"Retry-After": "0"},
+            )
+
+        body = await request.json()
+        words = _reply(body)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+
+        if not body.get("stream"):
+            if tokens_per_sec > 0:
+                await asyncio.sleep(len(words) / tokens_per_sec)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", model),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(words)},
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
+
+        async def events():
+            loop = asyncio.get_running_loop()
+            next_at = loop.time()
+            for word in words:
+                if tokens_per_sec > 0:
+                    next_at += 1 / tokens_per_sec
+                    await asyncio.sleep(max(0.0, next_at - loop.time()))
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "model": body.get("model", model),
+                    "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--tokens", type=int, default=64, help="tokens per answer")
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_mock_app(
+        latency_ms=args.latency_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        tokens=args.tokens,
+        fail_first=args.fail_first,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Password verification throughput (logins per second) per KDF policy.
+
+For each policy, measures single-thread verifications per second (the
+per-core login rate) and the rate through the dedicated KDF pool with
+``--workers`` threads.  hashlib releases the GIL, so the pool should scale
+close to linearly up to the number of free cores.
+
+    python -m benchmarks.password_kdf --seconds 3 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from app.core import security
+from app.core.config import settings
+
+POLICIES = {
+    "pbkdf2-100k": {"password_kdf": "pbkdf2_sha256", "password_pbkdf2_iterations": 100_000},
+    "pbkdf2-600k": {"password_kdf": "pbkdf2_sha256", "password_pbkdf2_iterations": 600_000},
+    "scrypt-n16k": {"password_kdf": "scrypt", "password_scrypt_n": 2**14},
+    "scrypt-n64k": {"password_kdf": "scrypt", "password_scrypt_n": 2**16},
+}
+
+
+def _single_thread(stored: str, seconds: float) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        security.verify_password("benchmark-password", stored)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+async def _pooled(stored: str, seconds: float, concurrency: int) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client() -> None:
+        nonlocal count
+        while time.perf_counter() < deadline:
+            await security.averify_password("benchmark-password", stored)
+            count += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return count / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=settings.password_hash_workers)
+    parser.add_argument("--policy", choices=sorted(POLICIES), action="append")
+    args = parser.parse_args()
+
+    settings.password_hash_workers = args.workers
+    results = []
+    for name in args.policy or POLICIES:
+        for key, value in POLICIES[name].items():
+            setattr(settings, key, value)
+        stored = security.hash_password("benchmark-password")
+        per_core = _single_thread(stored, args.seconds)
+        pooled = asyncio.run(_pooled(stored, args.seconds, args.workers * 2))
+        results.append(
+            {
+                "policy": name,
+                "logins_per_sec_per_core": round(per_core, 1),
+                "ms_per_login": round(1000 / per_core, 2),
+                f"logins_per_sec_{args.workers}_workers": round(pooled, 1),
+            }
+        )
+    print(json.dumps({"cpus": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
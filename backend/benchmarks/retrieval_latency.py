@@ -0,0 +1,124 @@
+"""
+Exact top-k retrieval latency versus corpus size.
+
+Fills a ``VectorStore`` with random unit vectors (``--dim`` wide) at each
+size in ``--sizes`` and times ``search()`` for single queries and for
+batches of ``--batch`` queries.  Query embedding is timed separately with
+the ``HashingEmbedder``.  Memory is ``size * dim * 4`` bytes, so 1M chunks
+at 384 dims needs about 1.5 GiB.
+
+``--store mmap`` uses an ``MmapVectorStore`` (``--dtype``) in a temp
+directory instead and also reports how long reopening the store takes at
+each size.
+
+    python -m benchmarks.retrieval_latency --sizes 10000 100000 1000000 --k 6
+    python -m benchmarks.retrieval_latency --store mmap
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.engine.retrieval import (
+    Chunk,
+    HashingEmbedder,
+    MmapVectorStore,
+    VectorStore,
+    normalize_rows,
+)
+
+_BLOCK = 100_000
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    return round(statistics.quantiles(samples, n=100)[int(pct) - 1], 3)
+
+
+def _fill(store, size: int, rng: np.random.Generator) -> None:
+    chunk = Chunk(text="benchmark chunk", source="bench")
+    while len(store) < size:
+        rows = min(_BLOCK, size - len(store))
+        vectors = rng.standard_normal((rows, store.dim), dtype=np.float32)
+        store.add([chunk] * rows, normalize_rows(vectors))
+
+
+def _time_ms(fn, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--store", choices=["memory", "mmap"], default="memory")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    store_bytes = 2 if args.store == "mmap" and args.dtype == "float16" else 4
+    embedder = HashingEmbedder(args.dim)
+    question = "How do I export my conversation history?"
+    embed_ms = _time_ms(lambda: embedder.embed([question]), args.repeats)
+
+    if args.store == "mmap":
+        path = tempfile.mkdtemp(prefix="privia-vectors-")
+        store = MmapVectorStore(path, args.dim, args.dtype)
+    else:
+        store = VectorStore(args.dim, capacity=max(args.sizes))
+    results = []
+    for size in sorted(args.sizes):
+        _fill(store, size, rng)
+        extra = {}
+        if args.store == "mmap":
+            started = time.perf_counter()
+            store = MmapVectorStore(path, args.dim)
+            extra["open_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        single = normalize_rows(rng.standard_normal((1, args.dim), dtype=np.float32))
+        batch = normalize_rows(rng.standard_normal((args.batch, args.dim), dtype=np.float32))
+        store.search(single, args.k)  # warm up
+        single_ms = _time_ms(lambda: store.search(single, args.k), args.repeats)
+        batch_ms = _time_ms(lambda: store.search(batch, args.k), max(5, args.repeats // 5))
+        results.append(
+            {
+                "chunks": size,
+                "dim": args.dim,
+                "k": args.k,
+                "single_p50_ms": _percentile(single_ms, 50),
+                "single_p95_ms": _percentile(single_ms, 95),
+                "batch_size": args.batch,
+                "batch_p50_ms": _percentile(batch_ms, 50),
+                "batched_ms_per_query": round(statistics.median(batch_ms) / args.batch, 3),
+                "matrix_mib": round(size * args.dim * store_bytes / 2**20, 1),
+                **extra,
+            }
+        )
+
+    print(
+        json.dumps(
+            {
+                "store": args.store,
+                "dtype": args.dtype if args.store == "mmap" else "float32",
+                "embed_p50_ms": _percentile(embed_ms, 50),
+                "search": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+SQLite throughput with concurrent readers and writers.
+
+Compares stock SQLite settings (rollback journal, ``synchronous=FULL``, no
+busy timeout, one shared pool) against the profile configured in Settings
+(WAL, ``synchronous=NORMAL``, busy timeout, mmap, separate read pool).
+Writers append chat messages; readers run the conversation list query.
+
+    python -m benchmarks.sqlite_concurrency --readers 8 --writers 4 --seconds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import Base, install_sqlite_pragmas
+from app.models import Conversation, Message, User
+
+STOCK = settings.model_copy(
+    update={
+        "sqlite_journal_mode": "delete",
+        "sqlite_synchronous": "full",
+        "sqlite_busy_timeout_ms": 0,
+        "sqlite_mmap_size": 0,
+        "sqlite_cache_size": -2000,
+        "sqlite_temp_store": "default",
+    }
+)
+
+
+def _seed(session: Session, conversations: int) -> tuple[str, list[str]]:
+    user = User(email="bench@privia.app", password_hash="")
+    session.add(user)
+    session.flush()
+    convs = [
+        Conversation(user_id=user.id, title=f"c{i}", status="active")
+        for i in range(conversations)
+    ]
+    session.add_all(convs)
+    session.flush()
+    for conv in convs:
+        session.add_all(
+            Message(conversation_id=conv.id, role="user", content="hello " * 20)
+            for _ in range(10)
+        )
+    session.commit()
+    return user.id, [c.id for c in convs]
+
+
+def run_profile(name: str, profile, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="privia-bench-")
+    url = f"sqlite:///{Path(workdir) / 'bench.db'}"
+    pool = {"pool_size": args.readers + args.writers, "max_overflow": 0}
+    # Stock setup: python's sqlite3 adds a 5 s busy handler unless told otherwise.
+    connect_args = {"timeout": 0} if profile is STOCK else {}
+
+    write_engine = create_engine(url, connect_args=connect_args, **pool)
+    install_sqlite_pragmas(write_engine, profile)
+    if profile is STOCK:
+        read_engine = write_engine
+    else:
+        read_engine = create_engine(url, **pool)
+        install_sqlite_pragmas(read_engine, profile, read_only=True)
+
+    Base.metadata.create_all(write_engine)
+    with Session(write_engine) as session:
+        user_id, conv_ids = _seed(session, args.conversations)
+
+    counts = {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def bump(key: str) -> None:
+        with lock:
+            counts[key] += 1
+
+    def writer(index: int) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            conv_id = conv_ids[(index + i) % len(conv_ids)]
+            i += 1
+            try:
+                with Session(write_engine) as session:
+                    session.add(
+                        Message(conversation_id=conv_id, role="assistant", content="x" * 400)
+                    )
+                    session.execute(
+                        update(Conversation)
+                        .where(Conversation.id == conv_id)
+                        .values(updated_at=func.current_timestamp())
+                    )
+                    session.commit()
+                bump("writes")
+            except OperationalError:
+                bump("write_errors")
+
+    def reader() -> None:
+        stmt = (
+            select(Conversation.id, func.count(Message.id))
+            .outerjoin(Message, Message.conversation_id == Conversation.id)
+            .where(Conversation.user_id == user_id)
+            .group_by(Conversation.id)
+            .order_by(Conversation.updated_at.desc())
+        )
+        while time.perf_counter() < deadline:
+            try:
+                with Session(read_engine) as session:
+                    session.execute(stmt).all()
+                bump("reads")
+            except OperationalError:
+                bump("read_errors")
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    write_engine.dispose()
+    read_engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "profile": name,
+        "reads_per_sec": round(counts["reads"] / elapsed, 1),
+        "writes_per_sec": round(counts["writes"] / elapsed, 1),
+        **{k: v for k, v in counts.items() if k.endswith("errors")},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--conversations", type=int, default=50)
+    args = parser.parse_args()
+
+    results = [run_profile("stock", STOCK, args), run_profile("tuned", settings, args)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
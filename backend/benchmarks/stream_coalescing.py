@@ -0,0 +1,134 @@
+"""
+Frames per second and server CPU per stream, with and without coalescing.
+
+Runs the real app under uvicorn in a background thread, with an engine that
+emits ``--rate`` tokens/s, and drives ``--streams`` concurrent chats over
+SSE (``/api/stream``) and WebSocket (``/api/ws/chat``).  Each transport is
+measured with coalescing disabled and with the configured
+``*_COALESCE_MS`` / ``*_COALESCE_BYTES``.  CPU is the server thread's own
+CPU time, so client work in this process is excluded.
+
+    python -m benchmarks.stream_coalescing --streams 50 --rate 80 --tokens 400
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import websockets
+
+# First: points DATABASE_URL at a throwaway database before the app loads.
+from benchmarks._harness import create_accounts, serve
+
+from app.core.config import settings
+from app.engine import AsyncChatStream, ChatResponse, StubChatEngine
+
+TOKEN = "word "
+
+
+class PacedEngine(StubChatEngine):
+    """Streams ``tokens`` tokens at ``rate`` tokens/s, like a real model."""
+
+    def __init__(self, rate: float, tokens: int) -> None:
+        self.rate = rate
+        self.tokens = tokens
+
+    def astream(self, query, context) -> AsyncChatStream:
+        return AsyncChatStream(self._paced())
+
+    async def _paced(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        for _ in range(self.tokens):
+            next_at += 1 / self.rate
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+            yield TOKEN
+        yield ChatResponse(content=TOKEN * self.tokens, mode="bench")
+
+
+async def _sse_streams(base_url: str, tokens: list[str]) -> int:
+    limits = httpx.Limits(max_connections=len(tokens))
+
+    async def one(client: httpx.AsyncClient, token: str) -> int:
+        frames = 0
+        headers = {"Authorization": f"Bearer {token}"}
+        async with client.stream(
+            "POST", "/api/stream", json={"question": "hi"}, headers=headers
+        ) as res:
+            async for line in res.aiter_lines():
+                if line.startswith("data: "):
+                    frames += 1
+        return frames - 1  # the trailing "done" event
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+        return sum(await asyncio.gather(*(one(client, token) for token in tokens)))
+
+
+async def _ws_streams(base_url: str, tokens: list[str]) -> int:
+    url = base_url.replace("http://", "ws://") + "/api/ws/chat"
+
+    async def one(token: str) -> int:
+        frames = 0
+        headers = {"Authorization": f"Bearer {token}"}
+        async with websockets.connect(url, additional_headers=headers) as ws:
+            await ws.send(json.dumps({"question": "hi"}))
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame["type"] == "token":
+                    frames += 1
+                elif frame["type"] in ("done", "error"):
+                    return frames
+
+    return sum(await asyncio.gather(*(one(token) for token in tokens)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=80.0, help="tokens/s per stream")
+    parser.add_argument("--tokens", type=int, default=400, help="tokens per answer")
+    parser.add_argument("--transport", choices=["sse", "ws"], action="append")
+    args = parser.parse_args()
+
+    transports = {
+        "sse": (_sse_streams, "sse_coalesce_ms", "sse_coalesce_bytes"),
+        "ws": (_ws_streams, "ws_coalesce_ms", "ws_coalesce_bytes"),
+    }
+    results = []
+    with serve(PacedEngine(args.rate, args.tokens)) as (base_url, thread):
+        tokens = create_accounts(base_url, args.streams)
+        server_cpu = time.pthread_getcpuclockid(thread.ident)
+        for name in args.transport or ["sse", "ws"]:
+            run, ms_field, bytes_field = transports[name]
+            configured = (getattr(settings, ms_field), getattr(settings, bytes_field))
+            for interval_ms, max_bytes in ((0, 0), configured):
+                setattr(settings, ms_field, interval_ms)
+                setattr(settings, bytes_field, max_bytes)
+                cpu_started = time.clock_gettime(server_cpu)
+                started = time.perf_counter()
+                frames = asyncio.run(run(base_url, tokens))
+                elapsed = time.perf_counter() - started
+                cpu = time.clock_gettime(server_cpu) - cpu_started
+                results.append(
+                    {
+                        "transport": name,
+                        "coalesce_ms": interval_ms,
+                        "coalesce_bytes": max_bytes,
+                        "frames_per_sec": round(frames / elapsed, 1),
+                        "frames_per_stream": round(frames / args.streams, 1),
+                        "server_cpu_ms_per_stream": round(cpu * 1000 / args.streams, 2),
+                        "server_cpu_pct": round(100 * cpu / elapsed, 1),
+                    }
+                )
+            setattr(settings, ms_field, configured[0])
+            setattr(settings, bytes_field, configured[1])
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
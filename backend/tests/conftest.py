@@ -1,8 +1,26 @@
+import asyncio
+from contextlib import contextmanager
+import os
+import tempfile
+import threading
+import uuid
+
+# Run the suite against a throwaway database so the schema always matches the
+# current models (indexes included). Must be set before the app is imported.
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='privia-tests-'), 'test.db')}",
+)
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 
 from app.main import app
+from app.api.routes import chat
+from app.core import database
 from app.core.database import Base, engine
+from app.engine import AsyncChatStream, ChatResponse, StubChatEngine
 
 
 @pytest.fixture(scope="module")
@@ -11,3 +29,77 @@ def client():
     Base.metadata.create_all(bind=engine)
     with TestClient(app) as c:
         yield c
+
+
+@contextmanager
+def capture_selects():
+    """Record (statement, parameters) for every SELECT run on any app engine."""
+    statements: list[tuple[str, tuple]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, tuple(parameters or ())))
+
+    engines = {database.engine, database.read_engine, database.async_engine.sync_engine}
+    for target in engines:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", record)
+
+
+def signup_and_login(client, prefix: str = "user") -> dict:
+    """Create a fresh account and return Bearer auth headers for it."""
+    email = f"{prefix}-{uuid.uuid4()}@privia.app"
+    client.post("/api/auth/signup", json={"email": email, "password": "test1234"})
+    token = client.post(
+        "/api/auth/login", data={"username": email, "password": "test1234"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+class SlowEngine(StubChatEngine):
+    """Streams ``tokens`` tokens 10 ms apart and records when a stream closes."""
+
+    def __init__(self, tokens: int = 200) -> None:
+        self.tokens = tokens
+        self.closed = threading.Event()
+
+    def astream(self, query, context) -> AsyncChatStream:
+        return AsyncChatStream(self._slow())
+
+    async def _slow(self):
+        try:
+            for i in range(self.tokens):
+                await asyncio.sleep(0.01)
+                yield f"tok{i} "
+            yield ChatResponse(content="full answer", mode="slow")
+        finally:
+            self.closed.set()
+
+
+class FailingEngine(SlowEngine):
+    """Streams ``tokens`` tokens, then raises ``error``; ``aanswer`` raises it at once."""
+
+    def __init__(self, error: Exception, tokens: int = 3) -> None:
+        super().__init__(tokens)
+        self.error = error
+
+    async def aanswer(self, query, context):
+        raise self.error
+
+    async def _slow(self):
+        async for item in super()._slow():
+            if isinstance(item, ChatResponse):
+                raise self.error
+            yield item
+
+
+@pytest.fixture
+def slow_engine(monkeypatch):
+    """Route every chat request to a fresh :class:`SlowEngine`."""
+    engine = SlowEngine()
+    monkeypatch.setattr(chat, "get_engine", lambda: engine)
+    return engine
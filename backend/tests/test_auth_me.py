@@ -1,4 +1,11 @@
+import time
+
+from fastapi import HTTPException
 from jose import jwt
+import pytest
+
+from app.core.config import settings
+from app.core.security import decode_jwt, token_cache_stats
 
 SECRET = "dev-secret-change-later"
 ALG = "HS256"
@@ -29,3 +36,39 @@ def test_me_authenticated(client):
 
     assert data["id"] == "user_123"
     assert data["email"] == "user@privia.app"
+
+
+def test_verified_tokens_are_cached(client):
+    headers = {"Authorization": f"Bearer {make_token()}"}
+    client.get("/api/auth/me", headers=headers)
+    before = token_cache_stats()
+
+    for _ in range(3):
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    after = token_cache_stats()
+    assert after["hits"] == before["hits"] + 3
+    assert after["misses"] == before["misses"]
+    assert client.get("/api/health").json()["caches"]["jwt"]["hits"] >= 3
+
+
+def test_cached_token_is_rejected_after_key_rotation(client, monkeypatch):
+    headers = {"Authorization": f"Bearer {make_token()}"}
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    monkeypatch.setattr(settings, "secret_key", "rotated-secret")
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+
+def test_cached_token_expires_with_exp_claim(client):
+    exp = int(time.time()) + 1
+    token = jwt.encode(
+        {"sub": "user_123", "email": "user@privia.app", "exp": exp},
+        SECRET,
+        algorithm=ALG,
+    )
+    assert decode_jwt(token)["sub"] == "user_123"
+    # jose compares whole seconds, so wait until exp is strictly in the past.
+    time.sleep(exp + 1.05 - time.time())
+    with pytest.raises(HTTPException):
+        decode_jwt(token)
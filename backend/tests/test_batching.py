@@ -0,0 +1,236 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from app.engine import (
+    AsyncChatStream,
+    BatchChatEngine,
+    BatchingChatEngine,
+    ChatContext,
+    ChatEngine,
+    ChatResponse,
+    StubChatEngine,
+)
+
+
+class _BatchAwareEngine(BatchChatEngine):
+    """
+    Fake batched backend: a fixed cost per forward pass, shared by every
+    prompt in the batch, then one token per prompt per step.
+    """
+
+    def __init__(self, steps: int = 3, step_delay: float = 0.01, fail: bool = False) -> None:
+        self.steps = steps
+        self.step_delay = step_delay
+        self.fail = fail
+        self.batches: List[List[str]] = []
+        self.closed = 0
+
+    def answer(self, query, context):
+        raise NotImplementedError
+
+    def stream(self, query, context):
+        raise NotImplementedError
+
+    async def astream_batch(self, requests):
+        self.batches.append([query for query, _ in requests])
+        try:
+            for step in range(self.steps):
+                await asyncio.sleep(self.step_delay)
+                if self.fail:
+                    raise RuntimeError("backend down")
+                for index, (query, _) in enumerate(requests):
+                    yield index, f"{query}-{step} "
+            for index, (query, _) in enumerate(requests):
+                yield index, ChatResponse(content=f"answer to {query}", model="batched")
+        finally:
+            self.closed += 1
+
+
+class _PerQueryEngine(ChatEngine):
+    """Unbatched backend: "boom" fails after one token, others stream ``steps`` tokens."""
+
+    def __init__(self, steps: int = 3, step_delay: float = 0.01) -> None:
+        self.steps = steps
+        self.step_delay = step_delay
+        self.closed: List[str] = []
+
+    def answer(self, query, context):
+        raise NotImplementedError
+
+    def stream(self, query, context):
+        raise NotImplementedError
+
+    def astream(self, query, context):
+        return AsyncChatStream(self._generate(query))
+
+    async def _generate(self, query):
+        try:
+            for step in range(self.steps):
+                await asyncio.sleep(self.step_delay)
+                if query == "boom" and step == 1:
+                    raise RuntimeError("backend down")
+                yield f"{query}-{step} "
+            yield ChatResponse(content=f"answer to {query}", model="single")
+        finally:
+            self.closed.append(query)
+
+
+def _collect(engine, query):
+    async def run():
+        stream = engine.astream(query, ChatContext(user_id="u"))
+        return [chunk async for chunk in stream], stream.response
+
+    return run()
+
+
+def test_concurrent_requests_are_batched_and_demultiplexed():
+    backend = _BatchAwareEngine()
+    engine = BatchingChatEngine(backend, max_batch_size=4, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(*(_collect(engine, f"q{i}") for i in range(8)))
+
+    results = asyncio.run(run())
+
+    assert [len(batch) for batch in backend.batches] == [4, 4]
+    for i, (chunks, response) in enumerate(results):
+        assert chunks == [f"q{i}-0 ", f"q{i}-1 ", f"q{i}-2 "]
+        assert response.content == f"answer to q{i}"
+
+    stats = engine.stats()
+    assert stats["requests"] == 8
+    assert stats["batches"] == 2
+    assert stats["avg_batch_size"] == 4
+    assert stats["batch_sizes"] == {4: 2}
+    assert stats["max_queue_depth"] >= 4
+    assert stats["queue_depth"] == 0
+    assert stats["in_flight_batches"] == 0
+
+
+def test_lone_request_waits_at_most_max_wait():
+    backend = _BatchAwareEngine(steps=1, step_delay=0)
+    engine = BatchingChatEngine(backend, max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await engine.aanswer("alone", ChatContext(user_id="u"))
+        return response, loop.time() - started
+
+    response, elapsed = asyncio.run(run())
+    assert response.content == "answer to alone"
+    assert backend.batches == [["alone"]]
+    assert 0.015 <= elapsed < 0.5
+
+
+def test_cancelled_caller_does_not_disturb_its_batch():
+    backend = _BatchAwareEngine(steps=5)
+    engine = BatchingChatEngine(backend, max_batch_size=2, max_wait_ms=50)
+
+    async def run():
+        async def quitter():
+            tokens = engine.astream("quit", ChatContext(user_id="u")).__aiter__()
+            await tokens.__anext__()
+            await tokens.aclose()
+
+        _, kept = await asyncio.gather(quitter(), _collect(engine, "keep"))
+        return kept
+
+    chunks, response = asyncio.run(run())
+    assert backend.batches == [["quit", "keep"]]
+    assert len(chunks) == 5
+    assert response.content == "answer to keep"
+
+
+def test_batch_is_closed_when_every_caller_stops():
+    backend = _BatchAwareEngine(steps=50)
+    engine = BatchingChatEngine(backend, max_batch_size=1, max_wait_ms=0)
+
+    async def run():
+        task = asyncio.ensure_future(_collect(engine, "stop me"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert backend.closed == 1
+    assert engine.stats()["in_flight_batches"] == 0
+
+
+def test_backend_error_reaches_every_caller():
+    engine = BatchingChatEngine(_BatchAwareEngine(fail=True), max_batch_size=2, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(
+            _collect(engine, "a"), _collect(engine, "b"), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_wraps_engines_without_batch_support():
+    engine = BatchingChatEngine(StubChatEngine(), max_batch_size=4, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(*(_collect(engine, "hi") for _ in range(3)))
+
+    for chunks, response in asyncio.run(run()):
+        assert "".join(chunks).strip() == response.content
+        assert response.mode == "stub"
+    assert engine.stats()["batch_sizes"] == {3: 1}
+
+
+@pytest.mark.parametrize("size", [1, 3])
+def test_max_batch_size_is_respected(size):
+    backend = _BatchAwareEngine(steps=1)
+    engine = BatchingChatEngine(backend, max_batch_size=size, max_wait_ms=20)
+
+    async def run():
+        await asyncio.gather(*(_collect(engine, str(i)) for i in range(6)))
+
+    asyncio.run(run())
+    assert all(len(batch) <= size for batch in backend.batches)
+    assert sum(len(batch) for batch in backend.batches) == 6
+
+
+def test_fan_out_error_only_reaches_its_own_caller():
+    backend = _PerQueryEngine()
+    engine = BatchingChatEngine(backend, max_batch_size=3, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(
+            _collect(engine, "a"), _collect(engine, "boom"), _collect(engine, "b"),
+            return_exceptions=True,
+        )
+
+    first, failed, second = asyncio.run(run())
+    assert isinstance(failed, RuntimeError)
+    assert first[1].content == "answer to a" and len(first[0]) == 3
+    assert second[1].content == "answer to b" and len(second[0]) == 3
+    assert engine.stats()["batch_sizes"] == {3: 1}
+
+
+def test_fan_out_stops_generating_for_a_caller_that_stops():
+    backend = _PerQueryEngine(steps=20)
+    engine = BatchingChatEngine(backend, max_batch_size=2, max_wait_ms=50)
+
+    async def run():
+        async def quitter():
+            tokens = engine.astream("quit", ChatContext(user_id="u")).__aiter__()
+            await tokens.__anext__()
+            await tokens.aclose()
+            await asyncio.sleep(0.02)
+            # Closed while "keep" is still mid-stream.
+            return list(backend.closed)
+
+        return await asyncio.gather(quitter(), _collect(engine, "keep"))
+
+    closed_early, (chunks, response) = asyncio.run(run())
+    assert closed_early == ["quit"]
+    assert len(chunks) == 20
+    assert response.content == "answer to keep"
+    assert engine.stats()["in_flight_batches"] == 0
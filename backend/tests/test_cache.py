@@ -0,0 +1,53 @@
+from app.core.cache import TTLCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_eviction_and_stats():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = _Clock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("short", "x", ttl=1)
+    cache.set("default", "y")
+
+    clock.now = 2
+    assert cache.get("short") is None
+    assert cache.get("default") == "y"
+    # update() keeps the original deadline instead of extending it.
+    assert cache.update("default", lambda v: v + "z")
+    clock.now = 6
+    assert cache.get("default") is None
+    assert not cache.update("default", lambda v: v)
+    assert cache.stats()["expirations"] == 2
+
+
+def test_weight_budget_evicts_oldest():
+    cache = TTLCache(maxsize=100, ttl=60, max_weight=10, weigh=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    cache.set("c", "xxxx")
+
+    assert cache.get("a") is None
+    assert cache.weight == 8
+    cache.set("huge", "x" * 11)  # larger than the whole budget: not cached
+    assert cache.get("huge") is None
+    assert cache.get("b") == "xxxx"
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+
+from app.api.routes import chat
+from app.main import app
+from tests.conftest import SlowEngine, signup_and_login
+
+
+def _last_answer(client, headers) -> str:
+    conversations = client.get("/api/conversations", headers=headers).json()
+    conv = client.get(f"/api/conversations/{conversations[0]['id']}", headers=headers)
+    messages = conv.json()["messages"]
+    assert messages[-1]["role"] == "assistant"
+    return messages[-1]["content"]
+
+
+def test_ws_stop_cancels_generation_and_keeps_partial_answer(client, slow_engine):
+    headers = signup_and_login(client, "ws-stop")
+    token = headers["Authorization"].split()[1]
+
+    with client.websocket_connect(f"/api/ws/chat?token={token}") as websocket:
+        websocket.send_json({"question": "write a long essay"})
+        assert websocket.receive_json()["type"] == "token"
+        websocket.send_json({"type": "stop"})
+
+        frames = [websocket.receive_json()]
+        while frames[-1]["type"] != "done":
+            frames.append(websocket.receive_json())
+
+    done = frames[-1]
+    assert done["stopped"] is True
+    assert done["conversation_id"]
+    assert slow_engine.closed.is_set()
+
+    answer = _last_answer(client, headers)
+    assert answer.startswith("tok0")
+    assert "tok199" not in answer
+
+
+class _SilentEngine(SlowEngine):
+    """Never gets to its first token; records when the stream starts."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.started = threading.Event()
+
+    async def _slow(self):
+        self.started.set()
+        try:
+            await asyncio.sleep(10)
+            yield "too late"
+        finally:
+            self.closed.set()
+
+
+def test_ws_stop_before_first_token_saves_no_answer(client, monkeypatch):
+    engine = _SilentEngine()
+    monkeypatch.setattr(chat, "get_engine", lambda: engine)
+    headers = signup_and_login(client, "ws-stop-early")
+    token = headers["Authorization"].split()[1]
+
+    with client.websocket_connect(f"/api/ws/chat?token={token}") as websocket:
+        websocket.send_json({"question": "never mind"})
+        assert engine.started.wait(5)
+        websocket.send_json({"type": "stop"})
+        done = websocket.receive_json()
+
+    assert done["type"] == "done" and done["stopped"] is True
+    assert engine.closed.is_set()
+    conv = client.get(f"/api/conversations/{done['conversation_id']}", headers=headers)
+    assert [m["role"] for m in conv.json()["messages"]] == ["user"]
+
+
+def test_sse_disconnect_cancels_generation(client, slow_engine):
+    headers = signup_and_login(client, "sse-stop")
+    body = json.dumps({"question": "write a long essay"}).encode()
+
+    async def run() -> None:
+        disconnect = asyncio.Event()
+        request_sent = False
+        chunks = 0
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal chunks
+            if message["type"] == "http.response.body" and message.get("body"):
+                chunks += 1
+                if chunks == 2:
+                    disconnect.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/api/stream",
+            "raw_path": b"/api/stream",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"authorization", headers["Authorization"].encode()),
+            ],
+            "client": ("testclient", 50000),
+            "server": ("testserver", 80),
+        }
+        await app(scope, receive, send)
+
+    # Run on the TestClient's loop, where the app's async DB pool lives.
+    client.portal.call(run)
+
+    assert slow_engine.closed.is_set()
+    answer = _last_answer(client, headers)
+    assert answer.startswith("tok0")
+    assert "tok199" not in answer
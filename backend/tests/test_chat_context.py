@@ -0,0 +1,100 @@
+from fastapi import status
+import pytest
+
+from app.api.routes import chat
+from app.core.config import settings
+from app.core.history_cache import history_cache
+from app.engine import ChatContext, StubChatEngine
+from tests.conftest import capture_selects, signup_and_login
+
+
+class _RecordingEngine(StubChatEngine):
+    """Stub engine that remembers the context of every call."""
+
+    def __init__(self) -> None:
+        self.contexts: list[ChatContext] = []
+
+    async def aanswer(self, query, context):
+        self.contexts.append(context)
+        return await super().aanswer(query, context)
+
+
+@pytest.fixture
+def recording_engine(monkeypatch):
+    engine = _RecordingEngine()
+    monkeypatch.setattr(chat, "get_engine", lambda: engine)
+    return engine
+
+
+def _ask(client, headers, question, conversation_id=None) -> str:
+    res = client.post(
+        "/api/query",
+        json={"question": question, "conversation_id": conversation_id},
+        headers=headers,
+    )
+    assert res.status_code == status.HTTP_200_OK
+    return res.json()["conversation_id"]
+
+
+def test_history_is_a_bounded_tail(client, recording_engine, monkeypatch):
+    monkeypatch.setattr(settings, "history_max_messages", 5)
+    monkeypatch.setattr(history_cache, "max_messages", 5)
+    headers = signup_and_login(client, "history")
+    conversation_id = _ask(client, headers, "question 0")
+    for i in range(1, 6):
+        _ask(client, headers, f"question {i}", conversation_id)
+
+    history_cache.evict(conversation_id)  # force the database path
+    with capture_selects() as statements:
+        _ask(client, headers, "latest", conversation_id)
+
+    history = recording_engine.contexts[-1].history
+    assert len(history) == 5
+    assert history[-1].content == "latest"
+    assert history[-2].role == "assistant"
+    assert any(
+        "FROM messages" in sql and "LIMIT" in sql and "ORDER BY" in sql
+        for sql, _ in statements
+    )
+
+
+def test_history_respects_token_budget(client, recording_engine, monkeypatch):
+    monkeypatch.setattr(settings, "history_token_budget", 20)
+    headers = signup_and_login(client, "budget")
+    conversation_id = _ask(client, headers, "a" * 400)
+    _ask(client, headers, "short follow-up", conversation_id)
+
+    history = recording_engine.contexts[-1].history
+    assert [m.content for m in history] == ["short follow-up"]
+
+
+def test_repeated_turns_skip_history_query(client, recording_engine):
+    headers = signup_and_login(client, "hotcache")
+    conversation_id = _ask(client, headers, "first")
+    _ask(client, headers, "second", conversation_id)
+
+    hits = history_cache.stats()["hits"]
+    with capture_selects() as statements:
+        _ask(client, headers, "third", conversation_id)
+
+    assert history_cache.stats()["hits"] == hits + 1
+    assert not any("FROM messages" in sql for sql, _ in statements)
+
+    cached = recording_engine.contexts[-1].history
+    history_cache.evict(conversation_id)
+    _ask(client, headers, "fourth", conversation_id)
+    from_db = recording_engine.contexts[-1].history
+    # Write-through kept the cache identical to what the database returns.
+    assert [(m.role, m.content) for m in from_db[:-2]] == [
+        (m.role, m.content) for m in cached
+    ]
+
+
+def test_delete_conversation_evicts_history(client, recording_engine):
+    headers = signup_and_login(client, "evict")
+    conversation_id = _ask(client, headers, "hello")
+    assert history_cache.get(conversation_id) is not None
+
+    res = client.delete(f"/api/conversations/{conversation_id}", headers=headers)
+    assert res.status_code == status.HTTP_204_NO_CONTENT
+    assert history_cache.get(conversation_id) is None
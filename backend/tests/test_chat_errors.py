@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.api.routes import chat
+from app.engine import UpstreamError
+from tests.conftest import FailingEngine, signup_and_login
+
+
+def _messages(client, headers) -> list[dict]:
+    conversations = client.get("/api/conversations", headers=headers).json()
+    conv = client.get(f"/api/conversations/{conversations[0]['id']}", headers=headers)
+    return conv.json()["messages"]
+
+
+@pytest.fixture
+def failing_engine(monkeypatch):
+    engine = FailingEngine(UpstreamError("Inference backend returned 503", status_code=503))
+    monkeypatch.setattr(chat, "get_engine", lambda: engine)
+    return engine
+
+
+def test_query_maps_upstream_error_to_bad_gateway(client, failing_engine):
+    headers = signup_and_login(client, "upstream-rest")
+    res = client.post("/api/query", json={"question": "hi"}, headers=headers)
+    assert res.status_code == 502
+    assert res.json()["detail"] == "Inference backend returned 503"
+
+
+def test_sse_sends_error_event_and_keeps_partial_answer(client, failing_engine):
+    headers = signup_and_login(client, "upstream-sse")
+    res = client.post("/api/stream", json={"question": "hi"}, headers=headers)
+    assert res.status_code == 200
+    assert "event: error\ndata: " in res.text
+    assert "Inference backend returned 503" in res.text
+    assert "event: done" not in res.text
+
+    message = _messages(client, headers)[-1]
+    assert (message["role"], message["content"]) == ("assistant", "tok0 tok1 tok2")
+
+
+def test_ws_sends_error_frame_and_keeps_partial_answer(client, failing_engine):
+    headers = signup_and_login(client, "upstream-ws")
+    with client.websocket_connect("/api/ws/chat", headers=headers) as ws:
+        ws.send_json({"question": "hi", "request_id": "r1"})
+        frames = [ws.receive_json()]
+        while frames[-1]["type"] == "token":
+            frames.append(ws.receive_json())
+
+    error = frames[-1]
+    assert error["type"] == "error"
+    assert error["request_id"] == "r1"
+    assert error["content"] == "Inference backend returned 503"
+    assert error["conversation_id"]
+    message = _messages(client, headers)[-1]
+    assert (message["role"], message["content"]) == ("assistant", "tok0 tok1 tok2")
+
+
+def test_ws_engine_crash_keeps_partial_answer(client, monkeypatch):
+    engine = FailingEngine(RuntimeError("index out of range"), tokens=2)
+    monkeypatch.setattr(chat, "get_engine", lambda: engine)
+    headers = signup_and_login(client, "engine-crash-ws")
+    with client.websocket_connect("/api/ws/chat", headers=headers) as ws:
+        ws.send_json({"question": "hi", "request_id": "r1"})
+        frames = [ws.receive_json()]
+        while frames[-1]["type"] == "token":
+            frames.append(ws.receive_json())
+        # The socket stays usable for the next question.
+        ws.send_json({"question": "again", "request_id": "r2"})
+        assert ws.receive_json()["request_id"] == "r2"
+        while ws.receive_json()["type"] == "token":
+            pass
+
+    error = frames[-1]
+    assert (error["type"], error["request_id"]) == ("error", "r1")
+    assert error["content"] == "Answer generation failed"
+    assert engine.closed.is_set()
+    conv = client.get(f"/api/conversations/{error['conversation_id']}", headers=headers)
+    message = conv.json()["messages"][-1]
+    assert (message["role"], message["content"]) == ("assistant", "tok0 tok1")
+
+
+def test_ws_turn_that_fails_to_start_gets_an_error_frame(client, monkeypatch):
+    headers = signup_and_login(client, "start-crash-ws")
+    start_turn = chat._start_turn
+
+    async def locked(db, user_id, conversation_id, question):
+        if question == "boom":
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return await start_turn(db, user_id, conversation_id, question)
+
+    monkeypatch.setattr(chat, "_start_turn", locked)
+    with client.websocket_connect("/api/ws/chat", headers=headers) as ws:
+        ws.send_json({"question": "boom", "request_id": "r1"})
+        error = ws.receive_json()
+        # The socket stays usable for the next question.
+        ws.send_json({"question": "again", "request_id": "r2"})
+        frames = [ws.receive_json()]
+        while frames[-1]["type"] == "token":
+            frames.append(ws.receive_json())
+
+    assert error == {"type": "error", "request_id": "r1", "content": "Request failed"}
+    assert (frames[-1]["type"], frames[-1]["request_id"]) == ("done", "r2")
@@ -4,6 +4,8 @@ from fastapi import status
 import pytest
 from starlette.websockets import WebSocketDisconnect
 
+from app.core.config import settings
+
 
 def _signup_and_login(client):
     email = f"ws-{uuid.uuid4()}@privia.app"
@@ -71,3 +73,70 @@ def test_ws_persists_messages(client):
     assert len(body["messages"]) >= 2
     assert body["messages"][-2]["role"] == "user"
     assert body["messages"][-1]["role"] == "assistant"
+
+
+def _collect_until_done(websocket, request_ids) -> list[dict]:
+    frames, pending = [], set(request_ids)
+    while pending:
+        frame = websocket.receive_json()
+        frames.append(frame)
+        if frame["type"] in ("done", "error"):
+            pending.discard(frame.get("request_id"))
+    return frames
+
+
+def test_ws_multiplexes_concurrent_answers(client, slow_engine):
+    slow_engine.tokens = 20
+    token = _signup_and_login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    conversation_id = client.post("/api/conversations", json={}, headers=headers).json()["id"]
+
+    with client.websocket_connect(f"/api/ws/chat?token={token}") as websocket:
+        websocket.send_json(
+            {"request_id": "a", "question": "first", "conversation_id": conversation_id}
+        )
+        websocket.send_json({"request_id": "b", "question": "second"})
+        frames = _collect_until_done(websocket, {"a", "b"})
+
+    tokens = [f["request_id"] for f in frames if f["type"] == "token"]
+    done = {f["request_id"]: f for f in frames if f["type"] == "done"}
+    assert set(done) == {"a", "b"}
+    assert all(not d.get("stopped") for d in done.values())
+    # Frames of both answers are interleaved, not sent one answer after another.
+    first_b, last_a = tokens.index("b"), len(tokens) - 1 - tokens[::-1].index("a")
+    assert first_b < last_a
+    assert done["a"]["conversation_id"] == conversation_id
+
+
+def test_ws_stop_by_request_id_only_stops_that_answer(client, slow_engine):
+    slow_engine.tokens = 40
+    token = _signup_and_login(client)
+
+    with client.websocket_connect(f"/api/ws/chat?token={token}") as websocket:
+        websocket.send_json({"request_id": "keep", "question": "one"})
+        websocket.send_json({"request_id": "stop-me", "question": "two"})
+        frame = websocket.receive_json()
+        while frame["type"] != "token":
+            frame = websocket.receive_json()
+        websocket.send_json({"type": "stop", "request_id": "stop-me"})
+        frames = _collect_until_done(websocket, {"keep", "stop-me"})
+
+    done = {f["request_id"]: f for f in frames if f["type"] == "done"}
+    assert done["stop-me"]["stopped"] is True
+    assert not done["keep"].get("stopped")
+
+
+def test_ws_enforces_concurrency_cap(client, slow_engine, monkeypatch):
+    monkeypatch.setattr(settings, "ws_max_concurrent_generations", 1)
+    token = _signup_and_login(client)
+
+    with client.websocket_connect(f"/api/ws/chat?token={token}") as websocket:
+        websocket.send_json({"request_id": "first", "question": "one"})
+        websocket.send_json({"request_id": "second", "question": "two"})
+        frame = websocket.receive_json()
+        while frame.get("request_id") != "second":
+            frame = websocket.receive_json()
+        assert frame["type"] == "error"
+        assert "concurrent" in frame["content"]
+        websocket.send_json({"type": "stop"})
+        _collect_until_done(websocket, {"first"})
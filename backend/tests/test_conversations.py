@@ -0,0 +1,99 @@
+from fastapi import status
+
+from tests.conftest import capture_selects, signup_and_login
+
+
+def _create_with_messages(client, headers, turns: int) -> str:
+    conversation_id = None
+    for i in range(turns):
+        res = client.post(
+            "/api/query",
+            json={"question": f"question {i}", "conversation_id": conversation_id},
+            headers=headers,
+        )
+        assert res.status_code == status.HTTP_200_OK
+        conversation_id = res.json()["conversation_id"]
+    return conversation_id
+
+
+def test_list_reports_message_counts(client):
+    headers = signup_and_login(client, "list")
+    busy = _create_with_messages(client, headers, 3)
+    quiet = _create_with_messages(client, headers, 1)
+
+    res = client.get("/api/conversations", headers=headers)
+    assert res.status_code == status.HTTP_200_OK
+    counts = {item["id"]: item["message_count"] for item in res.json()}
+    assert counts == {busy: 6, quiet: 2}
+    # Most recently updated first
+    assert res.json()[0]["id"] == quiet
+
+
+def test_list_runs_constant_queries(client):
+    headers = signup_and_login(client, "n-plus-one")
+
+    def list_queries() -> int:
+        with capture_selects() as statements:
+            assert client.get("/api/conversations", headers=headers).status_code == 200
+        return len(statements)
+
+    _create_with_messages(client, headers, 1)
+    baseline = list_queries()
+    for _ in range(3):
+        _create_with_messages(client, headers, 2)
+    assert list_queries() == baseline == 1
+
+
+def _walk(client, url: str, headers, direction: str, cursor: str | None = None):
+    """Follow next_cursor in one direction; return id pages and the last body."""
+    pages = []
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params[direction] = cursor
+        res = client.get(url, params=params, headers=headers)
+        assert res.status_code == status.HTTP_200_OK
+        body = res.json()
+        pages.append([item["id"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return pages, body
+
+
+def test_conversation_keyset_pagination(client):
+    headers = signup_and_login(client, "page")
+    newest_first = [_create_with_messages(client, headers, 1) for _ in range(5)][::-1]
+    url = "/api/conversations/page"
+
+    pages, last = _walk(client, url, headers, "before")
+    assert pages == [newest_first[0:2], newest_first[2:4], newest_first[4:5]]
+
+    # From the oldest page, walk back towards newer conversations.
+    pages, _ = _walk(client, url, headers, "after", last["prev_cursor"])
+    assert pages == [newest_first[2:4], newest_first[0:2]]
+
+
+def test_message_keyset_pagination(client):
+    headers = signup_and_login(client, "msg-page")
+    conversation_id = _create_with_messages(client, headers, 3)
+    url = f"/api/conversations/{conversation_id}/messages"
+
+    full = client.get(f"/api/conversations/{conversation_id}", headers=headers).json()
+    chronological = [m["id"] for m in full["messages"]]
+    assert len(chronological) == 6
+
+    # Latest page first, then older history; each page is chronological.
+    pages, last = _walk(client, url, headers, "before")
+    assert pages == [chronological[4:6], chronological[2:4], chronological[0:2]]
+
+    # From the oldest page, walk forward again.
+    pages, _ = _walk(client, url, headers, "after", last["prev_cursor"])
+    assert pages == [chronological[2:4], chronological[4:6]]
+
+
+def test_pagination_rejects_bad_cursor(client):
+    headers = signup_and_login(client, "bad-cursor")
+    res = client.get(
+        "/api/conversations/page", params={"before": "not-a-cursor"}, headers=headers
+    )
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core import database
+from app.core.config import settings
+
+
+def test_async_url_derived_from_sync_url(monkeypatch):
+    monkeypatch.setattr(settings, "async_database_url", None)
+    assert database._async_url("sqlite:///./x.db").drivername == "sqlite+aiosqlite"
+    assert (
+        database._async_url("postgresql://u:p@db/privia").drivername
+        == "postgresql+asyncpg"
+    )
+
+
+def test_explicit_async_url_wins(monkeypatch):
+    monkeypatch.setattr(
+        settings, "async_database_url", "postgresql+asyncpg://u:p@replica/privia"
+    )
+    assert database._async_url("sqlite:///./x.db").host == "replica"
+
+
+def test_async_engine_uses_tuned_pool():
+    if database.async_engine.url.database in (None, "", ":memory:"):
+        return
+    pool = database.async_engine.pool
+    assert isinstance(pool, AsyncAdaptedQueuePool)
+    assert pool.size() == settings.db_pool_size
+
+
+def test_async_session_enforces_foreign_keys():
+    async def run():
+        async with database.AsyncSessionLocal() as db:
+            return await db.scalar(text("PRAGMA foreign_keys"))
+
+    try:
+        assert asyncio.run(run()) == 1
+    finally:
+        asyncio.run(database.async_engine.dispose())
+
+
+def test_sqlite_profile_pragmas_applied():
+    with database.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert (
+            conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+            == settings.sqlite_busy_timeout_ms
+        )
+        assert conn.exec_driver_sql("PRAGMA temp_store").scalar() == 2  # MEMORY
+
+
+def test_read_pool_is_query_only():
+    if database.read_engine is database.engine:
+        return
+    with database.read_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.exec_driver_sql("CREATE TABLE _should_fail (id INTEGER)")
+
+
+def test_pragmas_follow_profile():
+    profile = settings.model_copy(
+        update={"sqlite_journal_mode": "delete", "sqlite_synchronous": "full"}
+    )
+    pragmas = database.sqlite_pragmas(profile, read_only=True)
+    assert "PRAGMA journal_mode=DELETE" in pragmas
+    assert "PRAGMA synchronous=FULL" in pragmas
+    assert "PRAGMA query_only=ON" in pragmas
+    assert not any(
+        "journal_mode" in p for p in database.sqlite_pragmas(profile, in_memory=True)
+    )
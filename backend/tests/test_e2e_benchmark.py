@@ -0,0 +1,47 @@
+from benchmarks.e2e import compare
+
+
+def _report(p50: float, rps: float, errors: int = 0, tokens_per_sec: float | None = 50.0) -> dict:
+    return {
+        "results": {
+            "sse": {
+                "requests": 100,
+                "errors": errors,
+                "requests_per_sec": rps,
+                "latency_ms": {"p50": p50, "p95": p50 * 2, "p99": p50 * 3, "max": p50 * 4},
+                "ttft_ms": {"p50": 100.0, "p95": 150.0, "p99": 200.0, "max": 250.0},
+                "tokens_per_sec": {"p50": tokens_per_sec, "p95": None, "p99": None, "max": None},
+            }
+        }
+    }
+
+
+def test_compare_flags_only_changes_beyond_tolerance():
+    baseline = _report(p50=200.0, rps=40.0)
+    assert compare(baseline, _report(p50=215.0, rps=37.0), tolerance=0.10) == []
+    # Faster and higher throughput is never a regression.
+    assert compare(baseline, _report(p50=100.0, rps=80.0), tolerance=0.10) == []
+
+    regressions = compare(baseline, _report(p50=260.0, rps=30.0, errors=2), tolerance=0.10)
+    assert {r["metric"] for r in regressions} == {
+        "errors",
+        "latency_ms.p50",
+        "latency_ms.p95",
+        "latency_ms.p99",
+        "requests_per_sec",
+    }
+    p50 = next(r for r in regressions if r["metric"] == "latency_ms.p50")
+    assert p50 == {
+        "transport": "sse",
+        "metric": "latency_ms.p50",
+        "baseline": 200.0,
+        "current": 260.0,
+        "change_pct": 30.0,
+    }
+
+
+def test_compare_skips_missing_metrics_and_transports():
+    baseline = _report(p50=200.0, rps=40.0, tokens_per_sec=None)
+    current = _report(p50=200.0, rps=40.0, tokens_per_sec=10.0)
+    current["results"]["ws"] = current["results"]["sse"]
+    assert compare(baseline, current, tolerance=0.10) == []
@@ -0,0 +1,201 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Iterator
+
+import pytest
+
+import app.engine as engine_package
+from app.core.config import settings
+from app.engine import (
+    ChatContext,
+    ChatEngine,
+    ChatResponse,
+    ChatStream,
+    HistoryMessage,
+    StubChatEngine,
+    estimate_tokens,
+    fit_history,
+    start_engine,
+)
+
+
+class _SlowSyncEngine(ChatEngine):
+    """Legacy engine that blocks between tokens."""
+
+    def answer(self, query: str, context: ChatContext) -> ChatResponse:
+        time.sleep(0.05)
+        return ChatResponse(content="slow", model="slow")
+
+    def stream(self, query: str, context: ChatContext) -> ChatStream:
+        return ChatStream(self._generate())
+
+    def _generate(self) -> Iterator[str]:
+        for token in ("a", "b", "c"):
+            time.sleep(0.05)
+            yield token
+
+
+class _EchoEngine(ChatEngine):
+    """Reports the query back in the response metadata."""
+
+    def answer(self, query: str, context: ChatContext) -> ChatResponse:
+        return ChatResponse(content=query, sources=[query], mode=query)
+
+    def stream(self, query: str, context: ChatContext) -> ChatStream:
+        return ChatStream(self._generate(query))
+
+    def _generate(self, query: str):
+        for ch in query:
+            time.sleep(0.001)
+            yield ch
+        yield ChatResponse(content=query, sources=[query], mode=query)
+
+
+def test_sync_engine_streams_off_the_event_loop():
+    engine = _SlowSyncEngine()
+    ctx = ChatContext(user_id="u1")
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        stream = engine.astream("q", ctx)
+        tokens = [chunk async for chunk in stream]
+        task.cancel()
+        return tokens, stream.response, ticks
+
+    tokens, resp, ticks = asyncio.run(run())
+    assert tokens == ["a", "b", "c"]
+    # No explicit response from the engine: the handle builds one.
+    assert resp.content == "abc"
+    # The loop kept ticking while the engine slept in its worker thread.
+    assert ticks >= 5
+
+
+def test_sync_engine_aanswer_uses_thread_pool():
+    resp = asyncio.run(_SlowSyncEngine().aanswer("q", ChatContext(user_id="u1")))
+    assert resp.content == "slow"
+
+
+def test_concurrent_async_streams_keep_their_own_response():
+    engine = _EchoEngine()
+    ctx = ChatContext(user_id="u1")
+    queries = [f"query-{i}" for i in range(8)]
+
+    async def consume(query: str):
+        stream = engine.astream(query, ctx)
+        text = "".join([chunk async for chunk in stream])
+        return text, stream.response
+
+    async def run():
+        return await asyncio.gather(*(consume(q) for q in queries))
+
+    for query, (text, resp) in zip(queries, asyncio.run(run())):
+        assert text == query
+        assert resp.mode == query
+        assert resp.sources == [query]
+
+
+def test_concurrent_sync_streams_across_threads():
+    engine = _EchoEngine()
+    ctx = ChatContext(user_id="u1")
+
+    def consume(query: str):
+        stream = engine.stream(query, ctx)
+        return "".join(stream), stream.response.mode
+
+    queries = [f"thread-{i}" for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(consume, queries))
+
+    assert results == [(q, q) for q in queries]
+
+
+def test_response_unavailable_before_stream_finishes():
+    stream = StubChatEngine().stream("q", ChatContext(user_id="u1"))
+    with pytest.raises(RuntimeError):
+        stream.response
+
+
+def test_stub_engine_astream_matches_stream():
+    engine = StubChatEngine()
+    ctx = ChatContext(user_id="u1")
+
+    async def collect():
+        stream = engine.astream("q", ctx)
+        return "".join([chunk async for chunk in stream]), stream.response
+
+    text, resp = asyncio.run(collect())
+    assert text == "".join(engine.stream("q", ctx))
+    assert resp.mode == "stub"
+
+
+def test_fit_history_keeps_newest_within_budget():
+    messages = [HistoryMessage(role="user", content="x" * 40) for _ in range(10)]
+    per_message = estimate_tokens("x" * 40)
+
+    kept = fit_history(messages, token_budget=per_message * 3)
+    assert kept == messages[-3:]
+
+
+def test_fit_history_always_keeps_latest_message():
+    huge = HistoryMessage(role="user", content="y" * 10_000)
+    assert fit_history([HistoryMessage(role="user", content="hi"), huge], 10) == [huge]
+
+
+def test_cancelled_async_consumer_closes_sync_stream():
+    closed = threading.Event()
+
+    class _EndlessEngine(_SlowSyncEngine):
+        def _generate(self) -> Iterator[str]:
+            try:
+                for i in range(1000):
+                    time.sleep(0.005)
+                    yield f"t{i} "
+            finally:
+                closed.set()
+
+    async def run():
+        stream = _EndlessEngine().astream("q", ChatContext(user_id="u1"))
+        tokens = stream.__aiter__()
+        for _ in range(3):
+            await tokens.__anext__()
+        await tokens.aclose()
+        return stream
+
+    stream = asyncio.run(run())
+    assert closed.wait(2), "sync generator was not closed"
+    assert stream.cancelled
+    assert stream.text == "t0 t1 t2 "
+    assert stream.response.content == "t0 t1 t2"
+
+
+def test_cancel_flag_stops_sync_stream():
+    stream = _EchoEngine().stream("abcdef", ChatContext(user_id="u1"))
+    received = []
+    for chunk in stream:
+        received.append(chunk)
+        if len(received) == 2:
+            stream.cancel()
+
+    assert received == ["a", "b"]
+    assert stream.cancelled and stream.finished
+
+
+def test_start_engine_builds_off_the_event_loop(monkeypatch):
+    built = []
+    monkeypatch.setattr(settings, "ingest_enabled", True)
+    monkeypatch.setattr(engine_package, "get_engine", lambda: built.append(threading.get_ident()))
+    monkeypatch.setattr(engine_package, "get_ingestor", lambda: built.append(threading.get_ident()))
+
+    asyncio.run(start_engine())
+    assert len(built) == 2
+    assert threading.get_ident() not in built
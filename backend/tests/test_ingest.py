@@ -0,0 +1,205 @@
+import io
+import queue
+import random
+import threading
+import time
+
+import pytest
+from sqlalchemy import update
+
+from app.api.routes import ingest as ingest_routes
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.security import decode_jwt
+from app.engine.retrieval import HashingEmbedder, Ingestor, Retriever, VectorStore
+from app.engine.retrieval.chunking import chunk_stream, chunk_text
+from app.engine.retrieval.ingest import read_blocks
+from app.models.user import User
+from tests.conftest import signup_and_login
+
+_DOC = "\n\n".join(
+    f"Section {i}. The warehouse in district {i} stores {i * 7} pallets of citrus. "
+    "Deliveries leave every morning before sunrise."
+    for i in range(400)
+)
+
+
+def _wait(ingestor, job_id, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = ingestor.get(job_id)
+        if job.status in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("ingestion did not finish")
+
+
+def _spooled(tmp_path, text=_DOC):
+    path = tmp_path / f"upload-{random.random()}.txt"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_chunk_stream_matches_chunk_text_for_any_block_split():
+    rng = random.Random(7)
+    for _ in range(50):
+        cuts = sorted(rng.sample(range(len(_DOC)), rng.randint(1, 40)))
+        blocks = [_DOC[a:b] for a, b in zip([0] + cuts, cuts + [len(_DOC)])]
+        assert list(chunk_stream(blocks, 300, 50)) == list(chunk_text(_DOC, 300, 50))
+
+
+def test_read_blocks_decodes_characters_split_across_reads():
+    text = "naïve café " * 100
+    assert "".join(read_blocks(io.BytesIO(text.encode()), block_size=7)) == text
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_job_indexes_document_and_reports_throughput(tmp_path, workers):
+    retriever = Retriever(HashingEmbedder(128), chunk_chars=300, chunk_overlap=50, batch_size=64)
+    ingestor = Ingestor(retriever, workers=workers, embed_batch_size=16)
+    path = _spooled(tmp_path)
+    try:
+        job = _wait(ingestor, ingestor.submit(path, "citrus.txt", "u1").id)
+    finally:
+        ingestor.close()
+
+    expected = len(list(chunk_text(_DOC, 300, 50)))
+    snapshot = job.snapshot()
+    assert snapshot["status"] == "done", snapshot["error"]
+    assert snapshot["chunks"] == len(retriever.store) == expected
+    assert snapshot["progress"] == 1.0
+    assert snapshot["chunks_per_sec"] > 0
+    assert not path.exists()
+
+    (hits,) = retriever.search(["pallets of citrus in district 123"], 1)
+    assert hits[0][0].source == "citrus.txt"
+    assert "district 123 " in hits[0][0].text
+
+
+def test_queue_is_bounded(tmp_path):
+    release = threading.Event()
+
+    class BlockingStore(VectorStore):
+        def add(self, chunks, vectors):
+            release.wait(10)
+            super().add(chunks, vectors)
+
+    retriever = Retriever(HashingEmbedder(32), BlockingStore(32))
+    ingestor = Ingestor(retriever, workers=0, max_queued_jobs=1)
+    try:
+        running = ingestor.submit(_spooled(tmp_path), "a.txt", "u1")
+        while running.status == "queued":
+            time.sleep(0.01)
+        waiting = ingestor.submit(_spooled(tmp_path), "b.txt", "u1")
+        assert not ingestor.has_capacity()
+        with pytest.raises(queue.Full):
+            ingestor.submit(_spooled(tmp_path), "c.txt", "u1")
+        assert ingestor.stats()["jobs"] == {"queued": 1, "running": 1, "done": 0, "failed": 0}
+        release.set()
+        assert _wait(ingestor, waiting.id).status == "done"
+    finally:
+        release.set()
+        ingestor.close()
+
+
+def test_failed_job_reports_error(tmp_path):
+    class BrokenStore(VectorStore):
+        def add(self, chunks, vectors):
+            raise OSError("disk full")
+
+    ingestor = Ingestor(Retriever(HashingEmbedder(32), BrokenStore(32)), workers=0)
+    path = _spooled(tmp_path)
+    try:
+        job = _wait(ingestor, ingestor.submit(path, "a.txt", "u1").id)
+    finally:
+        ingestor.close()
+    assert job.status == "failed"
+    assert job.error == "OSError: disk full"
+    assert not path.exists()
+
+
+# -- API ---------------------------------------------------------------------
+
+
+@pytest.fixture()
+def api_ingestor(monkeypatch, tmp_path):
+    retriever = Retriever(HashingEmbedder(128), chunk_chars=300, chunk_overlap=50)
+    ingestor = Ingestor(retriever, workers=0)
+    monkeypatch.setattr(settings, "ingest_enabled", True)
+    monkeypatch.setattr(settings, "rag_store", "mmap")
+    monkeypatch.setattr(settings, "ingest_spool_dir", str(tmp_path))
+    monkeypatch.setattr(ingest_routes, "get_ingestor", lambda: ingestor)
+    yield ingestor
+    ingestor.close()
+
+
+def _signup(client, prefix: str, role: str = "admin") -> dict:
+    headers = signup_and_login(client, prefix)
+    user_id = decode_jwt(headers["Authorization"].split()[1])["sub"]
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.id == user_id).values(role=role))
+        db.commit()
+    return headers
+
+
+def _body(data: bytes, piece: int = 4096):
+    for start in range(0, len(data), piece):
+        yield data[start : start + piece]
+
+
+def test_streaming_upload_creates_job(client, api_ingestor, tmp_path):
+    headers = _signup(client, "ingest")
+    data = _DOC.encode()
+    res = client.post(
+        "/api/ingest/documents",
+        params={"filename": "citrus.md"},
+        content=_body(data),
+        headers=headers,
+    )
+    assert res.status_code == 202, res.text
+    job_id = res.json()["id"]
+    assert res.json()["bytes_total"] == len(data)
+
+    _wait(api_ingestor, job_id)
+    status = client.get(f"/api/ingest/jobs/{job_id}", headers=headers).json()
+    assert status["status"] == "done"
+    assert status["chunks"] == len(api_ingestor.retriever.store) > 0
+    assert list(tmp_path.iterdir()) == []
+
+    other = _signup(client, "ingest-other")
+    assert client.get(f"/api/ingest/jobs/{job_id}", headers=other).status_code == 404
+
+
+def test_upload_rejections(client, api_ingestor, monkeypatch, tmp_path):
+    headers = _signup(client, "ingest")
+    url = "/api/ingest/documents"
+
+    res = client.post(url, params={"filename": "a.pdf"}, content=b"x", headers=headers)
+    assert res.status_code == 415
+
+    monkeypatch.setattr(settings, "ingest_max_upload_bytes", 1000)
+    res = client.post(url, params={"filename": "a.txt"}, content=_body(b"x" * 5000, 100), headers=headers)
+    assert res.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+    monkeypatch.setattr(settings, "ingest_enabled", False)
+    res = client.post(url, params={"filename": "a.txt"}, content=b"x", headers=headers)
+    assert res.status_code == 403
+
+    assert client.post(url, params={"filename": "a.txt"}, content=b"x").status_code == 401
+
+
+def test_upload_requires_ingest_role_and_shared_store(client, api_ingestor, monkeypatch):
+    url = "/api/ingest/documents"
+    member = signup_and_login(client, "ingest-member")
+    res = client.post(url, params={"filename": "a.txt"}, content=b"x", headers=member)
+    assert res.status_code == 403
+
+    monkeypatch.setattr(settings, "ingest_roles", ["admin", "editor"])
+    editor = _signup(client, "ingest-editor", role="editor")
+    res = client.post(url, params={"filename": "a.txt"}, content=b"x", headers=editor)
+    assert res.status_code == 202
+
+    monkeypatch.setattr(settings, "rag_store", "memory")
+    res = client.post(url, params={"filename": "a.txt"}, content=b"x", headers=editor)
+    assert res.status_code == 409
@@ -0,0 +1,142 @@
+import threading
+
+import numpy as np
+
+from app.engine.retrieval import Chunk, IVFIndex, VectorStore, normalize_rows
+from app.engine.retrieval.ivf import kmeans
+
+DIM = 16
+
+
+def _clustered(rng, n, clusters=20):
+    centers = normalize_rows(rng.standard_normal((clusters, DIM)).astype(np.float32))
+    noise = 0.1 * rng.standard_normal((n, DIM)).astype(np.float32)
+    return normalize_rows(centers[rng.integers(0, clusters, n)] + noise)
+
+
+def _chunks(start, count):
+    return [Chunk(text=f"chunk {i}", source=f"doc{i}") for i in range(start, start + count)]
+
+
+def _recall(got, expected):
+    overlaps = [
+        len({c.source for c, _ in a} & {c.source for c, _ in b}) / len(b)
+        for a, b in zip(got, expected)
+    ]
+    return np.mean(overlaps)
+
+
+def test_kmeans_finds_separated_clusters():
+    rng = np.random.default_rng(0)
+    points = np.concatenate([rng.normal(-5, 0.1, (50, 2)), rng.normal(5, 0.1, (50, 2))])
+    centroids = kmeans(points.astype(np.float32), 2, rng=rng)
+    assert sorted(np.round(centroids[:, 0]).tolist()) == [-5.0, 5.0]
+
+
+def test_untrained_index_answers_exactly():
+    rng = np.random.default_rng(1)
+    vectors = _clustered(rng, 50)
+    index = IVFIndex(DIM, nlist=8, train_size=100)
+    index.add(_chunks(0, 50), vectors)
+    assert not index.trained
+    assert index.search(vectors[3], 1)[0][0][0].source == "doc3"
+
+
+def test_recall_improves_with_nprobe_and_reaches_exact():
+    rng = np.random.default_rng(2)
+    vectors = _clustered(rng, 3000)
+    exact = VectorStore(DIM)
+    exact.add(_chunks(0, 3000), vectors)
+    index = IVFIndex(DIM, nlist=32, nprobe=2, train_size=2000)
+    index.add(_chunks(0, 2000), vectors[:2000])
+    assert index.trained
+    index.add(_chunks(2000, 1000), vectors[2000:])  # incremental insertion
+    assert len(index) == 3000
+
+    noise = 0.05 * rng.standard_normal((30, DIM)).astype(np.float32)
+    queries = normalize_rows(vectors[::100] + noise)
+    expected = exact.search(queries, 10)
+    low = _recall(index.search(queries, 10, nprobe=1), expected)
+    full = _recall(index.search(queries, 10, nprobe=32), expected)
+    assert full == 1.0
+    assert low <= _recall(index.search(queries, 10), expected) <= full
+
+
+def test_product_quantization_compresses_and_ranks(tmp_path):
+    rng = np.random.default_rng(3)
+    vectors = _clustered(rng, 4000)
+    index = IVFIndex(DIM, nlist=16, nprobe=16, pq_m=8, train_size=4000)
+    index.add(_chunks(0, 4000), vectors)
+    assert index._lists[0].rows.dtype == np.uint8
+    assert index._lists[0].rows.shape[1] == 8
+
+    hits = index.search(vectors[:20], 10)
+    assert np.mean([f"doc{i}" in {c.source for c, _ in row} for i, row in enumerate(hits)]) >= 0.8
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rng = np.random.default_rng(4)
+    vectors = _clustered(rng, 1000)
+    for pq_m in (0, 4):
+        index = IVFIndex(DIM, nlist=16, nprobe=4, pq_m=pq_m, train_size=1000)
+        index.add(_chunks(0, 1000), vectors)
+        path = tmp_path / f"pq{pq_m}"
+        index.save(str(path))
+
+        loaded = IVFIndex.load(str(path))
+        assert len(loaded) == 1000
+        assert loaded.pq_m == pq_m
+        queries = vectors[:5]
+        assert [[c.source for c, _ in row] for row in loaded.search(queries, 5)] == [
+            [c.source for c, _ in row] for row in index.search(queries, 5)
+        ]
+        loaded.add(_chunks(1000, 1), vectors[:1])
+        assert len(loaded) == 1001
+
+
+def test_loaded_index_follows_saves_from_other_processes(tmp_path):
+    rng = np.random.default_rng(5)
+    vectors = _clustered(rng, 600)
+    writer = IVFIndex(DIM, nlist=8, nprobe=8, train_size=300)
+    writer.add(_chunks(0, 300), vectors[:300])
+    writer.save(str(tmp_path))
+
+    reader = IVFIndex.load(str(tmp_path))
+    reader.nprobe = 2
+    assert len(reader) == 300
+
+    writer.add(_chunks(300, 300), vectors[300:])
+    writer.save(str(tmp_path))
+    hits = reader.search(vectors[450:451], 1)
+    assert len(reader) == 600
+    assert hits[0][0][0].source == "doc450"
+    assert reader.nprobe == 2  # per-process setting survives the reload
+
+
+def test_concurrent_saves_to_one_directory(tmp_path):
+    rng = np.random.default_rng(6)
+    vectors = _clustered(rng, 400)
+    indexes = []
+    for n in (100, 200, 300, 400):
+        index = IVFIndex(DIM, nlist=4, nprobe=4, train_size=50)
+        index.add(_chunks(0, n), vectors[:n])
+        indexes.append(index)
+
+    errors = []
+
+    def save(index):
+        try:
+            for _ in range(5):
+                index.save(str(tmp_path))
+        except Exception as exc:  # pragma: no cover - the failure under test
+            errors.append(exc)
+
+    threads = [threading.Thread(target=save, args=(index,)) for index in indexes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(IVFIndex.load(str(tmp_path))) in (100, 200, 300, 400)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["chunks.jsonl", "index.npz"]
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from prometheus_client import REGISTRY
+
+from app.engine import AsyncChatStream, ChatResponse
+from tests.conftest import signup_and_login
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_endpoint_exposes_route_latency(client):
+    before = _sample(
+        "privia_http_request_duration_seconds_count", method="GET", route="/api/health/"
+    )
+    client.get("/api/health/")
+    client.get("/no/such/path/123")
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/health/"' in res.text
+    assert "/no/such/path" not in res.text
+    assert _sample(
+        "privia_http_request_duration_seconds_count", method="GET", route="/api/health/"
+    ) == before + 1
+    assert _sample(
+        "privia_http_requests_total", method="GET", route="<unmatched>", status="404"
+    ) >= 1
+    assert _sample("privia_http_requests_in_flight") == 0
+
+
+def test_database_queries_are_timed_and_counted_per_request(client):
+    headers = signup_and_login(client, "metrics-db")
+    route = "/api/conversations/{conversation_id}/messages"
+    conv = client.post("/api/query", json={"question": "hi"}, headers=headers).json()
+    reads = _sample("privia_db_query_duration_seconds_count", pool="read")
+    async_writes = _sample("privia_db_query_duration_seconds_count", pool="async")
+    per_request = _sample("privia_http_db_queries_per_request_sum", route=route)
+
+    client.get(f"/api/conversations/{conv['conversation_id']}/messages", headers=headers)
+    client.post("/api/query", json={"question": "again"}, headers=headers)
+
+    assert _sample("privia_db_query_duration_seconds_count", pool="read") > reads
+    assert _sample("privia_db_query_duration_seconds_count", pool="async") > async_writes
+    assert _sample("privia_http_db_queries_per_request_sum", route=route) > per_request
+    assert _sample("privia_http_db_queries_per_request_sum", route="/api/query") > 0
+
+
+def test_sse_stream_records_streaming_metrics(client):
+    headers = signup_and_login(client, "metrics-sse")
+    ttft = _sample("privia_stream_time_to_first_token_seconds_count", transport="sse")
+    tokens = _sample("privia_stream_tokens_total", transport="sse")
+
+    res = client.post("/api/stream", json={"question": "hello"}, headers=headers)
+    assert res.status_code == 200
+
+    assert _sample("privia_stream_time_to_first_token_seconds_count", transport="sse") == ttft + 1
+    assert _sample("privia_stream_tokens_total", transport="sse") > tokens
+    assert _sample(
+        "privia_stream_duration_seconds_count", transport="sse", outcome="completed"
+    ) >= 1
+
+
+def test_websocket_connections_gauge(client):
+    headers = signup_and_login(client, "metrics-ws")
+    baseline = _sample("privia_websocket_connections")
+    with client.websocket_connect("/api/ws/chat", headers=headers) as ws:
+        ws.send_json({"question": "hi", "request_id": "a"})
+        while ws.receive_json()["type"] != "done":
+            pass
+        assert _sample("privia_websocket_connections") == baseline + 1
+    # The server side finishes its cleanup just after the client closes.
+    for _ in range(100):
+        if _sample("privia_websocket_connections") == baseline:
+            break
+        time.sleep(0.01)
+    assert _sample("privia_websocket_connections") == baseline
+    assert _sample("privia_stream_tokens_total", transport="ws") > 0
+
+
+def test_stream_handle_timestamps():
+    async def source():
+        await asyncio.sleep(0.02)
+        yield "a "
+        yield "b "
+        yield ChatResponse(content="a b")
+
+    async def consume():
+        stream = AsyncChatStream(source())
+        assert stream.first_token_at is None
+        assert [chunk async for chunk in stream] == ["a ", "b "]
+        return stream
+
+    stream = asyncio.run(consume())
+    assert stream.chunk_count == 2
+    assert stream.first_token_at - stream.started_at >= 0.015
+    assert stream.started_at < stream.first_token_at <= stream.finished_at
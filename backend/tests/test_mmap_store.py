@@ -0,0 +1,164 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.engine.retrieval import (
+    Chunk,
+    HashingEmbedder,
+    MmapVectorStore,
+    Retriever,
+    VectorStore,
+    normalize_rows,
+)
+
+DIM = 32
+
+
+def _batch(rng, start, count):
+    chunks = [
+        Chunk(text=f"chunk {i}", source=f"doc{i}.md", metadata={"i": str(i)})
+        for i in range(start, start + count)
+    ]
+    return chunks, normalize_rows(rng.standard_normal((count, DIM)).astype(np.float32))
+
+
+def test_matches_in_memory_search_across_segments(tmp_path):
+    rng = np.random.default_rng(1)
+    disk = MmapVectorStore(str(tmp_path), DIM, dtype="float32")
+    memory = VectorStore(DIM)
+    for start in (0, 300, 700):
+        chunks, vectors = _batch(rng, start, 300 if start < 700 else 50)
+        disk.add(chunks, vectors)
+        memory.add(chunks, vectors)
+
+    assert len(disk) == len(memory) == 650
+    assert disk.segment_count == 3
+    queries = normalize_rows(rng.standard_normal((3, DIM)).astype(np.float32))
+    for got, expected in zip(disk.search(queries, 5), memory.search(queries, 5)):
+        assert [c.source for c, _ in got] == [c.source for c, _ in expected]
+        assert got[0][0].metadata == expected[0][0].metadata
+
+
+def test_float16_store_keeps_ranking(tmp_path):
+    rng = np.random.default_rng(2)
+    store = MmapVectorStore(str(tmp_path), DIM, dtype="float16")
+    chunks, vectors = _batch(rng, 0, 200)
+    store.add(chunks, vectors)
+    assert (tmp_path / "seg-000001.vec").stat().st_size == 200 * DIM * 2
+
+    hits = store.search(vectors[[7, 42]], 1)
+    assert [h[0][0].source for h in hits] == ["doc7.md", "doc42.md"]
+    assert abs(hits[0][0][1] - 1.0) < 1e-2
+
+
+def test_other_instances_see_appends_and_reopen_without_reindexing(tmp_path):
+    rng = np.random.default_rng(3)
+    writer = MmapVectorStore(str(tmp_path), DIM)
+    reader = MmapVectorStore(str(tmp_path), DIM)
+    assert len(reader) == 0
+
+    writer.add(*_batch(rng, 0, 10))
+    assert len(reader) == 10
+    writer.add(*_batch(rng, 10, 5))
+    assert len(reader) == 15
+
+    reopened = MmapVectorStore(str(tmp_path), DIM)
+    assert len(reopened) == 15
+    with pytest.raises(ValueError):
+        MmapVectorStore(str(tmp_path), DIM * 2)
+
+
+def test_compaction_merges_segments(tmp_path):
+    rng = np.random.default_rng(4)
+    store = MmapVectorStore(str(tmp_path), DIM)
+    reader = MmapVectorStore(str(tmp_path), DIM)
+    batches = [_batch(rng, start, 20) for start in range(0, 100, 20)]
+    for chunks, vectors in batches:
+        store.add(chunks, vectors)
+    query = batches[3][1][5:6]
+    before = reader.search(query, 3)
+
+    assert store.compact() is True
+    assert store.segment_count == 1
+    assert len(list(tmp_path.glob("seg-*.vec"))) == 1
+    assert store.compact() is False
+    assert reader.search(query, 3)[0][0][0].source == before[0][0][0].source == "doc65.md"
+    assert len(reader) == 100
+
+
+def test_compaction_leaves_the_large_base_segment_alone(tmp_path):
+    rng = np.random.default_rng(7)
+    store = MmapVectorStore(str(tmp_path), DIM)
+    store.add(*_batch(rng, 0, 500))
+    recent = [_batch(rng, start, 10) for start in range(500, 530, 10)]
+    for chunks, vectors in recent:
+        store.add(chunks, vectors)
+    base = store._segments[0].name
+
+    assert store.compact() is True
+    assert [(s.name, s.rows) for s in store._segments][0] == (base, 500)
+    assert [s.rows for s in store._segments] == [500, 30]
+    assert len(list(tmp_path.glob("seg-*.vec"))) == 2
+    assert store.search(recent[2][1][5:6], 1)[0][0][0].source == "doc525.md"
+    assert store.compact() is False  # 500 rows still dwarf the 30 after them
+
+
+def test_background_compaction_survives_errors(tmp_path, monkeypatch):
+    rng = np.random.default_rng(8)
+    store = MmapVectorStore(str(tmp_path), DIM)
+    for start in (0, 10, 20):
+        store.add(*_batch(rng, start, 10))
+    compact = store.compact
+    calls = []
+
+    def flaky(min_segments):
+        calls.append(min_segments)
+        if len(calls) == 1:
+            raise OSError("No space left on device")
+        return compact(min_segments)
+
+    monkeypatch.setattr(store, "compact", flaky)
+    store.start_compaction(interval=0.01, min_segments=2)
+    try:
+        for _ in range(200):
+            if store.segment_count == 1:
+                break
+            time.sleep(0.01)
+    finally:
+        store.close()
+    assert len(calls) >= 2
+    assert store.segment_count == 1
+
+
+def test_retriever_uses_mmap_store(tmp_path):
+    embedder = HashingEmbedder(DIM)
+    retriever = Retriever(embedder, MmapVectorStore(str(tmp_path), DIM))
+    retriever.add_documents(
+        [("faq.md", "Refunds take five business days."), ("other.md", "Unrelated text.")]
+    )
+    (hits,) = retriever.search(["how long do refunds take"], 1)
+    assert hits[0][0].source == "faq.md"
+
+
+def test_refresh_survives_segments_compacted_away_by_another_process(tmp_path, monkeypatch):
+    rng = np.random.default_rng(6)
+    writer = MmapVectorStore(str(tmp_path), DIM)
+    reader = MmapVectorStore(str(tmp_path), DIM)
+    for start in (0, 10, 20):
+        writer.add(*_batch(rng, start, 10))
+    stale = writer._read_manifest()
+    writer.compact()
+
+    # The reader lists the three segments just before the compaction
+    # deletes them, then re-reads the manifest and opens the merged one.
+    reads = iter([stale])
+    read_manifest = reader._read_manifest
+    monkeypatch.setattr(reader, "_read_manifest", lambda: next(reads, None) or read_manifest())
+    assert len(reader) == 30
+    assert reader.segment_count == 1
+
+    # A reader that keeps losing the race serves what it already has.
+    monkeypatch.setattr(reader, "_read_manifest", lambda: stale)
+    reader._manifest_stamp = None
+    assert len(reader) == 30
@@ -0,0 +1,182 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+import httpx
+import pytest
+
+from app.engine import ChatContext, HistoryMessage, UpstreamError
+from app.engine.openai_compat import OpenAICompatEngine
+from benchmarks.mock_inference import create_mock_app
+
+
+def _engine(mock_app, **kwargs) -> OpenAICompatEngine:
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_app))
+    kwargs.setdefault("retry_backoff", 0.0)
+    return OpenAICompatEngine("http://mock/v1", "mock", client=client, **kwargs)
+
+
+def test_aanswer_returns_completion():
+    engine = _engine(create_mock_app(tokens=3))
+
+    async def run():
+        try:
+            return await engine.aanswer("hello there", ChatContext(user_id="u"))
+        finally:
+            await engine.aclose()
+
+    response = asyncio.run(run())
+    assert response.content == "hello there hello "
+    assert response.mode == "chat"
+    assert response.model == "mock"
+
+
+def test_astream_yields_deltas_then_response():
+    engine = _engine(create_mock_app(tokens=4))
+
+    async def run():
+        try:
+            stream = engine.astream("one two", ChatContext(user_id="u"))
+            return [chunk async for chunk in stream], stream
+        finally:
+            await engine.aclose()
+
+    chunks, stream = asyncio.run(run())
+    assert chunks == ["one ", "two ", "one ", "two "]
+    assert stream.response.content == "one two one two "
+    assert stream.response.model == "mock"
+
+
+def test_sync_pair_uses_the_sync_client():
+    mock_app = create_mock_app(tokens=3, fail_first=1)
+    engine = OpenAICompatEngine(
+        "http://mock/v1", "mock", sync_client=TestClient(mock_app), retry_backoff=0.0
+    )
+
+    assert engine.answer("hello there", ChatContext(user_id="u")).content == "hello there hello "
+    stream = engine.stream("one two", ChatContext(user_id="u"))
+    assert list(stream) == ["one ", "two ", "one "]
+    assert stream.response.content == "one two one "
+    assert stream.response.model == "mock"
+    assert mock_app.state.requests == 3  # one 503 retried, then two completions
+
+
+def test_history_is_sent_without_duplicating_question():
+    engine = OpenAICompatEngine("http://mock/v1", "mock")
+    context = ChatContext(
+        user_id="u",
+        history=[
+            HistoryMessage(role="user", content="hi"),
+            HistoryMessage(role="assistant", content="hello"),
+            HistoryMessage(role="user", content="again"),
+        ],
+    )
+    payload = engine._payload("again", context, stream=True)
+    assert [m["content"] for m in payload["messages"]] == ["hi", "hello", "again"]
+    assert payload["stream"] is True
+
+    payload = engine._payload("new", ChatContext(user_id="u"), stream=False)
+    assert payload["messages"] == [{"role": "user", "content": "new"}]
+
+
+def test_retries_transient_failures():
+    mock_app = create_mock_app(tokens=2, fail_first=2)
+    engine = _engine(mock_app, max_retries=2)
+
+    async def run():
+        try:
+            return await engine.aanswer("retry me", ChatContext(user_id="u"))
+        finally:
+            await engine.aclose()
+
+    assert asyncio.run(run()).content == "retry me "
+    assert mock_app.state.requests == 3
+
+
+def test_gives_up_with_bad_gateway():
+    mock_app = create_mock_app(fail_first=5)
+    engine = _engine(mock_app, max_retries=1)
+
+    async def run():
+        try:
+            stream = engine.astream("hi", ChatContext(user_id="u"))
+            return [chunk async for chunk in stream]
+        finally:
+            await engine.aclose()
+
+    with pytest.raises(UpstreamError) as exc:
+        asyncio.run(run())
+    assert exc.value.status_code == 503
+    assert mock_app.state.requests == 2
+
+
+class _BrokenBody(httpx.AsyncByteStream, httpx.SyncByteStream):
+    """A response body whose connection drops after the headers."""
+
+    async def __aiter__(self):
+        raise httpx.ReadError("connection reset")
+        yield b""
+
+    def __iter__(self):
+        raise httpx.ReadError("connection reset")
+        yield b""
+
+
+def _mock_engine(handler) -> OpenAICompatEngine:
+    transport = httpx.MockTransport(handler)
+    return OpenAICompatEngine(
+        "http://mock/v1",
+        "mock",
+        client=httpx.AsyncClient(transport=transport),
+        sync_client=httpx.Client(transport=transport),
+    )
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        lambda: httpx.Response(200, json={"id": "x", "model": "mock"}),
+        lambda: httpx.Response(200, json={"choices": []}),
+        lambda: httpx.Response(200, text="<html>gateway</html>"),
+        lambda: httpx.Response(200, stream=_BrokenBody()),
+    ],
+    ids=["no-choices", "empty-choices", "not-json", "read-error"],
+)
+def test_bad_completions_raise_upstream_error(response):
+    engine = _mock_engine(lambda request: response())
+
+    with pytest.raises(UpstreamError):
+        engine.answer("hi", ChatContext(user_id="u"))
+
+    async def run():
+        try:
+            await engine.aanswer("hi", ChatContext(user_id="u"))
+        finally:
+            await engine.aclose()
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        'data: {"choices": [{"delta": {"content": "ok "}}]}\n\ndata: {not json\n\n',
+        'data: ["a", "list"]\n\n',
+        'data: {"choices": ["not a choice"]}\n\n',
+    ],
+    ids=["bad-json", "not-an-object", "bad-choice"],
+)
+def test_malformed_stream_raises_upstream_error(body):
+    engine = _mock_engine(lambda request: httpx.Response(200, text=body))
+
+    with pytest.raises(UpstreamError):
+        list(engine.stream("hi", ChatContext(user_id="u")))
+
+    async def run():
+        try:
+            return [chunk async for chunk in engine.astream("hi", ChatContext(user_id="u"))]
+        finally:
+            await engine.aclose()
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(run())
@@ -0,0 +1,69 @@
+import asyncio
+import hashlib
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.security import (
+    averify_password,
+    hash_password,
+    needs_rehash,
+    verify_password,
+)
+from app.models.user import User
+
+
+def _legacy_hash(password: str, salt: str = "00" * 16) -> str:
+    dk = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 100_000)
+    return f"{salt}${dk.hex()}"
+
+
+def test_hash_formats_round_trip(monkeypatch):
+    pbkdf2 = hash_password("s3cret")
+    assert pbkdf2.startswith(f"pbkdf2_sha256${settings.password_pbkdf2_iterations}$")
+    assert verify_password("s3cret", pbkdf2)
+    assert not verify_password("wrong", pbkdf2)
+
+    monkeypatch.setattr(settings, "password_kdf", "scrypt")
+    monkeypatch.setattr(settings, "password_scrypt_n", 2**10)
+    scrypt = hash_password("s3cret")
+    assert scrypt.startswith("scrypt$1024$8$1$")
+    assert verify_password("s3cret", scrypt)
+    # Verification reads parameters from the hash, not the current policy.
+    assert verify_password("s3cret", pbkdf2)
+
+    assert verify_password("s3cret", _legacy_hash("s3cret"))
+    assert not verify_password("s3cret", "not-a-hash")
+    assert asyncio.run(averify_password("s3cret", scrypt))
+
+
+def test_needs_rehash_follows_policy(monkeypatch):
+    current = hash_password("pw")
+    assert not needs_rehash(current)
+    assert needs_rehash(_legacy_hash("pw"))
+
+    monkeypatch.setattr(settings, "password_pbkdf2_iterations", 200_000)
+    assert needs_rehash(current)
+    monkeypatch.setattr(settings, "password_kdf", "scrypt")
+    assert needs_rehash(current)
+
+
+def test_login_upgrades_legacy_hash(client):
+    email = f"legacy-{uuid.uuid4()}@privia.app"
+    with Session(engine) as db:
+        db.add(User(email=email, password_hash=_legacy_hash("test1234")))
+        db.commit()
+
+    res = client.post("/api/auth/login", data={"username": email, "password": "test1234"})
+    assert res.status_code == 200
+
+    with Session(engine) as db:
+        stored = db.scalar(select(User.password_hash).where(User.email == email))
+    assert stored.startswith("pbkdf2_sha256$")
+    assert not needs_rehash(stored)
+    # The upgraded hash still logs in.
+    res = client.post("/api/auth/login", data={"username": email, "password": "test1234"})
+    assert res.status_code == 200
@@ -0,0 +1,66 @@
+"""Guard the hot chat/sidebar queries against full-table scans."""
+
+import re
+
+from fastapi import status
+
+from app.core import database
+from tests.conftest import capture_selects, signup_and_login
+
+_SCAN = re.compile(r"^SCAN (TABLE )?(users|conversations|messages)\b")
+
+
+def _full_scans(statement: str, parameters: tuple) -> list[str]:
+    with database.engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in plan if _SCAN.match(row[-1])]
+
+
+def test_hot_queries_use_indexes(client):
+    headers = signup_and_login(client, "plan")
+    # An older conversation, so the paginated list has a second page.
+    client.post("/api/query", json={"question": "earlier"}, headers=headers)
+
+    with capture_selects() as statements:
+        created = client.post("/api/conversations", json={}, headers=headers)
+        assert created.status_code == status.HTTP_201_CREATED
+        conversation_id = created.json()["id"]
+        for question in ("first", "second"):
+            res = client.post(
+                "/api/query",
+                json={"question": question, "conversation_id": conversation_id},
+                headers=headers,
+            )
+            assert res.status_code == status.HTTP_200_OK
+        assert client.get("/api/conversations", headers=headers).status_code == 200
+        assert (
+            client.get(f"/api/conversations/{conversation_id}", headers=headers).status_code
+            == 200
+        )
+        page = client.get(
+            "/api/conversations/page", params={"limit": 1}, headers=headers
+        ).json()
+        assert page["next_cursor"]
+        res = client.get(
+            "/api/conversations/page",
+            params={"limit": 1, "before": page["next_cursor"]},
+            headers=headers,
+        )
+        assert res.status_code == 200
+        messages_url = f"/api/conversations/{conversation_id}/messages"
+        page = client.get(messages_url, params={"limit": 1}, headers=headers).json()
+        assert page["next_cursor"]
+        res = client.get(
+            messages_url, params={"limit": 1, "before": page["next_cursor"]}, headers=headers
+        )
+        assert res.status_code == 200
+        res = client.get("/api/conversations/search", params={"q": "second"}, headers=headers)
+        assert res.status_code == 200 and res.json()
+
+    assert statements
+    offenders = {
+        statement: scans
+        for statement, parameters in statements
+        if (scans := _full_scans(statement, parameters))
+    }
+    assert not offenders, offenders
@@ -0,0 +1,136 @@
+import pytest
+
+from app.core.config import settings
+from app.core.ratelimit import Budget, MemoryStore, RateLimiter, SQLiteStore
+from tests.conftest import signup_and_login
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = MemoryStore() if request.param == "memory" else SQLiteStore(str(tmp_path / "rl.db"))
+    yield store
+    store.close()
+
+
+def test_gcra_allows_burst_then_refills(store):
+    clock = Clock()
+    limiter = RateLimiter(store, clock)
+    budget = Budget("chat", per_minute=60, burst=3)
+
+    decisions = [limiter.check(budget, "u1") for _ in range(3)]
+    assert [d.remaining for d in decisions] == [2, 1, 0]
+    assert all(d.allowed for d in decisions)
+
+    denied = limiter.check(budget, "u1")
+    assert not denied.allowed
+    assert denied.retry_after == pytest.approx(1.0)
+    assert denied.reset_after == pytest.approx(3.0)
+    assert denied.headers()["Retry-After"] == "1"
+    # Denied checks do not consume anything; other users are unaffected.
+    assert limiter.check(budget, "u2").allowed
+
+    clock.now += 1.0
+    assert limiter.check(budget, "u1").allowed
+    assert not limiter.check(budget, "u1").allowed
+
+    clock.now += 60
+    assert limiter.check(budget, "u1").remaining == 2
+    assert limiter.stats()["budgets"]["chat"] == {"allowed": 6, "denied": 2, "errors": 0}
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "rl.db")
+    workers = [RateLimiter(SQLiteStore(path), clock) for _ in range(2)]
+    budget = Budget("new_chat", per_minute=20, burst=1)
+    try:
+        assert workers[0].check(budget, "u1").allowed
+        denied = workers[1].check(budget, "u1")
+        assert not denied.allowed
+        assert denied.retry_after == pytest.approx(3.0)
+    finally:
+        for limiter in workers:
+            limiter.close()
+
+
+def test_memory_store_is_bounded():
+    clock = Clock()
+    store = MemoryStore(max_keys=100)
+    limiter = RateLimiter(store, clock)
+    budget = Budget("chat", per_minute=60, burst=5)
+    for user in range(1000):
+        limiter.check(budget, f"u{user}")
+    assert len(store) == 100
+
+
+def test_store_failure_allows_request():
+    class BrokenStore(MemoryStore):
+        def acquire(self, key, now, interval, capacity):
+            raise OSError("store unavailable")
+
+    limiter = RateLimiter(BrokenStore())
+    assert limiter.check(Budget("chat", 60, 2), "u1").allowed
+    assert limiter.stats()["budgets"]["chat"]["errors"] == 1
+
+
+# -- API ---------------------------------------------------------------------
+
+
+@pytest.fixture()
+def tight_chat_budget(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_chat_per_minute", 1.0)
+    monkeypatch.setattr(settings, "rate_limit_chat_burst", 2)
+
+
+def test_chat_endpoints_share_budget_and_report_headers(client, tight_chat_budget):
+    headers = signup_and_login(client, "rl-chat")
+
+    res = client.post("/api/query", json={"question": "one"}, headers=headers)
+    assert res.status_code == 200
+    assert res.headers["RateLimit-Limit"] == "2"
+    assert res.headers["RateLimit-Remaining"] == "1"
+
+    res = client.post("/api/stream", json={"question": "two"}, headers=headers)
+    assert res.status_code == 200
+    assert res.headers["RateLimit-Remaining"] == "0"
+
+    res = client.post("/api/query", json={"question": "three"}, headers=headers)
+    assert res.status_code == 429
+    assert 1 <= int(res.headers["Retry-After"]) <= 60
+    assert res.headers["RateLimit-Remaining"] == "0"
+
+    other = signup_and_login(client, "rl-chat-other")
+    assert client.post("/api/query", json={"question": "one"}, headers=other).status_code == 200
+
+
+def test_websocket_questions_are_limited(client, tight_chat_budget):
+    headers = signup_and_login(client, "rl-ws")
+    with client.websocket_connect("/api/ws/chat", headers=headers) as ws:
+        for request_id in ("a", "b"):
+            ws.send_json({"question": "hi", "request_id": request_id})
+            while ws.receive_json()["type"] != "done":
+                pass
+        ws.send_json({"question": "hi", "request_id": "c"})
+        frame = ws.receive_json()
+    assert frame["type"] == "error"
+    assert frame["request_id"] == "c"
+    assert frame["retry_after"] > 0
+
+
+def test_creating_conversations_is_limited(client):
+    headers = signup_and_login(client, "rl-new")
+    conv = client.post("/api/conversations", json={}, headers=headers).json()
+    client.post("/api/query", json={"question": "hi", "conversation_id": conv["id"]}, headers=headers)
+
+    res = client.post("/api/conversations", json={}, headers=headers)
+    assert res.status_code == 429
+    assert res.headers["Retry-After"] == "3"
+    assert "RateLimit-Limit" in client.get("/api/conversations", headers=headers).headers
@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+from app.engine import (
+    CachingChatEngine,
+    ChatContext,
+    ChatEngine,
+    ChatResponse,
+    ChatStream,
+    HistoryMessage,
+    SQLiteResponseStore,
+)
+from app.engine.cache import cache_key, normalize_query, replay_chunks
+
+
+class _CountingEngine(ChatEngine):
+    """Counts generations; answers echo the query."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def answer(self, query, context):
+        self.calls += 1
+        return ChatResponse(content=f"Answer about {query}", mode="chat", model="m")
+
+    def stream(self, query, context):
+        self.calls += 1
+        return ChatStream(self._generate(query))
+
+    def _generate(self, query):
+        for word in ("Answer ", "about ", query):
+            yield word
+        yield ChatResponse(content=f"Answer about {query}", mode="chat", model="m")
+
+
+def _stream(engine, query, context):
+    async def run():
+        stream = engine.astream(query, context)
+        return [chunk async for chunk in stream], stream.response
+
+    return asyncio.run(run())
+
+
+def test_key_normalizes_query_and_ignores_current_question_in_history():
+    assert normalize_query("  How do I  START?") == normalize_query("how do i start")
+    fresh = ChatContext(user_id="a")
+    persisted = ChatContext(
+        user_id="b", history=[HistoryMessage(role="user", content="How do I start?")]
+    )
+    assert cache_key("How do I start?", persisted) == cache_key("how do i start", fresh)
+
+    earlier = ChatContext(
+        user_id="a",
+        history=[
+            HistoryMessage(role="user", content="hi"),
+            HistoryMessage(role="assistant", content="hello"),
+        ],
+    )
+    assert cache_key("how do i start", earlier) != cache_key("how do i start", fresh)
+    assert cache_key("q", ChatContext(user_id="a", model="x")) != cache_key("q", fresh)
+    assert cache_key("q", ChatContext(user_id="a", temperature=0.2)) != cache_key("q", fresh)
+
+
+def test_repeated_stream_is_replayed_from_cache():
+    inner = _CountingEngine()
+    engine = CachingChatEngine(inner)
+    context = ChatContext(user_id="u")
+
+    chunks, response = _stream(engine, "pricing", context)
+    assert response.mode == "chat"
+    assert "".join(chunks) == "Answer about pricing"
+
+    chunks, response = _stream(engine, "Pricing?", context)
+    assert inner.calls == 1
+    assert chunks == ["Answer ", "about ", "pricing"]
+    assert response.mode == "cache"
+    assert response.content == "Answer about pricing"
+
+    stats = engine.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["stored"] == 1
+
+
+def test_hot_temperature_bypasses_cache():
+    inner = _CountingEngine()
+    engine = CachingChatEngine(inner, max_temperature=0.3)
+    context = ChatContext(user_id="u", temperature=0.9)
+
+    for _ in range(2):
+        assert asyncio.run(engine.aanswer("poem", context)).mode == "chat"
+    assert inner.calls == 2
+    assert engine.stats()["skipped"] == 2
+    assert len(engine._cache) == 0
+
+
+def test_entries_expire_and_are_evicted():
+    inner = _CountingEngine()
+    engine = CachingChatEngine(inner, maxsize=1, ttl=0.05)
+    context = ChatContext(user_id="u")
+
+    engine.answer("a", context)
+    engine.answer("b", context)  # evicts "a"
+    assert engine.stats()["evictions"] == 1
+    engine.answer("a", context)
+    assert inner.calls == 3
+
+    time.sleep(0.06)
+    engine.answer("a", context)
+    assert inner.calls == 4
+
+
+def test_stopped_stream_is_not_cached():
+    inner = _CountingEngine()
+    engine = CachingChatEngine(inner)
+    context = ChatContext(user_id="u")
+
+    async def run():
+        tokens = engine.astream("partial", context).__aiter__()
+        await tokens.__anext__()
+        await tokens.aclose()
+
+    asyncio.run(run())
+    assert len(engine._cache) == 0
+
+
+def test_sqlite_store_is_shared_and_survives_restart(tmp_path):
+    path = str(tmp_path / "responses.db")
+    context = ChatContext(user_id="u")
+
+    first = CachingChatEngine(_CountingEngine(), store=SQLiteResponseStore(path))
+    asyncio.run(first.aanswer("onboarding", context))
+
+    inner = _CountingEngine()
+    second = CachingChatEngine(inner, store=SQLiteResponseStore(path))
+    response = asyncio.run(second.aanswer("Onboarding", context))
+    assert inner.calls == 0
+    assert response.mode == "cache"
+    assert response.content == "Answer about onboarding"
+    assert second.stats()["persistent_hits"] == 1
+
+
+def test_replay_chunks_keep_all_text():
+    text = "Hello,  world!\nSecond line "
+    assert "".join(replay_chunks(text)) == text
+    assert list(replay_chunks("one two")) == ["one ", "two"]
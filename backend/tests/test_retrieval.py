@@ -0,0 +1,116 @@
+import asyncio
+
+import numpy as np
+
+from app.engine import ChatContext, ChatEngine, ChatResponse, ChatStream, HistoryMessage
+from app.engine.rag import RagChatEngine
+from app.engine.retrieval import Chunk, HashingEmbedder, Retriever, VectorStore, chunk_text, top_k
+
+DOCS = [
+    ("billing.md", "Invoices are emailed on the first day of each month. Refunds take five days."),
+    ("security.md", "Passwords are hashed with PBKDF2. Tokens expire after one hour."),
+    ("onboarding.md", "To get started, create an account and open a new conversation."),
+]
+
+
+class _PromptEngine(ChatEngine):
+    """Answers with the prompt it received, so tests can inspect it."""
+
+    def __init__(self) -> None:
+        self.contexts = []
+
+    def answer(self, query, context):
+        self.contexts.append(context)
+        return ChatResponse(content=query, mode="chat", model="prompt")
+
+    def stream(self, query, context):
+        self.contexts.append(context)
+        return ChatStream(iter([query]))
+
+
+def _retriever() -> Retriever:
+    retriever = Retriever(HashingEmbedder(256))
+    retriever.add_documents(DOCS)
+    return retriever
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.standard_normal((4, 1000)).astype(np.float32)
+    indices, best = top_k(scores, 10)
+    expected = np.argsort(-scores, axis=1)[:, :10]
+    assert (indices == expected).all()
+    assert (np.diff(best, axis=1) <= 0).all()
+
+    indices, _ = top_k(scores[:, :3], 10)
+    assert indices.shape == (4, 3)
+
+
+def test_store_grows_and_searches_in_batches():
+    embedder = HashingEmbedder(64)
+    store = VectorStore(64, capacity=2)
+    texts = [f"document number {i} about topic {i % 7}" for i in range(50)]
+    store.add([Chunk(text=t, source=str(i)) for i, t in enumerate(texts)], embedder.embed(texts))
+    assert len(store) == 50
+
+    results = store.search(embedder.embed([texts[3], texts[40]]), k=3)
+    assert [hits[0][0].source for hits in results] == ["3", "40"]
+    assert abs(results[0][0][1] - 1.0) < 1e-5
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    first = HashingEmbedder(128).embed(["refund my invoice", ""])
+    second = HashingEmbedder(128).embed(["refund my invoice", ""])
+    assert (first == second).all()
+    assert abs(np.linalg.norm(first[0]) - 1.0) < 1e-5
+    assert not first[1].any()
+
+
+def test_chunk_text_respects_size_and_overlap():
+    text = " ".join(f"word{i}" for i in range(500))
+    chunks = list(chunk_text(text, max_chars=200, overlap=50))
+    assert all(len(c) <= 200 for c in chunks)
+    assert chunks[0].split()[-1] in chunks[1]
+    assert chunks[-1].endswith("word499")
+
+
+def test_rag_engine_grounds_answer_in_top_k_chunks():
+    inner = _PromptEngine()
+    engine = RagChatEngine(inner, _retriever(), min_score=0.05)
+    question = "When are invoices emailed?"
+    context = ChatContext(
+        user_id="u", top_k=1, history=[HistoryMessage(role="user", content=question)]
+    )
+
+    response = asyncio.run(engine.aanswer(question, context))
+    assert response.mode == "rag"
+    assert response.sources == ["billing.md"]
+    assert response.confidence > 0
+    assert "Invoices are emailed" in response.content
+    assert "PBKDF2" not in response.content
+    # The persisted question is replaced by the grounded prompt, not repeated.
+    assert [m.content for m in inner.contexts[0].history] == [response.content]
+
+
+def test_rag_stream_reports_sources():
+    engine = RagChatEngine(_PromptEngine(), _retriever(), min_score=0.05)
+
+    async def run():
+        stream = engine.astream("how long do tokens last", ChatContext(user_id="u", top_k=2))
+        chunks = [chunk async for chunk in stream]
+        return chunks, stream.response
+
+    chunks, response = asyncio.run(run())
+    assert "Tokens expire" in "".join(chunks)
+    assert response.mode == "rag"
+    assert response.sources[0] == "security.md"
+    assert len(response.sources) <= 2
+
+
+def test_rag_engine_falls_back_when_nothing_matches():
+    inner = _PromptEngine()
+    engine = RagChatEngine(inner, _retriever(), min_score=0.9)
+    response = asyncio.run(engine.aanswer("zebra", ChatContext(user_id="u")))
+    assert response.mode == "chat"
+    assert response.content == "zebra"
+    assert response.sources == []
@@ -0,0 +1,107 @@
+from fastapi import status
+from sqlalchemy import update
+
+from app.api.routes.conversations import _match_expression
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.conversation import Conversation
+from tests.conftest import signup_and_login
+
+
+def _ask(client, headers, question, conversation_id=None):
+    res = client.post(
+        "/api/query",
+        json={"question": question, "conversation_id": conversation_id},
+        headers=headers,
+    )
+    assert res.status_code == status.HTTP_200_OK
+    return res.json()["conversation_id"]
+
+
+def _search(client, headers, q, **params):
+    res = client.get("/api/conversations/search", params={"q": q, **params}, headers=headers)
+    assert res.status_code == status.HTTP_200_OK, res.text
+    return res.json()
+
+
+def test_search_ranks_and_highlights_own_messages(client):
+    headers = signup_and_login(client, "search")
+    first = _ask(client, headers, "How do I rotate the Kubernetes cluster certificates?")
+    _ask(client, headers, "Kubernetes again: kubernetes certificates expire, kubernetes!", first)
+    _ask(client, headers, "Lunch ideas for the <team> offsite")
+
+    hits = _search(client, headers, "kubernetes certificates")
+    assert len(hits) == 2
+    assert all(hit["conversation_id"] == first for hit in hits)
+    assert hits[0]["score"] >= hits[1]["score"] > 0
+    assert hits[0]["snippet"].count("<mark>") >= 3
+    assert hits[0]["role"] == "user"
+    assert hits[0]["conversation_title"]
+
+    # Prefix on the last word; markup in content is escaped.
+    (hit,) = _search(client, headers, "offsite tea")
+    assert hit["snippet"] == "Lunch ideas for the &lt;<mark>team</mark>&gt; <mark>offsite</mark>"
+
+
+def test_search_is_scoped_to_user(client):
+    alice = signup_and_login(client, "search-a")
+    bob = signup_and_login(client, "search-b")
+    _ask(client, alice, "quarterly zebra inventory")
+    assert len(_search(client, alice, "zebra")) == 1
+    assert _search(client, bob, "zebra") == []
+
+
+def test_pages_are_filled_with_the_callers_own_matches(client):
+    alice = signup_and_login(client, "search-page-a")
+    bob = signup_and_login(client, "search-page-b")
+    moved = _ask(client, alice, "narwhal narwhal narwhal narwhal")
+    _ask(client, alice, "one narwhal among many other words in a longer message")
+    # The index still files the moved conversation's messages under alice,
+    # and they outrank her own match; the ownership check must drop them
+    # before the page is cut, not after.
+    bob_id = client.get("/api/auth/me", headers=bob).json()["id"]
+    with SessionLocal() as db:
+        db.execute(update(Conversation).where(Conversation.id == moved).values(user_id=bob_id))
+        db.commit()
+
+    (hit,) = _search(client, alice, "narwhal", limit=1)
+    assert hit["conversation_id"] != moved
+    assert _search(client, alice, "narwhal", limit=1, offset=1) == []
+
+
+def test_search_follows_deletes(client):
+    headers = signup_and_login(client, "search-del")
+    conversation_id = _ask(client, headers, "ephemeral pineapple note")
+    assert len(_search(client, headers, "pineapple")) == 1
+    client.delete(f"/api/conversations/{conversation_id}", headers=headers)
+    assert _search(client, headers, "pineapple") == []
+
+
+def test_only_newest_candidates_are_ranked(client, monkeypatch):
+    headers = signup_and_login(client, "search-window")
+    conversation_id = _ask(client, headers, "walrus one")
+    for text in ("walrus two", "walrus three"):
+        _ask(client, headers, text, conversation_id)
+    monkeypatch.setattr(settings, "search_max_candidates", 2)
+    hits = _search(client, headers, "walrus")
+    assert sorted(hit["snippet"] for hit in hits) == [
+        "<mark>walrus</mark> three",
+        "<mark>walrus</mark> two",
+    ]
+
+
+def test_query_syntax_is_not_interpreted(client):
+    headers = signup_and_login(client, "search-syntax")
+    _ask(client, headers, "NEAR OR AND what does this mean")
+    assert len(_search(client, headers, 'NEAR( "OR" AND*')) == 1
+    assert _search(client, headers, "?!") == []
+    res = client.get("/api/conversations/search", params={"q": ""}, headers=headers)
+    assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_match_expression():
+    assert _match_expression("  ", "u1") is None
+    assert _match_expression("Hello wor", "u1") == 'user_id : "u1" AND content : ("Hello" "wor"*)'
+    assert _match_expression("hello wo", "u1").endswith('("hello" "wo")')
+    assert _match_expression("hello ", 'a"b').startswith('user_id : "a""b"')
+    assert _match_expression("hi", "4f2a-9c").startswith('user_id : "4f2a9c" AND')
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from app.api.streaming import coalesce
+
+
+async def _tokens(n: int, delay: float = 0.0, stall_after: int | None = None):
+    for i in range(n):
+        if stall_after is not None and i == stall_after:
+            await asyncio.sleep(0.3)
+        elif delay:
+            await asyncio.sleep(delay)
+        yield f"t{i} "
+
+
+async def _collect(source, **kwargs) -> list[tuple[float, str]]:
+    started = time.perf_counter()
+    return [
+        (time.perf_counter() - started, frame)
+        async for frame in coalesce(source, **kwargs)
+    ]
+
+
+def test_coalesce_preserves_text_and_sends_first_token_alone():
+    frames = asyncio.run(_collect(_tokens(200, delay=0.001), interval_ms=50))
+
+    assert frames[0][1] == "t0 "
+    assert "".join(f for _, f in frames) == "".join(f"t{i} " for i in range(200))
+    assert len(frames) < 40
+
+
+def test_coalesce_flushes_on_size():
+    frames = asyncio.run(_collect(_tokens(100), interval_ms=10_000, max_bytes=40))
+
+    assert all(len(f) <= 40 + 4 for _, f in frames)
+    assert "".join(f for _, f in frames).count("t") == 100
+
+
+def test_coalesce_flushes_on_timer_when_source_stalls():
+    frames = asyncio.run(_collect(_tokens(4, stall_after=3), interval_ms=20))
+
+    texts = [f for _, f in frames]
+    assert texts == ["t0 ", "t1 t2 ", "t3 "]
+    # "t1 t2 " went out on the timer, well before the stalled token arrived.
+    assert frames[1][0] < 0.2 <= frames[2][0]
+
+
+def test_coalesce_disabled_is_passthrough():
+    frames = asyncio.run(_collect(_tokens(5), interval_ms=0))
+    assert [f for _, f in frames] == [f"t{i} " for i in range(5)]